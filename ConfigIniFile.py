@@ -0,0 +1,118 @@
+"""
+Shared reader for the privatesettings/config.ini key=value settings file.
+The file is parsed once into a dictionary and only re-read when its
+modification time changes.
+"""
+
+import os
+import threading
+import time
+import logging
+
+logger = logging.getLogger("StockTickerLogger")
+
+class ConfigIniFile:
+    """Cached, typed access to KEY=value settings with mtime-based invalidation"""
+
+    # Minimum time between stat() calls on the settings file
+    MTIME_CHECK_INTERVAL_SECS = 1.0
+
+    def __init__(self, fileName="privatesettings/config.ini"):
+        self._fileName = fileName
+        self._lock = threading.Lock()
+        self._values = {}
+        self._typedValues = {}
+        self._fileMtime = None
+        self._lastMtimeCheck = None
+        self._loadCount = 0
+
+    def getFileName(self):
+        return self._fileName
+
+    def getLoadCount(self):
+        """Number of times the file has been parsed (useful for checking caching)"""
+        return self._loadCount
+
+    def getStr(self, key, default=""):
+        """Get a value as a string (whitespace stripped)"""
+        with self._lock:
+            self._refreshIfChanged()
+            return self._values.get(key, default)
+
+    def getBool(self, key, default=False):
+        """Get a value as a bool - true/yes/on/1 are treated as True"""
+        return self._getTyped("bool", key, default, self._parseBool)
+
+    def getInt(self, key, default=0):
+        """Get a value as an int - returns default if missing or malformed"""
+        return self._getTyped("int", key, default, int)
+
+    def getFloat(self, key, default=0.0):
+        """Get a value as a float - returns default if missing or malformed"""
+        return self._getTyped("float", key, default, float)
+
+    def getList(self, key, default=None, separator=","):
+        """Get a separated value as a list of stripped, non-empty strings"""
+        def parseList(valStr):
+            return tuple(item.strip() for item in valStr.split(separator) if item.strip())
+        defaultTuple = tuple(default) if default is not None else ()
+        return list(self._getTyped("list" + separator, key, defaultTuple, parseList))
+
+    def _getTyped(self, typeName, key, default, converter):
+        with self._lock:
+            self._refreshIfChanged()
+            cacheKey = (typeName, key)
+            if cacheKey in self._typedValues:
+                return self._typedValues[cacheKey]
+            if key not in self._values:
+                return default
+            try:
+                typedVal = converter(self._values[key])
+            except (ValueError, TypeError):
+                logger.warning(f"ConfigIniFile: invalid {typeName} value for {key} in {self._fileName}")
+                return default
+            self._typedValues[cacheKey] = typedVal
+            return typedVal
+
+    @staticmethod
+    def _parseBool(valStr):
+        lowerVal = valStr.lower()
+        if lowerVal in ("true", "yes", "on", "1"):
+            return True
+        if lowerVal in ("false", "no", "off", "0", ""):
+            return False
+        raise ValueError(valStr)
+
+    def _refreshIfChanged(self):
+        """Re-parse the file if its mtime has changed - caller must hold the lock"""
+        now = time.monotonic()
+        if self._lastMtimeCheck is not None and now - self._lastMtimeCheck < self.MTIME_CHECK_INTERVAL_SECS:
+            return
+        self._lastMtimeCheck = now
+        try:
+            mtime = os.stat(self._fileName).st_mtime_ns
+        except OSError:
+            mtime = None
+        if mtime == self._fileMtime and self._loadCount > 0:
+            return
+        self._fileMtime = mtime
+        self._values = self._parseFile() if mtime is not None else {}
+        self._typedValues = {}
+        self._loadCount += 1
+        if mtime is None:
+            logger.debug(f"ConfigIniFile: {self._fileName} not found, using defaults")
+
+    def _parseFile(self):
+        values = {}
+        try:
+            with open(self._fileName, "r") as f:
+                for line in f:
+                    line = line.strip()
+                    # Skip comments and empty lines
+                    if not line or line.startswith('#') or '=' not in line:
+                        continue
+                    key, val = line.split("=", 1)
+                    values[key.strip()] = val.strip()
+        except Exception as e:
+            logger.warning(f"ConfigIniFile: could not read {self._fileName}: {e}")
+        return values
@@ -0,0 +1,95 @@
+import os
+import time
+import logging
+from PySide6 import QtGui, QtWidgets, QtCore
+
+from LatencyTracker import latencyTracker
+
+'''
+Diagnostics window - quote latency through the providers, provider manager
+and tables, plus display refresh statistics. Refreshed every second while open
+'''
+
+logger = logging.getLogger("StockTickerLogger")
+
+class DiagnosticsDialog(QtWidgets.QDialog):
+
+    REFRESH_INTERVAL_MS = 1000
+
+    def __init__(self, uiRefresh=None, tickHistory=None, dispatchQueue=None, providerHealth=None, providerManager=None, parent=None):
+        super().__init__(parent)
+        self.uiRefresh = uiRefresh
+        self.tickHistory = tickHistory
+        self.dispatchQueue = dispatchQueue
+        self.providerHealth = providerHealth
+        self.providerManager = providerManager
+        self.setWindowTitle("Stock Ticker Diagnostics")
+        vLayout = QtWidgets.QVBoxLayout(self)
+        self.reportText = QtWidgets.QPlainTextEdit()
+        self.reportText.setReadOnly(True)
+        self.reportText.setFont(QtGui.QFontDatabase.systemFont(QtGui.QFontDatabase.FixedFont))
+        vLayout.addWidget(self.reportText)
+        hLayout = QtWidgets.QHBoxLayout()
+        resetButton = QtWidgets.QPushButton("Reset")
+        resetButton.clicked.connect(self.resetStats)
+        saveButton = QtWidgets.QPushButton("Save...")
+        saveButton.clicked.connect(self.saveReport)
+        closeButton = QtWidgets.QPushButton("Close")
+        closeButton.clicked.connect(self.close)
+        hLayout.addWidget(resetButton)
+        hLayout.addStretch()
+        hLayout.addWidget(saveButton)
+        hLayout.addWidget(closeButton)
+        vLayout.addLayout(hLayout)
+        self.resize(720, 360)
+        self.refreshTimer = QtCore.QTimer(self)
+        self.refreshTimer.timeout.connect(self.updateReport)
+        self.updateReport()
+
+    def showEvent(self, event):
+        self.refreshTimer.start(self.REFRESH_INTERVAL_MS)
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        self.refreshTimer.stop()
+        super().hideEvent(event)
+
+    def getExtraStats(self):
+        extraStats = {}
+        if self.uiRefresh is not None:
+            extraStats["displayRefresh"] = self.uiRefresh.getStats()
+        if self.tickHistory is not None:
+            extraStats["tickHistory"] = self.tickHistory.getStats()
+        if self.dispatchQueue is not None:
+            extraStats["providerDispatch"] = self.dispatchQueue.getStats()
+        if self.providerHealth is not None:
+            extraStats["providerHealth"] = self.providerHealth.getStats()
+        if self.providerManager is not None:
+            extraStats["providers"] = self.providerManager.getProvidersHealth()
+        return extraStats
+
+    def getReportText(self):
+        lines = ["Quote latency (tick to screen)", latencyTracker.formatReport()]
+        for name, stats in self.getExtraStats().items():
+            lines.append("")
+            lines.append(name)
+            for key, value in stats.items():
+                lines.append(f"  {key:20s} {value:.1f}" if isinstance(value, float) else f"  {key:20s} {value}")
+        return "\n".join(lines)
+
+    def updateReport(self):
+        self.reportText.setPlainText(self.getReportText())
+
+    def resetStats(self):
+        latencyTracker.reset()
+        self.updateReport()
+
+    def saveReport(self):
+        defaultName = os.path.join("logs", "latency_" + time.strftime("%Y%m%d_%H%M%S") + ".json")
+        fileName, _ = QtWidgets.QFileDialog.getSaveFileName(self, "Save diagnostics", defaultName, "JSON (*.json)")
+        if not fileName:
+            return
+        try:
+            latencyTracker.dumpToFile(fileName, self.getExtraStats())
+        except OSError as excp:
+            logger.warning(f"DiagnosticsDialog: failed to save {fileName}: {excp}")
@@ -1,12 +1,10 @@
 import logging
-from selenium import webdriver
 import time
-import arrow
+import requests
 from datetime import datetime
-from bs4 import BeautifulSoup
+from HtmlTableExtractor import HtmlTableExtractor
+from ConfigIniFile import ConfigIniFile
 import threading
-from selenium.webdriver.chrome.options import Options  
-from selenium.webdriver.common.keys import Keys
 
 '''
 Created on 13 Sep 2013
@@ -31,13 +29,26 @@ class ExDivDates():
         "£":  {"iso":"GBP","def":1.0}
     }
 
-    def __init__(self, exchangeRates):
+    DEFAULT_PAGE_URL = "http://www.dividenddata.co.uk"
+    DEFAULT_REQUEST_TIMEOUT_SECS = 30.0
+
+    def __init__(self, exchangeRates, configIni=None):
         self._exchangeRates = exchangeRates
+        self._configIni = configIni if configIni is not None else ConfigIniFile()
         self.running = False
         self.stocksExDivInfo = {}
         self.lock = threading.Lock()
         self.runHeadless = True
-        
+        # The page is fetched over plain HTTP - a browser (selenium) is only used if
+        # EXDIV_SELENIUM_FALLBACK is set and the HTTP fetch fails or yields no rows
+        self.pageURL = self._configIni.getStr("EXDIV_URL", self.DEFAULT_PAGE_URL)
+        self.useSeleniumFallback = self._configIni.getBool("EXDIV_SELENIUM_FALLBACK", False)
+        self.requestTimeoutSecs = self._configIni.getFloat("EXDIV_REQUEST_TIMEOUT_SECS", self.DEFAULT_REQUEST_TIMEOUT_SECS)
+        self._session = None
+        # Validators of the last page parsed, sent so an unchanged page isn't downloaded again
+        self._etag = None
+        self._lastModified = None
+
     def run(self):
         self.running = True
         self.t = threading.Thread(target=self.do_thread_scrape)
@@ -98,6 +109,8 @@ class ExDivDates():
         return newVal
 
     def convertFromShortDate(self, val):
+        # Imported here as it's only needed once the page is fetched
+        import arrow
         newVal = ""
         try:
             newVal = arrow.get(val, "DD-MMM")
@@ -112,8 +125,7 @@ class ExDivDates():
     def extractDataFromPage(self, pageText):
 
         # parse and extract ex dividend table
-        soup = BeautifulSoup(pageText, "html5lib")
-        exDivTable = soup.select("body section table tbody tr")
+        exDivTable = HtmlTableExtractor.extractRows(pageText, "body section table")
         # logger.debug(f"extractDataFromPage: exDivTable {exDivTable}")
 
         # Extract rows and columns from table
@@ -125,12 +137,11 @@ class ExDivDates():
             exDivValid = True
             exDivItems = {"exDivTableLine": exDivTableLine}
             exDivTableLine += 1
-            exDivCells = exDivRow.select("td")
-            for elIdx in range(len(exDivCells)):
+            for elIdx in range(len(exDivRow)):
                 if elIdx >= len(attrNames):
                     break
                 attrName = attrNames[elIdx]
-                val = exDivCells[elIdx].getText().strip()
+                val = exDivRow[elIdx]
                 # Convert currency fields
                 if attrName == "exDivSharePrice" or attrName == "exDivAmount":
                     val = self.convertFromPence(val)
@@ -155,6 +166,74 @@ class ExDivDates():
         logger.debug(f"extractDataFromPage: Processed {len(exDivTable)} rows, got {len(exDivInfo)} symbols")
         return exDivInfo
 
+    def fetchExDivInfo(self):
+        """Fetch and parse the ex-dividend table - None if the page is unchanged since the last fetch"""
+        try:
+            pageText, etag, lastModified = self._fetchWithHttp()
+        except requests.RequestException as excp:
+            if not self.useSeleniumFallback:
+                raise
+            logger.info(f"ExDivDates: HTTP fetch failed ({excp}), using browser")
+            return self.extractDataFromPage(self._fetchWithBrowser())
+        if pageText is None:
+            logger.debug("ExDivDates: page not modified")
+            return None
+        exDivInfoDict = self.extractDataFromPage(pageText)
+        if not exDivInfoDict and self.useSeleniumFallback:
+            logger.info("ExDivDates: no rows in fetched page, using browser")
+            return self.extractDataFromPage(self._fetchWithBrowser())
+        # Only remembered once the page has been parsed so a bad page is fetched in full next time
+        if exDivInfoDict:
+            self._etag = etag
+            self._lastModified = lastModified
+        return exDivInfoDict
+
+    def storeExDivInfo(self, exDivInfoDict):
+        """Put found stocks into the dictionary of current data"""
+        for sym, vals in exDivInfoDict.items():
+            ySymbol = sym
+            if "exDivMarket" in vals:
+                market = vals["exDivMarket"]
+                if market.startswith("FTSE"):
+                    ySymbol = sym + "L" if sym.endswith(".") else sym + ".L"
+            self.lock.acquire()
+            self.stocksExDivInfo[ySymbol] = vals
+            self.lock.release()
+
+    def _fetchWithHttp(self):
+        """Conditional GET - returns (page text or None if not modified, ETag, Last-Modified)"""
+        if self._session is None:
+            self._session = requests.Session()
+            self._session.headers["User-Agent"] = "Mozilla/5.0 (X11; Linux x86_64) QtStockTicker"
+        headers = {}
+        if self._etag:
+            headers["If-None-Match"] = self._etag
+        if self._lastModified:
+            headers["If-Modified-Since"] = self._lastModified
+        resp = self._session.get(self.pageURL, headers=headers, timeout=self.requestTimeoutSecs)
+        if resp.status_code == 304:
+            return None, self._etag, self._lastModified
+        resp.raise_for_status()
+        return resp.text, resp.headers.get("ETag"), resp.headers.get("Last-Modified")
+
+    def _fetchWithBrowser(self):
+        # Imported here so that startup (and the HTTP path) never loads selenium
+        from selenium import webdriver
+        from selenium.webdriver.chrome.options import Options
+        if self.runHeadless:
+            chrome_options = Options()
+            chrome_options.add_argument("--headless")
+            chrome_options.add_argument("--no-sandbox")
+            chrome_options.add_argument("--disable-extensions")
+            browser = webdriver.Chrome(options=chrome_options)
+        else:
+            browser = webdriver.Firefox() # Get local session of firefox
+        try:
+            browser.get(self.pageURL) # Load page
+            return browser.page_source
+        finally:
+            browser.quit()
+
     def do_thread_scrape(self):
         while(self.running):
             
@@ -174,37 +253,16 @@ class ExDivDates():
                 bRunNow = True
                     
             if bRunNow:
-                pageURL = "http://www.dividenddata.co.uk"
-                logger.debug(f"ExDivDates: {datetime.now().strftime('%Y-%m-%d %H:%M')}, URL {pageURL}")
+                logger.debug(f"ExDivDates: {datetime.now().strftime('%Y-%m-%d %H:%M')}, URL {self.pageURL}")
                 self.bFirstRunDone = True
                 self.bRunAlready = True
-                
-                if self.runHeadless:
-                    chrome_options = Options()  
-                    chrome_options.add_argument("--headless")
-                    chrome_options.add_argument("--no-sandbox")
-                    chrome_options.add_argument("--disable-extensions")
-                    browser = webdriver.Chrome(options=chrome_options)
-                else:
-                    browser = webdriver.Firefox() # Get local session of firefox
-    
-                browser.get(pageURL) # Load page
-
-                exDivInfoDict = self.extractDataFromPage(browser.page_source)
-
-                # Close the browser now we're done
-                browser.close()
-
-                # Put found stocks into the dictionary of current data
-                for sym, vals in exDivInfoDict.items():
-                    ySymbol = sym
-                    if "exDivMarket" in vals:
-                        market = vals["exDivMarket"]
-                        if market.startswith("FTSE"):
-                            ySymbol = sym + "L" if sym.endswith(".") else sym + ".L"
-                    self.lock.acquire()
-                    self.stocksExDivInfo[ySymbol] = vals
-                    self.lock.release()
+                try:
+                    exDivInfoDict = self.fetchExDivInfo()
+                except Exception as excp:
+                    logger.warning(f"ExDivDates: failed to get ex-dividend dates {excp}")
+                    exDivInfoDict = None
+                if exDivInfoDict is not None:
+                    self.storeExDivInfo(exDivInfoDict)
 
             for i in range(60):
                 if not self.running:
@@ -3,6 +3,7 @@ import threading
 import time
 import copy
 import requests
+from ConfigIniFile import ConfigIniFile
 
 '''
 Created on 11 Nov 2017
@@ -15,7 +16,8 @@ ENABLE_EXCHANGE_RATES = False
 logger = logging.getLogger("StockTickerLogger")
 
 class ExchangeRates:
-    def __init__(self):
+    def __init__(self, configIni=None):
+        self._configIni = configIni if configIni is not None else ConfigIniFile()
         self.running = False
         self.exchgRateData = {}
         self.lock = threading.Lock()
@@ -36,16 +38,10 @@ class ExchangeRates:
         return dat
 
     def start(self):
-        # Read the FIXER_IO_API_KEY from a config.ini file
-        self.FIXER_IO_API_KEY = ""
-        try:
-            with open("privatesettings/config.ini", "r") as f:
-                for line in f:
-                    if "FIXER_IO_API_KEY" in line:
-                        self.FIXER_IO_API_KEY = line.split("=")[1].strip()
-                        break
-        except:
-            logger.error("ExchangeRates: Failed to read FIXER_IO_API_KEY from privatesettings/config.ini")
+        # Read the FIXER_IO_API_KEY from the config.ini file
+        self.FIXER_IO_API_KEY = self._configIni.getStr("FIXER_IO_API_KEY", "")
+        if not self.FIXER_IO_API_KEY:
+            logger.error(f"ExchangeRates: No FIXER_IO_API_KEY in {self._configIni.getFileName()}")
         # Start the thread
         if ENABLE_EXCHANGE_RATES:
             self.running = True
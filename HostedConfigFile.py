@@ -5,6 +5,7 @@ import json
 import os
 import sys
 import logging
+import threading
 
 logger = logging.getLogger("StockTickerLogger")
 
@@ -18,6 +19,9 @@ class HostedConfigFile():
     
     hostedDataLocations = []
     latestFileVersion = -1
+    # The hosted config is fetched on a worker thread and updated on the GUI thread -
+    # fetches and updates (which both write latestFileVersion and the locations) take turns
+    _locationsLock = threading.Lock()
     
     def initFromFile(self, fName):
         try:
@@ -57,7 +61,32 @@ class HostedConfigFile():
         configData = json.loads(configContents)
         return configData
 
+    def getConfigDataFromCache(self, cacheFilePath):
+        # Last config data fetched - used to start up without waiting for the network
+        try:
+            with open(cacheFilePath, "r") as cacheFile:
+                configData = json.load(cacheFile)
+        except (IOError, ValueError):
+            return None
+        # Edits made before the hosted copy arrives must still get a newer version number
+        with self._locationsLock:
+            if self.latestFileVersion < 0 and 'FileVersion' in configData:
+                self.latestFileVersion = int(configData['FileVersion'])
+        return configData
+
+    def saveConfigDataToCache(self, cacheFilePath, configData):
+        try:
+            with open(cacheFilePath + ".tmp", "wt") as cacheFile:
+                json.dump(configData, cacheFile, indent=4)
+            os.replace(cacheFilePath + ".tmp", cacheFilePath)
+        except IOError as excp:
+            logger.warning(f"HostedConfigFile failed to save cache {cacheFilePath}: {excp}")
+
     def getConfigContentsFromLocation(self):
+        with self._locationsLock:
+            return self._getConfigContentsFromLocation()
+
+    def _getConfigContentsFromLocation(self):
         # Work through the locations in order trying to get the file
         tmpFiles = []
         fileVersions = []
@@ -234,6 +263,7 @@ class HostedConfigFile():
 
     def configFileUpdate(self, updatedData):
         # form data to write
-        updatedData["FileVersion"] = self.latestFileVersion + 1
-        jsonStr = json.dumps(updatedData, indent=4)
-        self.putConfigContentsToLocation(jsonStr)
+        with self._locationsLock:
+            updatedData["FileVersion"] = self.latestFileVersion + 1
+            jsonStr = json.dumps(updatedData, indent=4)
+            self.putConfigContentsToLocation(jsonStr)
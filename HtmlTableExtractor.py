@@ -0,0 +1,177 @@
+"""
+Streaming extraction of table cells from scraped pages.
+Rather than building a full document tree (BeautifulSoup with html5lib) and
+running CSS selects over it, the page is scanned once with the standard
+library's html.parser. Only the text of cells inside the container named by a
+simple descendant selector is kept, and the scan stops as soon as that
+container has closed, so the rest of the page is never parsed.
+
+Selectors are space separated parts, each a tag, "#id", "tag#id", ".class" or
+"tag.class", matched as CSS descendant combinators, e.g.
+"#ctl00_cph1_qp1_div1 div.cb table".
+"""
+
+from html.parser import HTMLParser
+
+class HtmlTableExtractor(HTMLParser):
+    """Collects the rows of table cells inside the first element(s) matching a selector"""
+
+    # Pages are fed in chunks of this many characters so the scan can stop early
+    FEED_CHUNK_CHARS = 16384
+
+    # Elements that never have content or an end tag
+    VOID_ELEMENTS = frozenset(("area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta",
+                               "param", "source", "track", "wbr"))
+
+    def __init__(self, containerSelector, cellTag="td", cellSubTag=None, skipHeaderRows=True, maxContainers=1):
+        """
+        cellSubTag collects the text of each such element within the cells (e.g. "b")
+        rather than whole cells. skipHeaderRows ignores rows inside thead and tfoot.
+        Scanning stops once maxContainers matching elements have closed (None to scan it all)
+        """
+        super().__init__(convert_charrefs=True)
+        self._selector = self.parseSelector(containerSelector)
+        self._cellTag = cellTag
+        self._cellSubTag = cellSubTag
+        self._skipHeaderRows = skipHeaderRows
+        # Open elements as (tag, number of selector parts matched by it and its ancestors)
+        self._stack = []
+        self._maxContainers = maxContainers
+        self._numContainers = 0
+        self._containerDepth = None
+        self._headerDepth = 0
+        self._row = None
+        self._inCell = False
+        self._cellText = None
+        self._subTagDepth = 0
+        self.rows = []
+        self.done = False
+
+    @staticmethod
+    def parseSelector(selector):
+        parts = []
+        for part in selector.split():
+            tag, elemId, elemClass = part, None, None
+            if "#" in tag:
+                tag, elemId = tag.split("#", 1)
+            elif "." in tag:
+                tag, elemClass = tag.split(".", 1)
+            parts.append((tag.lower() or None, elemId, elemClass))
+        if not parts:
+            raise ValueError("HtmlTableExtractor: empty selector")
+        return tuple(parts)
+
+    @classmethod
+    def extractRows(cls, pageText, containerSelector, **kwargs):
+        """Rows (lists of cell text, stripped) in the container(s) matching the selector"""
+        extractor = cls(containerSelector, **kwargs)
+        extractor.feedUntilDone(pageText)
+        return extractor.rows
+
+    @classmethod
+    def extractCells(cls, pageText, containerSelector, **kwargs):
+        """All cells in the matching container(s), in document order"""
+        return [cell for row in cls.extractRows(pageText, containerSelector, **kwargs) for cell in row]
+
+    def feedUntilDone(self, pageText):
+        for pos in range(0, len(pageText), self.FEED_CHUNK_CHARS):
+            self.feed(pageText[pos:pos + self.FEED_CHUNK_CHARS])
+            if self.done:
+                return
+        self.close()
+        self._endRow()
+
+    def handle_starttag(self, tag, attrs):
+        if self.done:
+            return
+        if tag in self.VOID_ELEMENTS:
+            return
+        matched = self._stack[-1][1] if self._stack else 0
+        if matched < len(self._selector) and self._matches(self._selector[matched], tag, attrs):
+            matched += 1
+            if matched == len(self._selector) and self._containerDepth is None:
+                self._containerDepth = len(self._stack)
+        self._stack.append((tag, matched))
+        if self._containerDepth is None:
+            return
+        if tag == "thead" or tag == "tfoot":
+            self._headerDepth += 1
+        elif self._headerDepth > 0 and self._skipHeaderRows:
+            return
+        elif tag == "tr":
+            # Unclosed rows and cells are closed by the next one, as browsers do
+            self._endRow()
+            self._row = []
+        elif tag == self._cellTag:
+            self._endCell()
+            if self._row is None:
+                self._row = []
+            self._inCell = True
+            if self._cellSubTag is None:
+                self._cellText = []
+        elif tag == self._cellSubTag and self._inCell:
+            self._subTagDepth += 1
+            if self._subTagDepth == 1:
+                self._cellText = []
+
+    def handle_endtag(self, tag):
+        if self.done or tag in self.VOID_ELEMENTS:
+            return
+        # Pop to the matching open element - stray end tags are ignored
+        for index in range(len(self._stack) - 1, -1, -1):
+            if self._stack[index][0] == tag:
+                break
+        else:
+            return
+        del self._stack[index:]
+        if self._containerDepth is None:
+            return
+        if index <= self._containerDepth:
+            self._endRow()
+            self._containerDepth = None
+            self._headerDepth = 0
+            self._numContainers += 1
+            if self._maxContainers is not None and self._numContainers >= self._maxContainers:
+                self.done = True
+            return
+        if tag == "thead" or tag == "tfoot":
+            self._headerDepth = max(self._headerDepth - 1, 0)
+        elif tag == "tr" or tag == "table":
+            self._endRow()
+        elif tag == self._cellTag:
+            self._endCell()
+        elif tag == self._cellSubTag and self._subTagDepth > 0:
+            self._subTagDepth -= 1
+            if self._subTagDepth == 0:
+                self._endCell()
+
+    def handle_data(self, data):
+        if self._cellText is not None:
+            self._cellText.append(data)
+
+    def _endCell(self):
+        if self._cellText is not None:
+            self._row.append("".join(self._cellText).strip())
+            self._cellText = None
+        self._inCell = False
+        self._subTagDepth = 0
+
+    def _endRow(self):
+        self._endCell()
+        if self._row is not None:
+            self.rows.append(self._row)
+            self._row = None
+
+    @staticmethod
+    def _matches(part, tag, attrs):
+        partTag, partId, partClass = part
+        if partTag is not None and partTag != tag:
+            return False
+        if partId is None and partClass is None:
+            return True
+        for name, value in attrs:
+            if partId is not None and name == "id" and value == partId:
+                return True
+            if partClass is not None and name == "class" and value and partClass in value.split():
+                return True
+        return False
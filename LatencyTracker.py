@@ -0,0 +1,121 @@
+"""
+Tick-to-screen latency of quote updates. Each update is timestamped as it
+passes through the pipeline:
+
+    received  - the provider has the new value off the wire
+    cached    - StockProviderManager has stored it in the quote cache
+    displayed - the table models have been updated with it
+
+and the time spent between marks is kept per provider and per stage
+("provider" = received to cached, "ui" = cached to displayed, "total" =
+received to displayed) so p50/p95/p99 can be reported. If a symbol is
+received again before it is displayed, the newest receive is measured.
+"""
+
+import json
+import time
+import threading
+from collections import deque
+
+class LatencyTracker:
+    """Per-provider, per-stage latency samples for quote updates"""
+
+    STAGES = ("provider", "ui", "total")
+    PERCENTILES = (50, 95, 99)
+    # Most recent samples kept for each provider and stage
+    MAX_SAMPLES = 2000
+
+    def __init__(self, maxSamples=MAX_SAMPLES):
+        self._lock = threading.Lock()
+        self._maxSamples = maxSamples
+        # symbol -> [provider, receivedTime, cachedTime or None]
+        self._pending = {}
+        # (provider, stage) -> deque of seconds
+        self._samples = {}
+        self._counts = {}
+
+    def markReceived(self, symbol, provider):
+        """A provider has a new value for symbol - call as close to the wire as possible"""
+        now = time.perf_counter()
+        with self._lock:
+            self._pending[symbol] = [provider, now, None]
+
+    def markCached(self, symbol, provider):
+        """The new value has been stored in the quote cache"""
+        now = time.perf_counter()
+        with self._lock:
+            entry = self._pending.get(symbol)
+            if entry is None or entry[0] != provider:
+                # Provider without a receive mark - measure from here
+                self._pending[symbol] = [provider, now, now]
+            elif entry[2] is None:
+                entry[2] = now
+
+    def markDisplayed(self, symbols=None):
+        """The table models now show symbols (None for every pending symbol)"""
+        now = time.perf_counter()
+        with self._lock:
+            if symbols is None:
+                symbols = list(self._pending.keys())
+            for symbol in symbols:
+                entry = self._pending.get(symbol)
+                if entry is None or entry[2] is None:
+                    continue
+                del self._pending[symbol]
+                provider, receivedTime, cachedTime = entry
+                self._addSample(provider, "provider", cachedTime - receivedTime)
+                self._addSample(provider, "ui", now - cachedTime)
+                self._addSample(provider, "total", now - receivedTime)
+
+    def _addSample(self, provider, stage, durationSecs):
+        key = (provider, stage)
+        samples = self._samples.get(key)
+        if samples is None:
+            samples = self._samples[key] = deque(maxlen=self._maxSamples)
+            self._counts[key] = 0
+        samples.append(durationSecs)
+        self._counts[key] += 1
+
+    def reset(self):
+        with self._lock:
+            self._pending = {}
+            self._samples = {}
+            self._counts = {}
+
+    def getReport(self):
+        """{provider: {stage: {count, p50Ms, p95Ms, p99Ms, maxMs}}} over the recent samples"""
+        with self._lock:
+            snapshot = {key: (sorted(samples), self._counts[key]) for key, samples in self._samples.items()}
+        report = {}
+        for (provider, stage), (samples, count) in snapshot.items():
+            stats = {"count": count}
+            for percentile in self.PERCENTILES:
+                stats[f"p{percentile}Ms"] = samples[min(len(samples) - 1, len(samples) * percentile // 100)] * 1000
+            stats["maxMs"] = samples[-1] * 1000
+            report.setdefault(provider, {})[stage] = stats
+        return report
+
+    def formatReport(self):
+        report = self.getReport()
+        if not report:
+            return "No quote updates measured yet"
+        lines = [f"{'provider':20s} {'stage':9s} {'count':>8s} {'p50 ms':>9s} {'p95 ms':>9s} {'p99 ms':>9s} {'max ms':>9s}"]
+        for provider in sorted(report):
+            for stage in self.STAGES:
+                stats = report[provider].get(stage)
+                if stats is None:
+                    continue
+                lines.append(f"{provider:20s} {stage:9s} {stats['count']:8d} {stats['p50Ms']:9.1f} "
+                             f"{stats['p95Ms']:9.1f} {stats['p99Ms']:9.1f} {stats['maxMs']:9.1f}")
+        return "\n".join(lines)
+
+    def dumpToFile(self, fileName, extraStats=None):
+        """Write the report (and any extra statistics) as JSON"""
+        contents = {"savedAt": time.time(), "latency": self.getReport()}
+        if extraStats is not None:
+            contents.update(extraStats)
+        with open(fileName, "w") as f:
+            json.dump(contents, f, indent=2)
+
+# Shared by the providers, the provider manager and the UI
+latencyTracker = LatencyTracker()
@@ -0,0 +1,47 @@
+"""
+Logging helpers for the quote hot path. Per-tick debug messages go through a
+SampledLogger so only one in every N is formatted and written, and log
+records are handed to a QueueHandler so the threads producing them never wait
+on file or console I/O - a QueueListener thread does the writing.
+"""
+
+import queue
+import logging
+import logging.handlers
+
+class SampledLogger:
+    """Writes one in every sampleEvery calls of each debug message - for messages logged on every tick"""
+
+    def __init__(self, logger, sampleEvery=100):
+        self._logger = logger
+        self._sampleEvery = max(1, sampleEvery)
+        # Calls per message - unlocked, so concurrent callers may shift the sampling slightly
+        self._counts = {}
+
+    def setSampleEvery(self, sampleEvery):
+        self._sampleEvery = max(1, sampleEvery)
+
+    def debug(self, msg, *args):
+        """Log msg % args (formatted only if written) on the 1st, N+1th, ... call of this message"""
+        if not self._logger.isEnabledFor(logging.DEBUG):
+            return
+        count = self._counts.get(msg, 0)
+        self._counts[msg] = count + 1
+        if count % self._sampleEvery == 0:
+            if self._sampleEvery > 1:
+                self._logger.debug(msg + " [1 in %d logged]", *args, self._sampleEvery, stacklevel=2)
+            else:
+                self._logger.debug(msg, *args, stacklevel=2)
+
+def setupQueueLogging(handlers, logger=None):
+    """
+    Route logger's records (the root logger by default) through a queue to the
+    given handlers, which are written to on a listener thread. Returns the
+    started QueueListener - stop() it at exit to flush the remaining records
+    """
+    logger = logger if logger is not None else logging.getLogger()
+    logQueue = queue.SimpleQueue()
+    logger.addHandler(logging.handlers.QueueHandler(logQueue))
+    listener = logging.handlers.QueueListener(logQueue, *handlers, respect_handler_level=True)
+    listener.start()
+    return listener
@@ -0,0 +1,197 @@
+"""
+Adaptive polling scheduler for the polling stock providers.
+Rather than walking the symbol list in fixed slices, each symbol gets a
+priority from how stale its quote is, how volatile it has recently been,
+the value of the position held (holding x price) and whether it is
+visible in a table. Providers ask for the next batch of most urgent
+symbols, so large or moving positions refresh more often within the same
+request budget.
+"""
+
+import heapq
+import math
+import threading
+import time
+
+class _SymbolPollState:
+    __slots__ = ("lastPollTime", "lastPrice", "volatility", "holding", "visible")
+
+    def __init__(self):
+        self.lastPollTime = None
+        self.lastPrice = None
+        self.volatility = 0.0
+        self.holding = 0.0
+        self.visible = True
+
+class PollScheduler:
+    """Priority-based choice of which symbols a polling provider should request next"""
+
+    # Priority weight = 1 + VALUE_WEIGHT * (position value / largest position value)
+    #                     + VOLATILITY_WEIGHT * min(volatility / VOLATILITY_REF, 1)
+    #                     + VISIBLE_WEIGHT (if shown in a table)
+    VALUE_WEIGHT = 3.0
+    VOLATILITY_WEIGHT = 2.0
+    VISIBLE_WEIGHT = 1.0
+
+    # Volatility is an exponentially weighted average of absolute fractional price moves
+    VOLATILITY_EWMA_ALPHA = 0.3
+    VOLATILITY_REF = 0.005
+
+    def __init__(self, minRefreshSecs=15.0):
+        self._lock = threading.Lock()
+        self._symbols = {}
+        self._minRefreshSecs = minRefreshSecs
+        # Kept apart from the symbol states so symbols added later (e.g. moved here by
+        # provider fallback) get their position weight and visibility straight away
+        self._holdings = {}
+        self._visibleSymbols = None
+
+    def setMinRefreshSecs(self, minRefreshSecs):
+        """Refresh interval of a weight 1 symbol - higher priority symbols become due sooner"""
+        with self._lock:
+            self._minRefreshSecs = max(float(minRefreshSecs), 0.001)
+
+    def setSymbols(self, symbols):
+        """Replace the symbol list keeping state for symbols that remain"""
+        with self._lock:
+            newSymbols = {}
+            for sym in symbols:
+                newSymbols[sym] = self._symbols.get(sym) or self._newState(sym)
+            self._symbols = newSymbols
+
+    def addSymbol(self, symbol):
+        with self._lock:
+            if symbol not in self._symbols:
+                self._symbols[symbol] = self._newState(symbol)
+
+    def removeSymbol(self, symbol):
+        with self._lock:
+            self._symbols.pop(symbol, None)
+
+    def getSymbols(self):
+        with self._lock:
+            return list(self._symbols.keys())
+
+    def numSymbols(self):
+        with self._lock:
+            return len(self._symbols)
+
+    def setHoldings(self, holdingsBySymbol):
+        """Set number of shares held per symbol - symbols not listed (watch-list) hold 0"""
+        holdings = {sym: self.toFloat(holding) or 0.0 for sym, holding in holdingsBySymbol.items()}
+        with self._lock:
+            self._holdings = holdings
+            for sym, state in self._symbols.items():
+                state.holding = holdings.get(sym, 0.0)
+
+    def setVisibleSymbols(self, visibleSymbols):
+        """Set which symbols are currently visible in a table - others get lower priority"""
+        visibleSet = frozenset(visibleSymbols)
+        with self._lock:
+            self._visibleSymbols = visibleSet
+            for sym, state in self._symbols.items():
+                state.visible = sym in visibleSet
+
+    def _newState(self, symbol):
+        # Until visibility is known every symbol counts as visible
+        state = _SymbolPollState()
+        state.holding = self._holdings.get(symbol, 0.0)
+        state.visible = self._visibleSymbols is None or symbol in self._visibleSymbols
+        return state
+
+    def recordQuote(self, symbol, price, now=None):
+        """Record that a quote was received for a symbol"""
+        now = time.monotonic() if now is None else now
+        newPrice = self.toFloat(price)
+        with self._lock:
+            state = self._symbols.get(symbol)
+            if state is None:
+                return
+            state.lastPollTime = now
+            if newPrice is not None and newPrice > 0:
+                if state.lastPrice:
+                    move = abs(newPrice - state.lastPrice) / state.lastPrice
+                    state.volatility += self.VOLATILITY_EWMA_ALPHA * (move - state.volatility)
+                state.lastPrice = newPrice
+
+    def recordPollAttempt(self, symbol, now=None):
+        """Record a poll that didn't yield a quote so the symbol isn't immediately retried"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            state = self._symbols.get(symbol)
+            if state is not None:
+                state.lastPollTime = now
+
+    def nextBatch(self, maxCount, now=None, candidates=None):
+        """
+        Get up to maxCount symbols that are due for a refresh, most urgent first.
+        Symbols never polled come first. candidates optionally restricts the choice
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            maxValue = self._maxPositionValue()
+            due = []
+            for sym, state in self._symbols.items():
+                if candidates is not None and sym not in candidates:
+                    continue
+                weight = self._weight(state, maxValue)
+                urgency = self._urgency(state, now, weight)
+                if urgency >= 1.0:
+                    due.append((urgency, weight, sym))
+            return [sym for urgency, weight, sym in heapq.nlargest(maxCount, due)]
+
+    def getPriorityWeight(self, symbol):
+        with self._lock:
+            state = self._symbols.get(symbol)
+            if state is None:
+                return None
+            return self._weight(state, self._maxPositionValue())
+
+    def secondsUntilNextDue(self, now=None):
+        """Time until some symbol becomes due (0 if one is due now, None if no symbols)"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            maxValue = self._maxPositionValue()
+            best = None
+            for state in self._symbols.values():
+                if state.lastPollTime is None:
+                    return 0.0
+                interval = self._minRefreshSecs / self._weight(state, maxValue)
+                waitSecs = max(state.lastPollTime + interval - now, 0.0)
+                best = waitSecs if best is None else min(best, waitSecs)
+            return best
+
+    def _urgency(self, state, now, weight):
+        """Staleness relative to the symbol's target interval - due when >= 1"""
+        if state.lastPollTime is None:
+            return math.inf
+        staleness = now - state.lastPollTime
+        return staleness * weight / self._minRefreshSecs
+
+    def _weight(self, state, maxValue):
+        weight = 1.0
+        if maxValue > 0 and state.lastPrice:
+            weight += self.VALUE_WEIGHT * (abs(state.holding) * state.lastPrice) / maxValue
+        weight += self.VOLATILITY_WEIGHT * min(state.volatility / self.VOLATILITY_REF, 1.0)
+        if state.visible:
+            weight += self.VISIBLE_WEIGHT
+        return weight
+
+    def _maxPositionValue(self):
+        maxValue = 0.0
+        for state in self._symbols.values():
+            if state.lastPrice:
+                maxValue = max(maxValue, abs(state.holding) * state.lastPrice)
+        return maxValue
+
+    @staticmethod
+    def toFloat(value):
+        """Convert a quote value (number or string such as "1,234.5") to float, None if not numeric"""
+        if value is None:
+            return None
+        if isinstance(value, (int, float)):
+            return float(value)
+        try:
+            return float(str(value).replace(",", "").strip())
+        except ValueError:
+            return None
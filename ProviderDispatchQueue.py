@@ -0,0 +1,122 @@
+"""
+Hand-off between provider threads and StockProviderManager.
+Providers post (symbol, data) and return at once; a dispatcher thread runs
+the manager's handler (validation, caching, fallback) for each symbol. Only
+the latest data per symbol is kept while it waits, so a burst of ticks for
+one symbol costs one handler call, and the number of symbols waiting is
+bounded - a slow consumer can never stall a provider's socket reader.
+"""
+
+import threading
+import logging
+from collections import OrderedDict
+
+logger = logging.getLogger("StockTickerLogger")
+
+class ProviderDispatchQueue:
+    """Bounded, coalescing (latest value per symbol wins) queue with its own dispatcher thread"""
+
+    # Symbols that can be waiting at once - the oldest waiting symbol is dropped when full
+    DEFAULT_MAX_PENDING = 1000
+
+    def __init__(self, handler, maxPending=DEFAULT_MAX_PENDING, name="ProviderDispatch"):
+        self._handler = handler
+        self._maxPending = max(1, int(maxPending))
+        self._name = name
+        self._condition = threading.Condition()
+        # symbol -> latest data, in order of first post - a coalesced post keeps its place
+        self._pending = OrderedDict()
+        self._dispatchThread = None
+        self._stopping = False
+        self._dispatching = False
+        self._numPosted = 0
+        self._numCoalesced = 0
+        self._numDropped = 0
+        self._numDispatched = 0
+        self._numErrors = 0
+        self._maxPendingSeen = 0
+
+    def post(self, symbol, stockData=None):
+        """Queue data for a symbol - never blocks on the handler, safe to call from any thread"""
+        with self._condition:
+            self._numPosted += 1
+            if symbol in self._pending:
+                self._pending[symbol] = stockData
+                self._numCoalesced += 1
+                return
+            if len(self._pending) >= self._maxPending:
+                self._pending.popitem(last=False)
+                self._numDropped += 1
+            self._pending[symbol] = stockData
+            if len(self._pending) > self._maxPendingSeen:
+                self._maxPendingSeen = len(self._pending)
+            # Providers can post before the manager is started (Google starts polling on creation)
+            self._startThreadLocked()
+            self._condition.notify()
+
+    def start(self):
+        """Allow dispatching again after stop() - the thread itself starts on the first post"""
+        with self._condition:
+            self._stopping = False
+            if self._pending:
+                self._startThreadLocked()
+
+    def _startThreadLocked(self):
+        if self._dispatchThread is None and not self._stopping:
+            self._dispatchThread = threading.Thread(target=self._dispatchLoop, name=self._name, daemon=True)
+            self._dispatchThread.start()
+
+    def stop(self, timeoutSecs=5.0):
+        """Dispatch what is waiting and stop the dispatcher thread - later posts are kept until start()"""
+        with self._condition:
+            self._stopping = True
+            thread = self._dispatchThread
+            self._condition.notify()
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeoutSecs)
+        with self._condition:
+            # A dispatcher still in a slow handler is kept (it exits by itself, or carries on
+            # after start()) so there is never a second one calling the handler
+            if thread is not None and self._dispatchThread is thread and not thread.is_alive():
+                self._dispatchThread = None
+
+    def flush(self, timeoutSecs=5.0):
+        """Wait until everything posted so far has been handled - returns False on timeout"""
+        with self._condition:
+            return self._condition.wait_for(lambda: not self._pending and not self._dispatching, timeoutSecs)
+
+    def getNumPending(self):
+        with self._condition:
+            return len(self._pending)
+
+    def getStats(self):
+        with self._condition:
+            return {"posted": self._numPosted, "dispatched": self._numDispatched, "coalesced": self._numCoalesced,
+                    "dropped": self._numDropped, "errors": self._numErrors, "pending": len(self._pending),
+                    "maxPending": self._maxPendingSeen}
+
+    def _dispatchLoop(self):
+        while True:
+            with self._condition:
+                while not self._pending and not self._stopping:
+                    self._condition.wait()
+                if not self._pending:
+                    # Stopping and nothing left - a later post or start() starts a new dispatcher
+                    if self._dispatchThread is threading.current_thread():
+                        self._dispatchThread = None
+                    self._condition.notify_all()
+                    return
+                # Take the whole batch - posts during the handler calls start the next one
+                batch = self._pending
+                self._pending = OrderedDict()
+                self._dispatching = True
+            for symbol, stockData in batch.items():
+                try:
+                    self._handler(symbol, stockData)
+                except Exception:
+                    self._numErrors += 1
+                    logger.exception("%s: handler failed for %s", self._name, symbol)
+            with self._condition:
+                self._numDispatched += len(batch)
+                self._dispatching = False
+                self._condition.notify_all()
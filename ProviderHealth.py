@@ -0,0 +1,119 @@
+"""
+Per-symbol health of the stock data providers.
+StockProviderManager records a failure when a provider can't supply a symbol
+and moves the symbol down its fallback chain. A provider that failed is left
+alone for that symbol with an exponential backoff (doubling per consecutive
+failure, capped), after which the manager re-probes it by moving the symbol
+back. A probe that yields no valid quote within a timeout counts as a failure.
+"""
+
+import threading
+import time
+
+class _ProviderHealthState:
+    __slots__ = ("failures", "lastFailureTime", "nextProbeTime", "probeStartTime")
+
+    def __init__(self):
+        self.failures = 0
+        self.lastFailureTime = None
+        self.nextProbeTime = None
+        self.probeStartTime = None
+
+class ProviderHealth:
+    """Consecutive failures and re-probe backoff per (symbol, provider)"""
+
+    DEFAULT_BASE_BACKOFF_SECS = 60.0
+    DEFAULT_MAX_BACKOFF_SECS = 3600.0
+
+    def __init__(self, baseBackoffSecs=DEFAULT_BASE_BACKOFF_SECS, maxBackoffSecs=DEFAULT_MAX_BACKOFF_SECS):
+        self._lock = threading.Lock()
+        self._baseBackoffSecs = max(float(baseBackoffSecs), 0.0)
+        self._maxBackoffSecs = max(float(maxBackoffSecs), self._baseBackoffSecs)
+        # symbol -> {provider name -> _ProviderHealthState} - only for symbols with failures or probes
+        self._records = {}
+        self._numFailures = 0
+        self._numProbes = 0
+        self._numRecoveries = 0
+
+    @classmethod
+    def fromConfig(cls, configIni):
+        return cls(configIni.getFloat("PROVIDER_REPROBE_BASE_SECS", cls.DEFAULT_BASE_BACKOFF_SECS),
+                   configIni.getFloat("PROVIDER_REPROBE_MAX_SECS", cls.DEFAULT_MAX_BACKOFF_SECS))
+
+    def getBackoffSecs(self, failures):
+        """Backoff after a number of consecutive failures"""
+        if failures <= 0:
+            return 0.0
+        return min(self._baseBackoffSecs * (2 ** min(failures - 1, 32)), self._maxBackoffSecs)
+
+    def recordFailure(self, symbol, provider, now=None):
+        """Record a failure - returns the time until the provider may be re-probed for the symbol"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            state = self._records.setdefault(symbol, {}).get(provider)
+            if state is None:
+                state = self._records[symbol][provider] = _ProviderHealthState()
+            state.failures += 1
+            state.lastFailureTime = now
+            state.probeStartTime = None
+            backoffSecs = self.getBackoffSecs(state.failures)
+            state.nextProbeTime = now + backoffSecs
+            self._numFailures += 1
+            return backoffSecs
+
+    def recordSuccess(self, symbol, provider):
+        """Valid data received - clears the failures (called for every quote so kept cheap)"""
+        providerStates = self._records.get(symbol)
+        if not providerStates or provider not in providerStates:
+            return
+        with self._lock:
+            providerStates = self._records.get(symbol)
+            if providerStates is None or providerStates.pop(provider, None) is None:
+                return
+            if not providerStates:
+                del self._records[symbol]
+            self._numRecoveries += 1
+
+    def isBackingOff(self, symbol, provider, now=None):
+        """True if the provider failed for the symbol and its backoff hasn't expired"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            state = self._records.get(symbol, {}).get(provider)
+            return state is not None and state.nextProbeTime is not None and now < state.nextProbeTime
+
+    def startProbe(self, symbol, provider, now=None):
+        """Record that the symbol has been moved back to the provider to try it again"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            state = self._records.setdefault(symbol, {}).get(provider)
+            if state is None:
+                state = self._records[symbol][provider] = _ProviderHealthState()
+            state.probeStartTime = now
+            self._numProbes += 1
+
+    def getExpiredProbes(self, timeoutSecs, now=None):
+        """(symbol, provider) of probes that have had no valid data for timeoutSecs"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            return [(symbol, provider) for symbol, providerStates in self._records.items()
+                    for provider, state in providerStates.items()
+                    if state.probeStartTime is not None and now - state.probeStartTime >= timeoutSecs]
+
+    def getFailures(self, symbol, provider):
+        with self._lock:
+            state = self._records.get(symbol, {}).get(provider)
+            return 0 if state is None else state.failures
+
+    def forget(self, symbol):
+        """Drop the record for a symbol no longer monitored"""
+        with self._lock:
+            self._records.pop(symbol, None)
+
+    def getStats(self, now=None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            states = [state for providerStates in self._records.values() for state in providerStates.values()]
+            return {"symbolsWithFailures": len(self._records),
+                    "backingOff": sum(1 for state in states if state.nextProbeTime is not None and now < state.nextProbeTime),
+                    "probing": sum(1 for state in states if state.probeStartTime is not None),
+                    "failures": self._numFailures, "probes": self._numProbes, "recoveries": self._numRecoveries}
@@ -0,0 +1,106 @@
+"""
+Stock data provider classes by provider name (as used in
+STOCK_PROVIDER_FALLBACK_CHAIN). A provider's module is only imported the
+first time its class is asked for, so providers that aren't in the chain -
+and their dependencies, such as ibapi for interactive_brokers - never load.
+
+Besides the built-in providers, third-party providers (StockProvider
+subclasses) are registered without editing the app, either by an installed
+package's entry point in the "qtstockticker.providers" group:
+
+    [project.entry-points."qtstockticker.providers"]
+    my_feed = "my_package.my_feed:MyFeedProvider"
+
+or in config.ini:
+
+    STOCK_PROVIDER_PLUGINS=my_feed=my_feed_module:MyFeedProvider
+"""
+
+import importlib
+import threading
+import logging
+from StockProvider import StockProvider
+
+logger = logging.getLogger("StockTickerLogger")
+
+class ProviderRegistry:
+    """Provider name -> (module, class), imported on demand"""
+
+    ENTRY_POINT_GROUP = "qtstockticker.providers"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._specs = {}
+        self._classes = {}
+
+    def register(self, name, moduleName, className):
+        """Register a provider class by module and class name - nothing is imported yet"""
+        with self._lock:
+            self._specs[name] = (moduleName, className)
+            self._classes.pop(name, None)
+
+    def registerSpec(self, name, spec):
+        """Register a provider from a "module:Class" spec"""
+        moduleName, sep, className = spec.partition(":")
+        if not sep or not moduleName.strip() or not className.strip():
+            raise ValueError(f"ProviderRegistry: provider {name} spec {spec} is not module:Class")
+        self.register(name, moduleName.strip(), className.strip())
+
+    def loadPlugins(self, configIni=None):
+        """Register third-party providers from installed entry points and STOCK_PROVIDER_PLUGINS"""
+        # Only needed when the providers are created - not imported at startup
+        import importlib.metadata
+        for entryPoint in importlib.metadata.entry_points(group=self.ENTRY_POINT_GROUP):
+            try:
+                self.registerSpec(entryPoint.name, entryPoint.value)
+                logger.info(f"ProviderRegistry: registered {entryPoint.name} from entry point {entryPoint.value}")
+            except ValueError as excp:
+                logger.error(str(excp))
+        if configIni is None:
+            return
+        for plugin in configIni.getList("STOCK_PROVIDER_PLUGINS"):
+            name, sep, spec = plugin.partition("=")
+            try:
+                if not sep:
+                    raise ValueError(f"ProviderRegistry: STOCK_PROVIDER_PLUGINS entry {plugin} is not name=module:Class")
+                self.registerSpec(name.strip(), spec)
+                logger.info(f"ProviderRegistry: registered {name.strip()} from config {spec.strip()}")
+            except ValueError as excp:
+                logger.error(str(excp))
+
+    def getNames(self):
+        with self._lock:
+            return list(self._specs.keys())
+
+    def isRegistered(self, name):
+        with self._lock:
+            return name in self._specs
+
+    def isLoaded(self, name):
+        with self._lock:
+            return name in self._classes
+
+    def getProviderClass(self, name):
+        """
+        The provider's class, importing its module if needed - raises KeyError if not
+        registered and TypeError if the class isn't a StockProvider
+        """
+        with self._lock:
+            providerClass = self._classes.get(name)
+            if providerClass is not None:
+                return providerClass
+            moduleName, className = self._specs[name]
+            module = importlib.import_module(moduleName)
+            providerClass = getattr(module, className)
+            if not (isinstance(providerClass, type) and issubclass(providerClass, StockProvider)):
+                raise TypeError(f"ProviderRegistry: {moduleName}.{className} for {name} is not a StockProvider")
+            self._classes[name] = providerClass
+            logger.debug(f"ProviderRegistry: loaded {name} from {moduleName}")
+            return providerClass
+
+# Shared registry of the built-in providers
+providerRegistry = ProviderRegistry()
+providerRegistry.register("test", "StockValues_Test", "StockValues_Test")
+providerRegistry.register("yahoo_api", "StockValues_YahooAPI", "StockValues_YahooAPI")
+providerRegistry.register("interactive_brokers", "StockValues_InteractiveBrokers", "StockValues_InteractiveBrokers")
+providerRegistry.register("google", "StockValues_Google", "StockValues_Google")
@@ -0,0 +1,87 @@
+"""
+Last-known quotes snapshot so the tables can be filled as soon as the app
+starts rather than waiting for each provider's first pass. The snapshot is
+a small JSON file written atomically (temp file then rename) so a crash
+mid-write never leaves a truncated file behind.
+"""
+
+import os
+import json
+import time
+import datetime
+import logging
+
+logger = logging.getLogger("StockTickerLogger")
+
+class QuoteSnapshot:
+    """Save and load the contents of a QuoteStore"""
+
+    FORMAT_VERSION = 1
+
+    def __init__(self, fileName="quoteSnapshot.json"):
+        self._fileName = fileName
+        self._savedStoreVersion = None
+
+    def getFileName(self):
+        return self._fileName
+
+    def save(self, quoteStore):
+        """Write quotes that have a price - skipped if nothing changed since the last save"""
+        storeVersion = quoteStore.getVersion()
+        if storeVersion == self._savedStoreVersion:
+            return False
+        quotes = {}
+        for symbol in quoteStore.getSymbols():
+            quote = quoteStore.getQuote(symbol)
+            if quote is None or 'price' not in quote:
+                continue
+            if isinstance(quote.get('time'), datetime.datetime):
+                quote['time'] = quote['time'].timestamp()
+            quotes[symbol] = quote
+        snapshot = {'version': self.FORMAT_VERSION, 'savedAt': time.time(), 'quotes': quotes}
+        tmpFileName = self._fileName + ".tmp"
+        try:
+            dirName = os.path.dirname(self._fileName)
+            if dirName:
+                os.makedirs(dirName, exist_ok=True)
+            with open(tmpFileName, "w") as f:
+                json.dump(snapshot, f, default=str)
+            os.replace(tmpFileName, self._fileName)
+        except OSError as e:
+            logger.warning(f"QuoteSnapshot: failed to save {self._fileName}: {e}")
+            return False
+        self._savedStoreVersion = storeVersion
+        logger.debug(f"QuoteSnapshot: saved {len(quotes)} quotes to {self._fileName}")
+        return True
+
+    def load(self):
+        """Quotes from the snapshot as {symbol: quote dict} - empty if missing or unreadable"""
+        try:
+            with open(self._fileName, "r") as f:
+                snapshot = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"QuoteSnapshot: failed to load {self._fileName}: {e}")
+            return {}
+        if not isinstance(snapshot, dict) or snapshot.get('version') != self.FORMAT_VERSION:
+            logger.warning(f"QuoteSnapshot: ignoring {self._fileName} - unknown format")
+            return {}
+        quotes = snapshot.get('quotes', {})
+        return quotes if isinstance(quotes, dict) else {}
+
+    def loadInto(self, quoteStore):
+        """
+        Load the snapshot into a QuoteStore with failCount set so the values show
+        as stale until a provider refreshes them. Returns the symbols loaded
+        """
+        loaded = []
+        for symbol, quote in self.load().items():
+            if not isinstance(quote, dict) or 'price' not in quote:
+                continue
+            quote['failCount'] = max(int(quote.get('failCount') or 0), 1)
+            quoteStore.update(symbol, quote)
+            loaded.append(symbol)
+        self._savedStoreVersion = quoteStore.getVersion()
+        logger.info(f"QuoteSnapshot: loaded {len(loaded)} last-known quotes from {self._fileName}")
+        return loaded
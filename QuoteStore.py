@@ -0,0 +1,216 @@
+"""
+Columnar quote store shared between the provider manager and the UI.
+Numeric quote fields live in typed array.array columns indexed by a
+symbol -> row map, and every row carries a version number that moves
+whenever the row's values change. Readers can take zero-copy memoryviews
+of a column or ask which rows changed since the versions they last saw,
+rather than copying a dict per symbol on every UI tick.
+"""
+
+import threading
+import datetime
+import math
+from array import array
+
+class QuoteStore:
+    """Typed, versioned per-symbol quote columns"""
+
+    # Numeric columns (stored as doubles, NaN = not supplied)
+    FLOAT_FIELDS = ("price", "change", "chg_percent", "volume", "open", "high", "low", "close", "time")
+    # failCount is kept as a signed integer column
+    INT_FIELDS = ("failCount",)
+    # Fields not used when deciding whether a row has changed
+    UNVERSIONED_FIELDS = ("time",)
+
+    INITIAL_CAPACITY = 64
+
+    def __init__(self, initialCapacity=INITIAL_CAPACITY):
+        self._lock = threading.Lock()
+        self._rowBySymbol = {}
+        self._symbols = []
+        self._capacity = max(int(initialCapacity), 1)
+        self._columns = {}
+        for field in self.FLOAT_FIELDS:
+            self._columns[field] = array("d", [math.nan]) * self._capacity
+        for field in self.INT_FIELDS:
+            self._columns[field] = array("q", [0]) * self._capacity
+        self._rowVersions = array("Q", [0]) * self._capacity
+        # Non-numeric values (name, currency etc) per row
+        self._extras = []
+        self._version = 0
+
+    def numRows(self):
+        with self._lock:
+            return len(self._symbols)
+
+    def getSymbols(self):
+        with self._lock:
+            return list(self._symbols)
+
+    def getRow(self, symbol):
+        """Row index of a symbol, None if the store has never seen it"""
+        with self._lock:
+            return self._rowBySymbol.get(symbol)
+
+    def hasSymbol(self, symbol):
+        with self._lock:
+            return symbol in self._rowBySymbol
+
+    def getVersion(self):
+        """Store-wide version - the highest row version handed out so far"""
+        with self._lock:
+            return self._version
+
+    def getRowVersion(self, symbol):
+        """Version of a symbol's row (0 if unknown) - changes whenever its values change"""
+        with self._lock:
+            row = self._rowBySymbol.get(symbol)
+            return 0 if row is None else self._rowVersions[row]
+
+    def getSymbolsChangedSince(self, version):
+        """Symbols whose rows have changed after the given store version"""
+        with self._lock:
+            return [sym for row, sym in enumerate(self._symbols) if self._rowVersions[row] > version]
+
+    def update(self, symbol, values):
+        """Write a quote dict for a symbol - returns True if any versioned value changed"""
+        with self._lock:
+            row = self._rowBySymbol.get(symbol)
+            if row is None:
+                row = self._addRow(symbol)
+            changed = False
+            extras = self._extras[row]
+            for key, val in values.items():
+                column = self._columns.get(key)
+                if column is None:
+                    if extras.get(key, self) != val:
+                        extras[key] = val
+                        changed = True
+                    continue
+                newVal = self._toColumnValue(key, val)
+                oldVal = column[row]
+                if oldVal == newVal or (newVal != newVal and oldVal != oldVal):
+                    continue
+                column[row] = newVal
+                if key not in self.UNVERSIONED_FIELDS:
+                    changed = True
+            if changed:
+                self._version += 1
+                self._rowVersions[row] = self._version
+            return changed
+
+    def remove(self, symbol):
+        """Clear a symbol's values - the row is kept so row indices stay stable"""
+        with self._lock:
+            row = self._rowBySymbol.get(symbol)
+            if row is None:
+                return
+            for field in self.FLOAT_FIELDS:
+                self._columns[field][row] = math.nan
+            for field in self.INT_FIELDS:
+                self._columns[field][row] = 0
+            self._extras[row] = {}
+            self._version += 1
+            self._rowVersions[row] = self._version
+
+    def getValue(self, symbol, field, default=None):
+        """Single field for a symbol without building a dict"""
+        with self._lock:
+            row = self._rowBySymbol.get(symbol)
+            if row is None:
+                return default
+            return self._readField(row, field, default)
+
+    def getQuote(self, symbol):
+        """Quote as a new dict (same shape the providers produce), None if unknown or empty"""
+        with self._lock:
+            row = self._rowBySymbol.get(symbol)
+            if row is None:
+                return None
+            quote = dict(self._extras[row])
+            for field in self.FLOAT_FIELDS:
+                val = self._readField(row, field, None)
+                if val is not None:
+                    quote[field] = val
+            for field in self.INT_FIELDS:
+                quote[field] = self._columns[field][row]
+            if len(quote) == 1 and quote["failCount"] == 0:
+                return None
+            return quote
+
+    def getColumnView(self, field):
+        """
+        Read-only, zero-copy view of a numeric column (one entry per row, NaN if
+        not supplied). Growing the store reallocates the columns, after which an
+        older view is safe to read but no longer updated - take a fresh view when
+        numRows() changes
+        """
+        with self._lock:
+            return memoryview(self._columns[field]).toreadonly()[:len(self._symbols)]
+
+    def getRowVersionsView(self):
+        """Read-only, zero-copy view of per-row versions"""
+        with self._lock:
+            return memoryview(self._rowVersions).toreadonly()[:len(self._symbols)]
+
+    def _addRow(self, symbol):
+        """Append a row, growing the columns if full - caller must hold the lock"""
+        row = len(self._symbols)
+        if row >= self._capacity:
+            self._grow(self._capacity * 2)
+        self._rowBySymbol[symbol] = row
+        self._symbols.append(symbol)
+        self._extras.append({})
+        return row
+
+    def _grow(self, newCapacity):
+        # Columns are reallocated rather than resized in place as arrays can't be
+        # resized while a reader holds a memoryview - existing views keep the old buffer
+        extra = newCapacity - self._capacity
+        for field, column in self._columns.items():
+            newColumn = array(column.typecode, column)
+            newColumn.extend(array(column.typecode, [math.nan if column.typecode == "d" else 0]) * extra)
+            self._columns[field] = newColumn
+        newVersions = array("Q", self._rowVersions)
+        newVersions.extend(array("Q", [0]) * extra)
+        self._rowVersions = newVersions
+        self._capacity = newCapacity
+
+    def _readField(self, row, field, default):
+        column = self._columns.get(field)
+        if column is None:
+            return self._extras[row].get(field, default)
+        val = column[row]
+        if column.typecode == "d" and val != val:
+            return default
+        if field == "time":
+            return datetime.datetime.fromtimestamp(val, tz=datetime.timezone.utc)
+        return val
+
+    def _toColumnValue(self, field, val):
+        if field in self.INT_FIELDS:
+            try:
+                return int(val)
+            except (TypeError, ValueError):
+                return 0
+        if field == "time" and isinstance(val, datetime.datetime):
+            return val.timestamp()
+        numVal = self.toFloat(val)
+        return math.nan if numVal is None else numVal
+
+    @staticmethod
+    def toFloat(value):
+        """Convert a quote value (number or text such as "1,234.5" or "1.2M") to float, None if not numeric"""
+        if value is None or isinstance(value, bool):
+            return None
+        if isinstance(value, (int, float)):
+            return float(value)
+        try:
+            valStr = str(value).replace(",", "").strip()
+            mult = 1.0
+            if valStr.endswith("M"):
+                valStr = valStr[:-1]
+                mult = 1000000.0
+            return float(valStr) * mult
+        except ValueError:
+            return None
@@ -0,0 +1,159 @@
+"""
+Token-bucket rate limiter shared by the HTTP-based stock providers.
+Each provider acquires a token before every request so that requests are
+spread over the configured quota rather than being paced by fixed sleeps.
+The limiter backs off when the server answers HTTP 429 / Retry-After.
+"""
+
+import threading
+import time
+import logging
+import datetime
+from email.utils import parsedate_to_datetime
+
+logger = logging.getLogger("StockTickerLogger")
+
+class TokenBucketRateLimiter:
+    """Token bucket allowing requestsPerMinute on average with bursts of up to burst requests"""
+
+    # On a 429 the effective rate is multiplied by this factor (never below MIN_RATE_FRACTION
+    # of the configured rate) and then recovers by RECOVERY_FRACTION per successful request
+    BACKOFF_FACTOR = 0.5
+    MIN_RATE_FRACTION = 0.1
+    RECOVERY_FRACTION = 0.05
+
+    # Longest single wait so abortCheck is polled regularly
+    MAX_WAIT_SLICE_SECS = 1.0
+
+    def __init__(self, name, requestsPerMinute, burst=1):
+        self.name = name
+        self._lock = threading.Lock()
+        self._configuredRpm = 0.0
+        self._effectiveRpm = 0.0
+        self._burst = 1
+        self._tokens = 0.0
+        self._lastRefill = time.monotonic()
+        self._blockedUntil = 0.0
+        self._acquiredCount = 0
+        self._rateLimitedCount = 0
+        self.setRate(requestsPerMinute, burst)
+
+    @classmethod
+    def fromConfig(cls, configIni, prefix, defaultRequestsPerMinute, defaultBurst):
+        """Create a limiter from <prefix>_REQUESTS_PER_MINUTE and <prefix>_REQUEST_BURST settings"""
+        rpm = configIni.getFloat(prefix + "_REQUESTS_PER_MINUTE", defaultRequestsPerMinute)
+        burst = configIni.getInt(prefix + "_REQUEST_BURST", defaultBurst)
+        return cls(prefix.lower(), rpm, burst)
+
+    def setRate(self, requestsPerMinute, burst=1):
+        """Change the configured quota - the bucket starts full"""
+        with self._lock:
+            self._configuredRpm = max(float(requestsPerMinute), 0.001)
+            self._effectiveRpm = self._configuredRpm
+            self._burst = max(int(burst), 1)
+            self._tokens = float(self._burst)
+            self._lastRefill = time.monotonic()
+        logger.debug(f"TokenBucketRateLimiter {self.name}: {requestsPerMinute} requests/min, burst {burst}")
+
+    def acquire(self, timeoutSecs=None, abortCheck=None):
+        """
+        Wait for a token. Returns True when acquired, False on timeout or if
+        abortCheck() returns True while waiting (e.g. the provider is stopping)
+        """
+        deadline = None if timeoutSecs is None else time.monotonic() + timeoutSecs
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self._blockedUntil and self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    self._acquiredCount += 1
+                    return True
+                if now < self._blockedUntil:
+                    waitSecs = self._blockedUntil - now
+                else:
+                    waitSecs = (1.0 - self._tokens) * 60.0 / self._effectiveRpm
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                waitSecs = min(waitSecs, remaining)
+            if abortCheck is not None and abortCheck():
+                return False
+            time.sleep(min(waitSecs, self.MAX_WAIT_SLICE_SECS))
+
+    def tryAcquire(self):
+        """Take a token if one is available now without waiting"""
+        return self.acquire(timeoutSecs=0)
+
+    def notifyRateLimited(self, retryAfter=None):
+        """
+        Called when the server rejected a request with HTTP 429. retryAfter is the
+        Retry-After header value (seconds or an HTTP date) if the server sent one
+        """
+        retryAfterSecs = self.parseRetryAfter(retryAfter)
+        with self._lock:
+            now = time.monotonic()
+            self._rateLimitedCount += 1
+            self._effectiveRpm = max(self._effectiveRpm * self.BACKOFF_FACTOR,
+                                     self._configuredRpm * self.MIN_RATE_FRACTION)
+            if retryAfterSecs is None:
+                retryAfterSecs = 60.0 / self._effectiveRpm
+            self._blockedUntil = max(self._blockedUntil, now + retryAfterSecs)
+            self._tokens = 0.0
+            self._lastRefill = now
+            effectiveRpm = self._effectiveRpm
+        logger.warning(f"TokenBucketRateLimiter {self.name}: rate limited, pausing {retryAfterSecs:.1f}s, "
+                       f"rate now {effectiveRpm:.2f} requests/min")
+
+    def notifySuccess(self):
+        """Called after a request succeeded - lets a backed-off rate recover gradually"""
+        with self._lock:
+            if self._effectiveRpm < self._configuredRpm:
+                self._effectiveRpm = min(self._configuredRpm,
+                                         self._effectiveRpm + self._configuredRpm * self.RECOVERY_FRACTION)
+
+    def notifyResponse(self, statusCode, retryAfter=None):
+        """Convenience to report a response status - returns True if it was a rate limit rejection"""
+        if statusCode == 429:
+            self.notifyRateLimited(retryAfter)
+            return True
+        if statusCode is not None and statusCode < 400:
+            self.notifySuccess()
+        return False
+
+    def getEffectiveRequestsPerMinute(self):
+        with self._lock:
+            return self._effectiveRpm
+
+    def getStats(self):
+        with self._lock:
+            return {
+                "name": self.name,
+                "configuredRpm": self._configuredRpm,
+                "effectiveRpm": self._effectiveRpm,
+                "burst": self._burst,
+                "acquired": self._acquiredCount,
+                "rateLimited": self._rateLimitedCount,
+            }
+
+    @staticmethod
+    def parseRetryAfter(retryAfter):
+        """Convert a Retry-After header value to seconds (None if absent or unparseable)"""
+        if retryAfter is None or retryAfter == "":
+            return None
+        try:
+            return max(float(retryAfter), 0.0)
+        except (TypeError, ValueError):
+            pass
+        try:
+            retryTime = parsedate_to_datetime(str(retryAfter))
+            return max((retryTime - datetime.datetime.now(datetime.timezone.utc)).total_seconds(), 0.0)
+        except (TypeError, ValueError):
+            return None
+
+    def _refill(self, now):
+        elapsed = now - self._lastRefill
+        if elapsed > 0:
+            self._tokens = min(float(self._burst), self._tokens + elapsed * self._effectiveRpm / 60.0)
+            self._lastRefill = now
@@ -0,0 +1,97 @@
+"""
+Staged startup for the ticker window. Slow startup work (hosted config over
+FTP/HTTP, scraping the symbol universe, creating the providers) runs on
+worker threads while the window is shown from local caches. Results are
+delivered back to the Qt thread with signals, and each phase is timed so a
+startup report can be logged.
+"""
+
+import threading
+import time
+import logging
+from contextlib import contextmanager
+from PySide6 import QtCore
+
+logger = logging.getLogger("StockTickerLogger")
+
+class StartupTimings:
+    """Durations of the named startup phases, in the order they started"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._createdTime = time.perf_counter()
+        self._phases = {}
+
+    def start(self, phaseName):
+        with self._lock:
+            self._phases[phaseName] = [time.perf_counter(), None, threading.current_thread().name]
+
+    def finish(self, phaseName):
+        with self._lock:
+            if phaseName in self._phases:
+                self._phases[phaseName][1] = time.perf_counter()
+
+    @contextmanager
+    def timePhase(self, phaseName):
+        self.start(phaseName)
+        try:
+            yield
+        finally:
+            self.finish(phaseName)
+
+    def getDurations(self):
+        """List of (phaseName, startOffsetSecs, durationSecs or None if unfinished, threadName)"""
+        with self._lock:
+            return [(name, startTime - self._createdTime, None if endTime is None else endTime - startTime, threadName)
+                    for name, (startTime, endTime, threadName) in self._phases.items()]
+
+    def getReport(self):
+        lines = ["Startup timings:"]
+        for name, startOffset, duration, threadName in self.getDurations():
+            durationStr = "unfinished" if duration is None else f"{duration * 1000:8.1f} ms"
+            lines.append(f"  {name:24s} {durationStr}  (at {startOffset * 1000:8.1f} ms on {threadName})")
+        lines.append(f"  {'total':24s} {(time.perf_counter() - self._createdTime) * 1000:8.1f} ms")
+        return "\n".join(lines)
+
+class StartupLoader(QtCore.QObject):
+    """Runs startup tasks on worker threads and signals their results to the Qt thread"""
+
+    # phaseName, result of the task function
+    taskFinished = QtCore.Signal(str, object)
+    # phaseName, error text
+    taskFailed = QtCore.Signal(str, str)
+    # Emitted once no background tasks are outstanding
+    allTasksFinished = QtCore.Signal()
+
+    def __init__(self, timings=None, parent=None):
+        super().__init__(parent)
+        self.timings = timings if timings is not None else StartupTimings()
+        self._lock = threading.Lock()
+        self._outstandingTasks = 0
+
+    def runInBackground(self, phaseName, taskFunction, *args):
+        """Run taskFunction(*args) on a worker thread timed as phaseName"""
+        with self._lock:
+            self._outstandingTasks += 1
+        workerThread = threading.Thread(target=self._runTask, args=(phaseName, taskFunction, args),
+                                        name="Startup-" + phaseName, daemon=True)
+        workerThread.start()
+        return workerThread
+
+    def numOutstandingTasks(self):
+        with self._lock:
+            return self._outstandingTasks
+
+    def _runTask(self, phaseName, taskFunction, args):
+        try:
+            with self.timings.timePhase(phaseName):
+                result = taskFunction(*args)
+            self.taskFinished.emit(phaseName, result)
+        except Exception as excp:
+            logger.error(f"StartupLoader: {phaseName} failed: {excp}")
+            self.taskFailed.emit(phaseName, str(excp))
+        with self._lock:
+            self._outstandingTasks -= 1
+            allDone = self._outstandingTasks == 0
+        if allDone:
+            self.allTasksFinished.emit()
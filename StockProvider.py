@@ -0,0 +1,88 @@
+"""
+Common interface of the stock data providers used by StockProviderManager.
+
+A provider is created by its fromConfig() classmethod and then:
+    subscribe/unsubscribe   - change the symbols it fetches (only the differences)
+    getStockData            - snapshot of the latest data for a symbol
+    setCallback/start/stop  - stream of updates, the callback being given the symbol
+                              (and optionally the data) each time a value changes
+    getMarketOpenStatus/getHealth - health and status for display and diagnostics
+
+The optional hooks (market-hours updating, holdings and visible symbols for
+poll scheduling) default to doing nothing. Third-party providers subclass this
+and are registered with ProviderRegistry (see ProviderRegistry.py).
+"""
+
+from abc import ABC, abstractmethod
+
+class StockProvider(ABC):
+    """Base class of stock data providers"""
+
+    @classmethod
+    def fromConfig(cls, configIni, callback):
+        """Create a provider configured from config.ini - override to read provider settings"""
+        provider = cls()
+        provider.setCallback(callback)
+        return provider
+
+    # Subscriptions
+
+    @abstractmethod
+    def subscribe(self, symbols):
+        """Start fetching symbols - those already subscribed are left alone"""
+
+    @abstractmethod
+    def unsubscribe(self, symbols):
+        """Stop fetching symbols and drop their data"""
+
+    def addStock(self, symbol):
+        """Add a single stock symbol (legacy method for compatibility)"""
+        self.subscribe([symbol])
+
+    # Snapshot
+
+    @abstractmethod
+    def getStockData(self, symbol):
+        """Latest data for a symbol (a copy) - None if nothing has been fetched yet"""
+
+    def getStockInfoData(self, symbol):
+        """Alternative name for getStockData (for compatibility)"""
+        return self.getStockData(symbol)
+
+    # Stream
+
+    @abstractmethod
+    def setCallback(self, callback):
+        """Set the function called with the symbol whenever a symbol's data changes"""
+
+    @abstractmethod
+    def start(self):
+        """Start fetching"""
+
+    @abstractmethod
+    def stop(self):
+        """Stop fetching"""
+
+    def run(self):
+        """Alias for start() for compatibility"""
+        self.start()
+
+    # Health
+
+    def getMarketOpenStatus(self):
+        return "Market Status Unknown"
+
+    def getHealth(self):
+        """Provider state for diagnostics, e.g. subscription count and rate limiter stats"""
+        return {}
+
+    # Optional hooks
+
+    def setOnlyUpdateWhenMarketOpen(self, onlyWhenOpen):
+        pass
+
+    def setHoldings(self, holdingsBySymbol):
+        pass
+
+    def setVisibleSymbols(self, visibleSymbols):
+        pass
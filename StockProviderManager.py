@@ -1,12 +1,26 @@
 import logging
 import threading
 import time
-from StockValues_YahooAPI import StockValues_YahooAPI
-from StockValues_InteractiveBrokers import StockValues_InteractiveBrokers
-from StockValues_Google import StockValues_Google
-from StockValues_Test import StockValues_Test
+from collections import namedtuple
+from ProviderRegistry import providerRegistry
+from StockProvider import StockProvider
+from ConfigIniFile import ConfigIniFile
+from QuoteStore import QuoteStore
+from TickHistory import TickHistory
+from QuoteSnapshot import QuoteSnapshot
+from LatencyTracker import latencyTracker
+from ProviderDispatchQueue import ProviderDispatchQueue
+from ProviderHealth import ProviderHealth
+from LogUtils import SampledLogger
 
 logger = logging.getLogger("StockTickerLogger")
+# Messages logged for every quote update are sampled
+tickLogger = SampledLogger(logger)
+
+# A provider's methods, resolved once when the providers are set rather than looked up per tick
+ProviderMethods = namedtuple("ProviderMethods", ["subscribe", "unsubscribe", "getStockData", "start", "stop",
+                                                 "getMarketOpenStatus", "getHealth", "setOnlyUpdateWhenMarketOpen",
+                                                 "setHoldings", "setVisibleSymbols"])
 
 class StockProviderManager:
     """
@@ -14,12 +28,24 @@ class StockProviderManager:
     Handles symbol routing and failover between Yahoo API, Interactive Brokers, and Google.
     """
     
-    def __init__(self, symbolChangedCallback, config_manager=None):
+    DEFAULT_FALLBACK_CHAIN = ["interactive_brokers", "yahoo_api", "google"]
+
+    # How often the last-known quotes snapshot is saved (0 = only on stop)
+    DEFAULT_SNAPSHOT_INTERVAL_SECS = 60
+
+    # How often the maintenance thread looks for symbols to move back up their chain
+    MAINTENANCE_INTERVAL_SECS = 5
+    # A provider being re-probed must supply a valid quote within this time
+    DEFAULT_PROBE_TIMEOUT_SECS = 600
+    
+    def __init__(self, symbolChangedCallback, config_manager=None, config_ini=None, deferProviderInit=False):
         self.symbolChangedCallback = symbolChangedCallback
         self.config_manager = config_manager
+        self.config_ini = config_ini if config_ini is not None else ConfigIniFile()
         self.lock = threading.Lock()
         
-        # Provider instances
+        # Provider instances (setting them resolves their methods into _providerMethods)
+        self._providerMethods = {}
         self.providers = {}
         self.provider_order = []
         self.unified_fallback_chain = []
@@ -28,11 +54,40 @@ class StockProviderManager:
         self.symbol_to_provider = {}  # symbol -> provider_name
         self.symbol_to_fallback_index = {}  # symbol -> current fallback index
         self.symbol_preferred_provider = {}  # symbol -> preferred provider from stock record
+
+        # Failures per symbol and provider - a symbol that fell back is moved back up its
+        # chain once the failed provider's backoff expires
+        self.providerHealth = ProviderHealth.fromConfig(self.config_ini)
+        self.probeTimeoutSecs = self.config_ini.getFloat("PROVIDER_PROBE_TIMEOUT_SECS", self.DEFAULT_PROBE_TIMEOUT_SECS)
         
-        # Stock data cache
-        self.stockData = {}
+        # Stock data cache - typed columns with a version per symbol
+        self.quoteStore = QuoteStore()
         self.dataUpdatedSinceLastUIUpdate = False
         
+        # Symbols changed since the UI last asked - filled by _providerSymbolChanged
+        # and swapped out atomically by getMapOfStocksChangedSinceUIUpdated
+        self._dictOfStocksChangedSinceUIUpdate = {}
+
+        # Providers post their ticks here and return at once - validation, caching and
+        # fallback run on the dispatcher thread with the latest data per symbol
+        self.dispatchQueue = ProviderDispatchQueue(self._providerSymbolChanged, self.config_ini.getInt(
+            "PROVIDER_DISPATCH_MAX_PENDING", ProviderDispatchQueue.DEFAULT_MAX_PENDING))
+
+        # Optional on-disk log of every quote change (off unless TICK_HISTORY_ENABLED)
+        self.tickHistory = TickHistory.fromConfig(self.config_ini)
+        if self.tickHistory is not None:
+            self.tickHistory.start()
+
+        # Last-known quotes are loaded before any provider starts so the tables fill
+        # immediately (shown as stale), and saved periodically and on stop
+        self.quoteSnapshot = None
+        self.snapshotIntervalSecs = self.config_ini.getFloat("QUOTE_SNAPSHOT_INTERVAL_SECS", self.DEFAULT_SNAPSHOT_INTERVAL_SECS)
+        if not self.config_ini.getBool("TEST_MODE", False):
+            self.quoteSnapshot = QuoteSnapshot(self.config_ini.getStr("QUOTE_SNAPSHOT_FILE", "quoteSnapshot.json"))
+            self._loadSnapshot()
+        self._maintenanceThread = None
+        self._maintenanceStopEvent = threading.Event()
+        
         # Market hours
         self.openhour = 8
         self.openmin = 0
@@ -43,79 +98,128 @@ class StockProviderManager:
         
         self.running = False
         
-        # Initialize providers and fallback chains
-        self._initializeProviders()
+        # Stock list and start request are remembered so that providers created
+        # later (deferProviderInit) pick them up
+        self._stockList = None
+        self._providersInitialized = False
+        self._providersStarted = False
+        self._startLock = threading.Lock()
+
+        # Initialize providers and fallback chains - provider constructors can block
+        # on the network so the UI can defer this to a worker thread
         self._loadFallbackConfig()
+        if not deferProviderInit:
+            self.initializeProviders()
+
+    def initializeProviders(self):
+        """Create the providers - then applies any stock list set and starts them if start() was called"""
+        if self._providersInitialized:
+            return
+        self._initializeProviders()
+        with self._startLock:
+            self._providersInitialized = True
+            startNow = self.running
+        with self.lock:
+            if self._stockList is not None:
+                self._assignStocksLocked()
+        if startNow:
+            self.start()
+
+    def providersInitialized(self):
+        return self._providersInitialized
+
+    @property
+    def providers(self):
+        return self._providers
+
+    @providers.setter
+    def providers(self, providers):
+        # Methods are published before the providers - readers look up a provider's methods by
+        # name after finding it in self.providers
+        self._providerMethods = {name: self._resolveProviderMethods(name, provider) for name, provider in providers.items()}
+        self._providers = providers
+
+    @staticmethod
+    def _resolveProviderMethods(provider_name, provider):
+        """Bound methods of a provider - for one not derived from StockProvider, missing ones are None"""
+        if not isinstance(provider, StockProvider):
+            logger.warning(f"Provider {provider_name} is not a StockProvider - only the methods it has are used")
+        getStockData = getattr(provider, 'getStockData', None) or getattr(provider, 'getStockInfoData', None)
+        start = getattr(provider, 'start', None) or getattr(provider, 'run', None)
+        return ProviderMethods(getattr(provider, 'subscribe', None), getattr(provider, 'unsubscribe', None), getStockData,
+                               start, getattr(provider, 'stop', None), getattr(provider, 'getMarketOpenStatus', None),
+                               getattr(provider, 'getHealth', None), getattr(provider, 'setOnlyUpdateWhenMarketOpen', None),
+                               getattr(provider, 'setHoldings', None), getattr(provider, 'setVisibleSymbols', None))
     
+    def _loadSnapshot(self):
+        """Fill the cache from the last-known quotes snapshot - values are marked stale via failCount"""
+        loadedSymbols = self.quoteSnapshot.loadInto(self.quoteStore)
+        with self.lock:
+            for symbol in loadedSymbols:
+                self._dictOfStocksChangedSinceUIUpdate[symbol] = True
+            if loadedSymbols:
+                self.dataUpdatedSinceLastUIUpdate = True
+
+    def saveSnapshot(self):
+        """Save the last-known quotes snapshot (no-op if nothing changed since the last save)"""
+        if self.quoteSnapshot is None:
+            return False
+        return self.quoteSnapshot.save(self.quoteStore)
+
+    def _maintenanceLoop(self):
+        """Background housekeeping while running - provider re-probes and periodic snapshot saves"""
+        lastSnapshotTime = time.monotonic()
+        while not self._maintenanceStopEvent.wait(self.MAINTENANCE_INTERVAL_SECS):
+            try:
+                now = time.monotonic()
+                self.reprobeProviders(now)
+                if self.snapshotIntervalSecs > 0 and now - lastSnapshotTime >= self.snapshotIntervalSecs:
+                    lastSnapshotTime = now
+                    self.saveSnapshot()
+            except Exception as e:
+                logger.error(f"StockProviderManager: maintenance failed: {e}")
+
     def _initializeProviders(self):
         """Initialize only the stock data providers that are needed based on fallback chain"""
-        
-        # Check if test mode is enabled
-        test_mode = self._readConfigValue("TEST_MODE", "false").lower() == "true"
-        
+        # Built up locally and published in one step as the UI thread may be reading self.providers
+        providers = {}
+        try:
+            self._createProviders(providers)
+        finally:
+            self.providers = providers
+
+    def _createProviders(self, providers):
+        """Create the providers in the fallback chain (or just the test provider) from the registry"""
+        test_mode = self.config_ini.getBool("TEST_MODE", False)
         if test_mode:
             logger.info("TEST_MODE enabled - using test provider only")
+            needed_providers = ['test']
+        else:
+            # Only the providers in the chain are imported and created
+            needed_providers = self.config_ini.getList("STOCK_PROVIDER_FALLBACK_CHAIN", self.DEFAULT_FALLBACK_CHAIN)
+            logger.info(f"Initializing only providers in fallback chain: {needed_providers}")
+            providerRegistry.loadPlugins(self.config_ini)
+
+        for provider_name in needed_providers:
+            if provider_name in providers:
+                continue
+            if not providerRegistry.isRegistered(provider_name):
+                logger.error(f"Unknown provider {provider_name} - registered providers are {providerRegistry.getNames()}")
+                continue
             try:
-                self.providers['test'] = StockValues_Test()
-                self.providers['test'].setCallback(self._providerSymbolChanged)
-                logger.info("Test provider initialized successfully")
-            except Exception as e:
-                logger.error(f"Failed to initialize Test provider: {e}")
-            return
-        
-        # Normal mode - get the fallback chain to determine which providers to initialize
-        fallback_chain_str = self._readConfigValue("STOCK_PROVIDER_FALLBACK_CHAIN", "interactive_brokers,yahoo_api,google")
-        needed_providers = [p.strip() for p in fallback_chain_str.split(',') if p.strip()]
-        
-        logger.info(f"Initializing only providers in fallback chain: {needed_providers}")
-        
-        # Initialize Yahoo API provider if needed
-        if 'yahoo_api' in needed_providers:
-            try:
-                self.providers['yahoo_api'] = StockValues_YahooAPI(self._providerSymbolChanged)
-                # Set API key and host if available
-                api_key = self._readConfigValue("YAHOO_FINANCE_API_KEY")
-                api_host = self._readConfigValue("YAHOO_API_HOST", "yahoo-finance15.p.rapidapi.com")
-                if api_key:
-                    self.providers['yahoo_api'].setApiKey(api_key)
-                if api_host:
-                    self.providers['yahoo_api'].setApiHost(api_host)
-                logger.info("Yahoo API provider initialized successfully")
-            except Exception as e:
-                logger.error(f"Failed to initialize Yahoo API provider: {e}")
-        
-        # Initialize Interactive Brokers provider if needed
-        if 'interactive_brokers' in needed_providers:
-            try:
-                self.providers['interactive_brokers'] = StockValues_InteractiveBrokers()
-                # Set the callback using the new setCallback method
-                def safe_callback(symbol, stock_data=None):
-                    try:
-                        logger.debug(f"StockProviderManager safe_callback called with symbol={symbol}, stock_data={type(stock_data)}")
-                        self._providerSymbolChanged(symbol, stock_data)
-                    except Exception as e:
-                        logger.error(f"Error in StockProviderManager callback: {e}")
-                        import traceback
-                        logger.error(traceback.format_exc())
-                
-                self.providers['interactive_brokers'].setCallback(safe_callback)
-                logger.info("Interactive Brokers provider initialized successfully")
-            except Exception as e:
-                logger.error(f"Failed to initialize Interactive Brokers provider: {e}")
-        
-        # Initialize Google provider if needed
-        if 'google' in needed_providers:
-            try:
-                self.providers['google'] = StockValues_Google(self._providerSymbolChanged)
-                logger.info("Google provider initialized successfully")
+                providerClass = providerRegistry.getProviderClass(provider_name)
+                # Provider threads post their ticks and return at once - handler exceptions
+                # are logged by the dispatcher thread
+                providers[provider_name] = providerClass.fromConfig(self.config_ini, self.dispatchQueue.post)
+                logger.info(f"Provider {provider_name} initialized successfully")
             except Exception as e:
-                logger.error(f"Failed to initialize Google provider: {e}")
-    
+                logger.error(f"Failed to initialize provider {provider_name}: {e}")
+
     def _loadFallbackConfig(self):
         """Load fallback configuration from config.ini"""
         
         # Check if test mode is enabled
-        test_mode = self._readConfigValue("TEST_MODE", "false").lower() == "true"
+        test_mode = self.config_ini.getBool("TEST_MODE", False)
         
         if test_mode:
             logger.info("TEST_MODE enabled - using test provider chain only")
@@ -124,8 +228,7 @@ class StockProviderManager:
             return
         
         # Normal mode - load unified fallback configuration
-        fallback_chain_str = self._readConfigValue("STOCK_PROVIDER_FALLBACK_CHAIN", "interactive_brokers,yahoo_api,google")
-        self.unified_fallback_chain = [p.strip() for p in fallback_chain_str.split(',') if p.strip()]
+        self.unified_fallback_chain = self.config_ini.getList("STOCK_PROVIDER_FALLBACK_CHAIN", self.DEFAULT_FALLBACK_CHAIN)
         
         # Use the unified fallback chain as the default provider order
         self.provider_order = self.unified_fallback_chain.copy()
@@ -134,128 +237,117 @@ class StockProviderManager:
         logger.info(f"Default provider order: {self.provider_order}")
     
     def _readConfigValue(self, key, default=""):
-        """Read value from config.ini"""
-        if not self.config_manager:
-            # Still try to read directly if no config_manager
-            pass
-        
-        try:
-            with open("privatesettings/config.ini", "r") as f:
-                for line in f:
-                    line = line.strip()
-                    # Skip comments and empty lines
-                    if not line or line.startswith('#'):
-                        continue
-                    # Check for exact key match
-                    if line.startswith(key + "="):
-                        return line.split("=", 1)[1].strip()
-        except Exception as e:
-            logger.debug(f"Could not read {key} from config.ini: {e}")
-        
-        return default
+        """Read value from config.ini (cached by the shared ConfigIniFile)"""
+        return self.config_ini.getStr(key, default)
     
     def setStocks(self, stockList):
         """
-        Set the list of stocks to monitor.
+        Set the list of stocks to monitor - only the differences from the current
+        list are subscribed to or unsubscribed from the providers.
         stockList can be either:
         1. List of symbol strings: ['AAPL', 'MSFT', 'GOOGL']
         2. List of stock dictionaries: [{'symbol': 'AAPL', 'stock_provider': 'yahoo_api'}, ...]
         """
         with self.lock:
-            # Clear previous assignments
-            self.symbol_to_provider.clear()
-            self.symbol_to_fallback_index.clear()
-            self.symbol_preferred_provider.clear()
-            
-            # Check if test mode is enabled
-            test_mode = self._readConfigValue("TEST_MODE", "false").lower() == "true"
-            
-            if test_mode and 'test' in self.providers:
-                # In test mode, assign all symbols to test provider
-                symbols = self._extractSymbols(stockList)
-                logger.info(f"TEST_MODE: Setting {len(symbols)} stocks on test provider")
-                self.providers['test'].setStocks(symbols)
-                for symbol in symbols:
-                    self.symbol_to_provider[symbol] = 'test'
-                    self.symbol_to_fallback_index[symbol] = 0
-            else:
-                # Normal mode - assign symbols based on stock_provider field and fallback chain
-                self._assignSymbolsToProviders(stockList)
-    
-    def _extractSymbols(self, stockList):
-        """Extract symbol strings from stock list (handles both string list and dict list)"""
-        symbols = []
-        for item in stockList:
-            if isinstance(item, str):
-                symbols.append(item)
-            elif isinstance(item, dict) and 'symbol' in item:
-                symbols.append(item['symbol'])
-        return symbols
-    
-    def _assignSymbolsToProviders(self, stockList):
-        """Assign symbols to providers based on stock_provider field and fallback chain"""
-        provider_symbols = {}  # provider_name -> list of symbols
-        
+            self._stockList = list(stockList)
+            # Assigned once the providers exist if creation has been deferred
+            if self._providersInitialized:
+                self._assignStocksLocked()
+
+    def _assignStocksLocked(self):
+        """
+        Bring provider subscriptions in line with the stock list - caller must hold self.lock.
+        Only symbols added, removed or given a different preferred provider are touched, so
+        the rest keep their provider, fallback position and the provider's cached data
+        """
+        wanted = self._parseStockList(self._stockList)
+
+        # Symbols no longer wanted, or whose preferred provider changed, leave their provider
+        provider_unsubscribes = {}  # provider_name -> list of symbols
+        for symbol in list(dict.fromkeys(list(self.symbol_to_provider) + list(self.symbol_preferred_provider))):
+            if symbol in wanted and wanted[symbol] == self.symbol_preferred_provider.get(symbol):
+                continue
+            provider_name = self.symbol_to_provider.get(symbol)
+            if provider_name is not None:
+                provider_unsubscribes.setdefault(provider_name, []).append(symbol)
+            self._forgetSymbolLocked(symbol)
+
+        # New symbols go to the first available provider in their chain
+        provider_subscribes = {}  # provider_name -> list of symbols
+        for symbol, preferred_provider in wanted.items():
+            if symbol in self.symbol_to_provider:
+                continue
+            provider_name = self._assignSymbolLocked(symbol, preferred_provider)
+            if provider_name is not None:
+                provider_subscribes.setdefault(provider_name, []).append(symbol)
+
+        # A symbol re-assigned to the provider it was already on needn't leave it
+        for provider_name in provider_unsubscribes.keys() & provider_subscribes.keys():
+            unchanged = set(provider_unsubscribes[provider_name]) & set(provider_subscribes[provider_name])
+            provider_unsubscribes[provider_name] = [symbol for symbol in provider_unsubscribes[provider_name] if symbol not in unchanged]
+            provider_subscribes[provider_name] = [symbol for symbol in provider_subscribes[provider_name] if symbol not in unchanged]
+        for provider_name, symbols in provider_unsubscribes.items():
+            self._callProvider(provider_name, 'unsubscribe', symbols)
+        for provider_name, symbols in provider_subscribes.items():
+            self._callProvider(provider_name, 'subscribe', symbols)
+
+    def _parseStockList(self, stockList):
+        """Map of symbol -> preferred provider (None if not given), in list order"""
+        wanted = {}
         for item in stockList:
-            # Extract symbol and preferred provider
             if isinstance(item, str):
-                symbol = item
-                preferred_provider = None
+                wanted[item] = None
             elif isinstance(item, dict) and 'symbol' in item:
-                symbol = item['symbol']
-                preferred_provider = item.get('stock_provider', '').strip()
-                if not preferred_provider:
-                    preferred_provider = None
+                preferred_provider = (item.get('stock_provider') or '').strip()
+                wanted[item['symbol']] = preferred_provider or None
             else:
-                logger.warn(f"Invalid stock item format: {item}")
-                continue
-            
-            # Store preferred provider if specified
-            if preferred_provider:
-                self.symbol_preferred_provider[symbol] = preferred_provider
-                logger.debug(f"Symbol {symbol} has preferred provider: {preferred_provider}")
-            
-            # Determine the fallback chain for this symbol
-            fallback_chain = self._getFallbackChainForSymbol(symbol, preferred_provider)
-            
-            # Try to assign to the first available provider in the chain
-            assigned = False
-            for provider_name in fallback_chain:
-                if provider_name in self.providers:
-                    try:
-                        # Add to provider's symbol list
-                        if provider_name not in provider_symbols:
-                            provider_symbols[provider_name] = []
-                        provider_symbols[provider_name].append(symbol)
-                        
-                        # Track assignment
-                        self.symbol_to_provider[symbol] = provider_name
-                        self.symbol_to_fallback_index[symbol] = fallback_chain.index(provider_name)
-                        
-                        logger.debug(f"Assigned symbol {symbol} to provider {provider_name} (index {self.symbol_to_fallback_index[symbol]} in chain {fallback_chain})")
-                        assigned = True
-                        break
-                    except Exception as e:
-                        logger.warn(f"Failed to assign {symbol} to {provider_name}: {e}")
-                        continue
-            
-            if not assigned:
-                logger.error(f"Could not assign symbol {symbol} to any provider")
-        
-        # Now call setStocks once per provider with their assigned symbols
-        for provider_name, symbols in provider_symbols.items():
-            try:
-                provider = self.providers[provider_name]
-                logger.info(f"Setting {len(symbols)} symbols on provider {provider_name}: {symbols}")
-                if hasattr(provider, 'setStocks'):
-                    provider.setStocks(symbols)
-                else:
-                    # Fallback for providers that don't have setStocks
-                    for symbol in symbols:
-                        if hasattr(provider, 'addStock'):
-                            provider.addStock(symbol)
-            except Exception as e:
-                logger.error(f"Failed to set stocks on provider {provider_name}: {e}")
+                logger.warning(f"Invalid stock item format: {item}")
+        return wanted
+
+    def _assignSymbolLocked(self, symbol, preferred_provider):
+        """Assign a symbol to the first available provider in its chain - returns the provider name or None"""
+        if preferred_provider:
+            self.symbol_preferred_provider[symbol] = preferred_provider
+            logger.debug(f"Symbol {symbol} has preferred provider: {preferred_provider}")
+        fallback_chain = self._getFallbackChainForSymbol(symbol, preferred_provider)
+        for index, provider_name in enumerate(fallback_chain):
+            if provider_name in self.providers:
+                self.symbol_to_provider[symbol] = provider_name
+                self.symbol_to_fallback_index[symbol] = index
+                logger.debug(f"Assigned symbol {symbol} to provider {provider_name} (index {index} in chain {fallback_chain})")
+                return provider_name
+        logger.error(f"Could not assign symbol {symbol} to any provider")
+        return None
+
+    def _forgetSymbolLocked(self, symbol):
+        self.symbol_to_provider.pop(symbol, None)
+        self.symbol_to_fallback_index.pop(symbol, None)
+        self.symbol_preferred_provider.pop(symbol, None)
+        self.providerHealth.forget(symbol)
+
+    def _callProvider(self, provider_name, methodName, symbols):
+        """Subscribe or unsubscribe symbols on a provider - returns False if it failed"""
+        if not symbols:
+            return True
+        try:
+            logger.info(f"{methodName} {len(symbols)} symbols on provider {provider_name}")
+            getattr(self._providerMethods[provider_name], methodName)(symbols)
+            return True
+        except Exception as e:
+            logger.error(f"Failed to {methodName} {symbols} on provider {provider_name}: {e}")
+            return False
+
+    def _moveSymbolLocked(self, symbol, new_provider, new_index):
+        """Move a symbol's subscription to another provider in its chain - caller must hold self.lock"""
+        old_provider = self.symbol_to_provider.get(symbol)
+        if new_provider != old_provider:
+            if not self._callProvider(new_provider, 'subscribe', [symbol]):
+                return False
+            if old_provider is not None:
+                self._callProvider(old_provider, 'unsubscribe', [symbol])
+        self.symbol_to_provider[symbol] = new_provider
+        self.symbol_to_fallback_index[symbol] = new_index
+        return True
     
     def _getFallbackChainForSymbol(self, symbol, preferred_provider):
         """Get the fallback chain for a symbol"""
@@ -273,144 +365,153 @@ class StockProviderManager:
     
     def _providerSymbolChanged(self, symbol, stock_data=None):
         """Called when a provider reports data change for a symbol"""
-        logger.debug(f"_providerSymbolChanged called for symbol: {symbol}")
+        # Called for every tick - per-tick messages are sampled and only formatted if written
+        tickLogger.debug("_providerSymbolChanged called for symbol: %s", symbol)
+        current_provider = self.symbol_to_provider.get(symbol)
         
         # If stock data was passed directly, use it
         if stock_data is not None:
-            logger.debug(f"_providerSymbolChanged: Using provided stock data for {symbol}")
             symbol_data = stock_data
         else:
             # Fall back to retrieving data from provider (for backwards compatibility)
-            logger.debug(f"_providerSymbolChanged: Retrieving data from provider for {symbol}")
-            current_provider = self.symbol_to_provider.get(symbol)
             if not current_provider:
-                logger.warn(f"_providerSymbolChanged: No provider assigned for symbol {symbol}")
+                # Usually a tick queued before the symbol was unsubscribed
+                logger.debug("_providerSymbolChanged: No provider assigned for symbol %s", symbol)
                 return
             
-            logger.debug(f"_providerSymbolChanged: Getting data from provider {current_provider} for {symbol}")
-            provider = self.providers[current_provider]
-            symbol_data = None
+            getStockData = self._providerMethods[current_provider].getStockData
+            if getStockData is None:
+                logger.warning("_providerSymbolChanged: Provider %s has no getStockData or getStockInfoData method", current_provider)
+                return
             
             # Get data from the provider
             try:
-                if hasattr(provider, 'getStockData'):
-                    logger.debug(f"_providerSymbolChanged: Calling getStockData for {symbol}")
-                    symbol_data = provider.getStockData(symbol)
-                    logger.debug(f"_providerSymbolChanged: getStockData returned: {symbol_data}")
-                elif hasattr(provider, 'getStockInfoData'):
-                    logger.debug(f"_providerSymbolChanged: Calling getStockInfoData for {symbol}")
-                    symbol_data = provider.getStockInfoData(symbol)
-                    logger.debug(f"_providerSymbolChanged: getStockInfoData returned: {symbol_data}")
-                else:
-                    logger.warn(f"_providerSymbolChanged: Provider {current_provider} has no getStockData or getStockInfoData method")
-                    return
+                symbol_data = getStockData(symbol)
             except Exception as e:
-                logger.warn(f"Error getting data for {symbol} from {current_provider}: {e}")
-                logger.debug(f"Exception details:", exc_info=True)
+                logger.warning("Error getting data for %s from %s: %s", symbol, current_provider, e)
+                logger.debug("Exception details:", exc_info=True)
+                return
+            tickLogger.debug("_providerSymbolChanged: %s returned %s for %s", current_provider, symbol_data, symbol)
+            if symbol_data is None:
+                # Nothing fetched yet - usually a tick queued before the symbol moved provider
                 return
-        
-        # Check if we got valid data
-        logger.debug(f"_providerSymbolChanged: Checking if data is valid for {symbol}")
-        logger.debug(f"_providerSymbolChanged: Data type: {type(symbol_data)}, Data: {symbol_data}")
         
         if symbol_data and self._isValidStockData(symbol_data):
-            logger.debug(f"_providerSymbolChanged: Got valid data for {symbol}, updating cache")
             # Update our cache and notify the main application
             with self.lock:
-                self.stockData[symbol] = symbol_data
-                self.dataUpdatedSinceLastUIUpdate = True
+                if current_provider is not None:
+                    self.providerHealth.recordSuccess(symbol, current_provider)
+                if self.quoteStore.update(symbol, symbol_data):
+                    latencyTracker.markCached(symbol, current_provider or "unknown")
+                    self._dictOfStocksChangedSinceUIUpdate[symbol] = True
+                    self.dataUpdatedSinceLastUIUpdate = True
+                    if self.tickHistory is not None:
+                        self.tickHistory.recordTick(symbol, self.quoteStore.getValue(symbol, 'price'),
+                                                    self.quoteStore.getValue(symbol, 'volume'))
             
-            logger.debug(f"_providerSymbolChanged: Calling symbolChangedCallback for {symbol}")
             # Notify the main application
             self.symbolChangedCallback(symbol)
         else:
             # Provider failed to get data, try fallback
-            logger.info(f"No valid data from {current_provider} for {symbol}, trying fallback")
-            logger.debug(f"Validation failure: data={symbol_data}, valid={self._isValidStockData(symbol_data) if symbol_data else 'None'}")
+            logger.info("No valid data from %s for %s, trying fallback", current_provider, symbol)
+            logger.debug("Validation failure: data=%s", symbol_data)
             self._tryFallbackProvider(symbol)
     
     def _isValidStockData(self, data):
         """Check if stock data is valid"""
-        logger.debug(f"_isValidStockData: Validating data: {data}")
-        
         if not data:
-            logger.debug("_isValidStockData: Data is None or empty")
             return False
         
         # Check for explicit failure markers
-        fail_count = data.get('failCount', 0)
-        logger.debug(f"_isValidStockData: failCount = {fail_count}")
-        if fail_count > 0:
-            logger.debug("_isValidStockData: Data has failCount > 0")
+        if data.get('failCount', 0) > 0:
             return False
         
         # Check for essential fields
         price = data.get('price')
-        logger.debug(f"_isValidStockData: price = {price}")
         if price is None or price == 0:
-            logger.debug("_isValidStockData: Price is None or 0")
             return False
         
-        logger.debug("_isValidStockData: Data is valid")
         # Additional validation can be added here
         return True
     
-    def _tryFallbackProvider(self, symbol):
-        """Try the next provider in the fallback chain for a symbol"""
+    def _tryFallbackProvider(self, symbol, now=None):
+        """Record a failure of the symbol's provider and move it to the next provider in its chain"""
+        with self.lock:
+            return self._tryFallbackLocked(symbol, time.monotonic() if now is None else now)
+
+    def _tryFallbackLocked(self, symbol, now):
+        """Caller must hold self.lock - returns True if the symbol was moved"""
         current_provider = self.symbol_to_provider.get(symbol)
         if not current_provider:
-            return
+            return False
+        backoffSecs = self.providerHealth.recordFailure(symbol, current_provider, now)
         
         # Get the fallback chain for this symbol 
         preferred_provider = self.symbol_preferred_provider.get(symbol)
         fallback_chain = self._getFallbackChainForSymbol(symbol, preferred_provider)
-        
         current_index = self.symbol_to_fallback_index.get(symbol, 0)
-        next_index = current_index + 1
         
-        # Try the next provider in the fallback chain
-        if next_index < len(fallback_chain):
+        # The subscription really moves - the failed provider stops requesting the symbol
+        # and is re-probed for it after its backoff
+        for next_index in range(current_index + 1, len(fallback_chain)):
             next_provider = fallback_chain[next_index]
-            logger.info(f"Trying fallback provider {next_provider} for symbol {symbol} (index {next_index} in chain {fallback_chain})")
-            
-            if next_provider in self.providers:
-                try:
-                    # Add to new provider - don't worry about removing from old one
-                    # as the StockValues providers can handle overlapping symbols
-                    new_provider = self.providers[next_provider]
-                    if hasattr(new_provider, 'addStock'):
-                        new_provider.addStock(symbol)
-                    elif hasattr(new_provider, 'setStocks'):
-                        # For providers that need the full list, we'd need to handle this differently
-                        # For now, just assign and let the provider handle it
-                        pass
-                    
-                    # Update tracking
-                    self.symbol_to_provider[symbol] = next_provider
-                    self.symbol_to_fallback_index[symbol] = next_index
-                    logger.info(f"Successfully moved symbol {symbol} from {current_provider} to fallback {next_provider} (index {next_index} in chain {fallback_chain})")
-                    
-                except Exception as e:
-                    logger.error(f"Failed to move {symbol} to fallback provider {next_provider}: {e}")
-                    # Try the next fallback
-                    self.symbol_to_fallback_index[symbol] = next_index
-                    self._tryFallbackProvider(symbol)
-            else:
+            if next_provider not in self.providers:
                 logger.error(f"Fallback provider {next_provider} not available for {symbol}")
-                # Try the next fallback
-                self.symbol_to_fallback_index[symbol] = next_index
-                self._tryFallbackProvider(symbol)
-        else:
-            logger.error(f"Exhausted all fallback providers for symbol {symbol} (tried chain: {fallback_chain})")
+                continue
+            if self.providerHealth.isBackingOff(symbol, next_provider, now):
+                continue
+            if self._moveSymbolLocked(symbol, next_provider, next_index):
+                logger.info(f"Moved symbol {symbol} from {current_provider} to fallback {next_provider} "
+                            f"(index {next_index} in chain {fallback_chain}), retrying {current_provider} in {backoffSecs:.0f}s")
+                return True
+        logger.error(f"Exhausted all fallback providers for symbol {symbol} (tried chain: {fallback_chain})")
+        return False
+
+    def reprobeProviders(self, now=None):
+        """
+        Move symbols on a fallback provider back to the best provider in their chain whose
+        backoff has expired, and fall back again from probes that produced nothing in time
+        """
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            for symbol, provider_name in self.providerHealth.getExpiredProbes(self.probeTimeoutSecs, now):
+                if self.symbol_to_provider.get(symbol) == provider_name:
+                    logger.info(f"No valid data from {provider_name} for {symbol} since re-probing it")
+                    self._tryFallbackLocked(symbol, now)
+            for symbol, current_index in list(self.symbol_to_fallback_index.items()):
+                if current_index == 0:
+                    continue
+                fallback_chain = self._getFallbackChainForSymbol(symbol, self.symbol_preferred_provider.get(symbol))
+                for better_index, provider_name in enumerate(fallback_chain[:current_index]):
+                    if provider_name not in self.providers or self.providerHealth.isBackingOff(symbol, provider_name, now):
+                        continue
+                    if self._moveSymbolLocked(symbol, provider_name, better_index):
+                        self.providerHealth.startProbe(symbol, provider_name, now)
+                        logger.info(f"Re-probing {provider_name} for {symbol} (index {better_index} in chain {fallback_chain})")
+                    break
+
+    def getProviderHealth(self):
+        return self.providerHealth
     
     def getStockData(self, symbol):
-        """Get stock data for a symbol"""
-        with self.lock:
-            data = self.stockData.get(symbol)
-            logger.debug(f"getStockData called for {symbol}, returning: {data is not None}")
-            if data is None:
-                logger.debug(f"getStockData: No data found for {symbol}. Available symbols: {list(self.stockData.keys())}")
-            return data
+        """Get stock data for a symbol (a new dict built from the quote store)"""
+        data = self.quoteStore.getQuote(symbol)
+        tickLogger.debug("getStockData called for %s, returning: %s", symbol, data is not None)
+        return data
+
+    def getQuoteVersion(self, symbol):
+        """Version of a symbol's quote - unchanged version means unchanged data"""
+        return self.quoteStore.getRowVersion(symbol)
+
+    def getQuoteStore(self):
+        return self.quoteStore
+
+    def getDispatchQueue(self):
+        return self.dispatchQueue
+
+    def getTickHistory(self):
+        """Tick history store (None if TICK_HISTORY_ENABLED is not set)"""
+        return self.tickHistory
     
     def getStockInfoData(self, symbol):
         """Get stock info data for a symbol - alias for getStockData for compatibility"""
@@ -423,41 +524,65 @@ class StockProviderManager:
             self.dataUpdatedSinceLastUIUpdate = False
             return changed
     
-    def getMapOfStocksChangedSinceUIUpdated(self):
-        """Get map of stocks that have changed since last UI update"""
-        logger.debug(f"getMapOfStocksChangedSinceUIUpdated called, dataUpdated={self.dataUpdatedSinceLastUIUpdate}")
-        # For compatibility with existing StockTicker.py interface
-        if self.dataUpdatedSinceLastUIUpdate:
-            # Return all symbols that have data
-            changed_stocks = {}
-            with self.lock:
-                for symbol in self.stockData:
-                    changed_stocks[symbol] = True
+    def getMapOfStocksChangedSinceUIUpdated(self, maxCount=None):
+        """
+        Get map of stocks that have changed since last UI update (drains the changed set).
+        With maxCount only that many are taken - the rest stay for the next call
+        """
+        with self.lock:
+            changed_stocks = self._dictOfStocksChangedSinceUIUpdate
+            if maxCount is not None and len(changed_stocks) > maxCount:
+                symbols = list(changed_stocks.keys())
+                self._dictOfStocksChangedSinceUIUpdate = {symbol: True for symbol in symbols[maxCount:]}
+                changed_stocks = {symbol: True for symbol in symbols[:maxCount]}
+            else:
+                self._dictOfStocksChangedSinceUIUpdate = {}
                 self.dataUpdatedSinceLastUIUpdate = False
-            logger.debug(f"getMapOfStocksChangedSinceUIUpdated returning {len(changed_stocks)} changed stocks")
-            return changed_stocks
-        logger.debug("getMapOfStocksChangedSinceUIUpdated returning empty dict")
-        return {}
+        logger.debug("getMapOfStocksChangedSinceUIUpdated returning %d changed stocks", len(changed_stocks))
+        return changed_stocks
     
+    def getNumStocksChangedSinceUIUpdated(self):
+        with self.lock:
+            return len(self._dictOfStocksChangedSinceUIUpdate)
+
     def setOnlyUpdateWhenMarketOpen(self, onlyWhenOpen):
         """Set whether to only update when market is open"""
         self.bOnlyUpdateWhileMarketOpen = onlyWhenOpen
-        for provider in self.providers.values():
-            if hasattr(provider, 'setOnlyUpdateWhenMarketOpen'):
-                provider.setOnlyUpdateWhenMarketOpen(onlyWhenOpen)
+        for methods in self._providerMethods.values():
+            if methods.setOnlyUpdateWhenMarketOpen is not None:
+                methods.setOnlyUpdateWhenMarketOpen(onlyWhenOpen)
     
+    def setHoldings(self, holdingsBySymbol):
+        """Pass shares held per symbol to providers that prioritise polling by position value"""
+        for methods in self._providerMethods.values():
+            if methods.setHoldings is not None:
+                methods.setHoldings(holdingsBySymbol)
+
+    def setVisibleSymbols(self, visibleSymbols):
+        """Pass the symbols currently shown in the UI to providers that prioritise polling"""
+        for methods in self._providerMethods.values():
+            if methods.setVisibleSymbols is not None:
+                methods.setVisibleSymbols(visibleSymbols)
+
     def start(self):
-        """Start all providers"""
-        self.running = True
-        for provider_name, provider in self.providers.items():
+        """Start all providers (once they have been created)"""
+        with self._startLock:
+            self.running = True
+            startProviders = self._providersInitialized and not self._providersStarted
+            if startProviders:
+                self._providersStarted = True
+        self.dispatchQueue.start()
+        for provider_name, methods in (self._providerMethods.items() if startProviders else []):
             try:
-                if hasattr(provider, 'start'):
-                    provider.start()
-                elif hasattr(provider, 'run'):
-                    provider.run()
+                if methods.start is not None:
+                    methods.start()
                 logger.debug(f"Started provider: {provider_name}")
             except Exception as e:
                 logger.error(f"Failed to start provider {provider_name}: {e}")
+        if self._maintenanceThread is None:
+            self._maintenanceStopEvent.clear()
+            self._maintenanceThread = threading.Thread(target=self._maintenanceLoop, name="ProviderManagerMaintenance", daemon=True)
+            self._maintenanceThread.start()
     
     def run(self):
         """Start all providers - alias for start() for compatibility"""
@@ -465,14 +590,25 @@ class StockProviderManager:
     
     def stop(self):
         """Stop all providers"""
-        self.running = False
-        for provider_name, provider in self.providers.items():
+        with self._startLock:
+            self.running = False
+            self._providersStarted = False
+        for provider_name, methods in self._providerMethods.items():
             try:
-                if hasattr(provider, 'stop'):
-                    provider.stop()
+                if methods.stop is not None:
+                    methods.stop()
                 logger.debug(f"Stopped provider: {provider_name}")
             except Exception as e:
                 logger.error(f"Failed to stop provider {provider_name}: {e}")
+        # Handle the ticks still waiting so the snapshot has them
+        self.dispatchQueue.stop()
+        if self._maintenanceThread is not None:
+            self._maintenanceStopEvent.set()
+            self._maintenanceThread.join()
+            self._maintenanceThread = None
+        self.saveSnapshot()
+        if self.tickHistory is not None:
+            self.tickHistory.stop()
     
     def getMarketOpenStatus(self):
         """Get market open status from the primary provider"""
@@ -480,15 +616,24 @@ class StockProviderManager:
             return "No providers available"
         
         primary_provider_name = self.provider_order[0]
-        if primary_provider_name in self.providers:
-            provider = self.providers[primary_provider_name]
-            if hasattr(provider, 'getMarketOpenStatus'):
-                return provider.getMarketOpenStatus()
-            elif hasattr(provider, 'status'):
-                return getattr(provider, 'status', "Unknown")
+        methods = self._providerMethods.get(primary_provider_name)
+        if methods is not None:
+            if methods.getMarketOpenStatus is not None:
+                return methods.getMarketOpenStatus()
+            return getattr(self.providers.get(primary_provider_name), 'status', "Unknown")
         
         return "Market status unavailable"
     
+    def getProvidersHealth(self):
+        """Each provider's own health report (StockProvider.getHealth)"""
+        health = {}
+        for provider_name, methods in self._providerMethods.items():
+            try:
+                health[provider_name] = methods.getHealth() if methods.getHealth is not None else {}
+            except Exception as e:
+                health[provider_name] = {"error": str(e)}
+        return health
+
     def getProviderStatus(self):
         """Get status of all providers"""
         status = {}
@@ -1,6 +1,7 @@
+import os
 import csv
+import json
 import requests
-from bs4 import BeautifulSoup
 import re
 import logging
 
@@ -13,6 +14,9 @@ Created on 28 Sep 2013
 '''
 
 class StockSymbolList():
+
+    def __init__(self):
+        self.stockList = []
         
     def getStocksFromCSV(self):
         self.stockList = []
@@ -23,16 +27,19 @@ class StockSymbolList():
         self.stockList = sorted(self.stockList)
 
     def getStocksFromWeb(self):
-        self.stockList = []
+        # Built up separately so the current (e.g. cached) list stays in use until done
+        stockList = []
         r = None
         for getStocksAttempt in range(3):
             try:
                 r = requests.get('http://www.lse.co.uk/index-constituents.asp?index=idx:asx')
                 break
             except Exception as excp:
-                logger.warn("Faield to get FTSE list from LSE, attempt", getStocksAttempt)
+                logger.warning(f"Failed to get FTSE list from LSE, attempt {getStocksAttempt}")
         if r is None:
             return
+        # Only needed for the occasional refresh from the web - not imported at startup
+        from bs4 import BeautifulSoup
         soup = BeautifulSoup(r.text, "html.parser")
         for x in soup.find_all('a', attrs={'class':"linkTabs"}):
             mtch = re.match("(.+?)\((.+?)\)", x.text)
@@ -40,9 +47,30 @@ class StockSymbolList():
                 # Append .L to make it work with Yahoo
                 coName = mtch.group(1)
                 symb = mtch.group(2) + ".L" if (mtch.group(2)[-1]!='.') else mtch.group(2) + "L" 
-                self.stockList.append([coName,symb])
+                stockList.append([coName,symb])
             else:
                 logger.warn("Failed Match", x.text)
+        if len(stockList) > 0:
+            self.stockList = stockList
+
+    def loadFromCache(self, fileName):
+        try:
+            with open(fileName, "r") as cacheFile:
+                stockList = json.load(cacheFile)
+        except (OSError, ValueError):
+            return False
+        if not isinstance(stockList, list):
+            return False
+        self.stockList = stockList
+        return True
+
+    def saveToCache(self, fileName):
+        try:
+            with open(fileName + ".tmp", "w") as cacheFile:
+                json.dump(self.stockList, cacheFile)
+            os.replace(fileName + ".tmp", fileName)
+        except OSError as excp:
+            logger.warning(f"StockSymbolList: failed to save cache {fileName}: {excp}")
         
     def getNumStocks(self):
         return len(self.stockList)
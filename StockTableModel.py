@@ -0,0 +1,372 @@
+import heapq
+import logging
+import time
+from PySide6 import QtGui, QtCore
+from PySide6.QtCore import Qt
+
+from StockHolding import StockHolding
+from ValuationEngine import ValuationEngine
+
+'''
+Table model for the watch and portfolio tables. One model holds every row
+of a group (watch list or portfolio) and is shared by the split views, each
+of which shows a range of rows through a StockTableRowRange proxy. Cell text
+is formatted lazily in data() so only visible cells are formatted, and
+dataChanged is only emitted for the cells of rows whose quotes changed.
+'''
+
+# Logging
+logger = logging.getLogger("StockTickerLogger")
+
+class StockTableModel(QtCore.QAbstractTableModel):
+
+    brushRed = QtGui.QBrush(QtGui.QColor(200, 0, 0))
+    brushRed.setStyle(QtCore.Qt.SolidPattern)
+    brushGreen = QtGui.QBrush(QtGui.QColor(0, 150, 0))
+    brushGreen.setStyle(QtCore.Qt.SolidPattern)
+    brushText = QtGui.QBrush(QtGui.QColor(255, 255, 255))
+    brushText.setStyle(QtCore.Qt.SolidPattern)
+    brushTotals = QtGui.QBrush(QtGui.QColor(255, 255, 0))
+    brushTotals.setStyle(QtCore.Qt.SolidPattern)
+    brushNeutral = QtGui.QBrush(QtGui.QColor(0, 0, 0, 0))
+    dataFlashTimeMs = 400
+    TOTALS_FORMAT = ValuationEngine.parseFormat("{:0,.2f}")
+
+    # Emitted (column) when a cell's text is wider than any seen so far in that column
+    columnWidthMayHaveGrown = QtCore.Signal(int)
+
+    def __init__(self, colDefs: list[dict[str,str]], currencySign: str, bTotalsRow: bool, parent=None):
+        super().__init__(parent)
+        self.uiColDefs = colDefs
+        self.currencySign = currencySign
+        self.bTotalsRow = bTotalsRow
+        self.uiRowDefs = []
+        self.symbolRows = {}
+        self.totalsRow = -1
+        self.totalProfitCol = 0
+        self.totalValueCol = 0
+        self.totalCommentCol = 0
+        for colIdx, colDef in enumerate(self.uiColDefs):
+            if colDef['colValName'] == 'profit':
+                self.totalProfitCol = colIdx
+            elif colDef['colValName'] == 'totalvalue':
+                self.totalValueCol = colIdx
+            elif colDef['colValName'] == 'volume':
+                self.totalCommentCol = colIdx
+        self.totalsLabelCol = min(self.totalProfitCol, self.totalValueCol) - 1
+        self.flashCols = [colIdx for colIdx, colDef in enumerate(self.uiColDefs) if colDef.get('colourCode') == 'FlashPosNeg']
+        self.alignments = [(Qt.AlignRight if colDef.get('align') == 'right' else Qt.AlignLeft) for colDef in self.uiColDefs]
+        self.maxTextLen = [0] * len(self.uiColDefs)
+        self.totalsText = {}
+        self.totalsBackground = {}
+        # Number formats of the decimal columns
+        self.colFormats = [ValuationEngine.parseFormat(colDef.get('fmtStr', "")) for colDef in self.uiColDefs]
+        self.valuation = ValuationEngine()
+        self.tableTotals = (0, 0, 0, 0)
+        # Min-heap of (expiry time, row, col) for flashing cells, with the latest expiry of each cell
+        self.flashHeap = []
+        self.flashExpiry = {}
+        self.flashTimer = QtCore.QTimer(self)
+        self.flashTimer.setSingleShot(True)
+        self.flashTimer.timeout.connect(self.updateFlash)
+
+    def setStocks(self, stockHolding: list[StockHolding]):
+        self.beginResetModel()
+        self.uiRowDefs = []
+        self.symbolRows = {}
+        for stk in stockHolding:
+            self.symbolRows.setdefault(stk['symbol'], []).append(len(self.uiRowDefs))
+            self.uiRowDefs.append({ 'sym':stk['symbol'], 'ver':-1, 'stkValues':None, 'cellValues':None,
+                                    'text':[None] * len(self.uiColDefs), 'bg':[None] * len(self.uiColDefs) })
+        self.valuation.setHoldings([(stk['holding'], stk['cost']) for stk in stockHolding])
+        self.tableTotals = (0, 0, 0, len(self.uiRowDefs))
+        self.totalsRow = len(self.uiRowDefs) if self.bTotalsRow else -1
+        self.totalsText = {}
+        self.totalsBackground = {}
+        self.maxTextLen = [0] * len(self.uiColDefs)
+        self.flashHeap = []
+        self.flashExpiry = {}
+        self.flashTimer.stop()
+        self.endResetModel()
+
+    def getSymbol(self, rowIdx):
+        if 0 <= rowIdx < len(self.uiRowDefs):
+            return self.uiRowDefs[rowIdx]['sym']
+        return None
+
+    def numStockRows(self):
+        return len(self.uiRowDefs)
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.uiRowDefs) + (1 if self.bTotalsRow else 0)
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.uiColDefs)
+
+    def flags(self, index):
+        return Qt.ItemIsEnabled
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation != Qt.Horizontal or not (0 <= section < len(self.uiColDefs)):
+            return None
+        if role == Qt.DisplayRole:
+            return self.uiColDefs[section]['colLbl']
+        if role == Qt.TextAlignmentRole:
+            return self.alignments[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        rowIdx = index.row()
+        colIdx = index.column()
+        if rowIdx == self.totalsRow:
+            if role == Qt.DisplayRole:
+                return self.totalsText.get(colIdx, "")
+            if role == Qt.ForegroundRole:
+                return self.brushTotals
+            if role == Qt.BackgroundRole:
+                return self.totalsBackground.get(colIdx)
+            if role == Qt.TextAlignmentRole:
+                return Qt.AlignLeft if colIdx == self.totalsLabelCol else Qt.AlignRight
+            return None
+        if role == Qt.DisplayRole:
+            uiRowDef = self.uiRowDefs[rowIdx]
+            cellText = uiRowDef['text'][colIdx]
+            if cellText is None:
+                cellText = self.formatCell(uiRowDef, colIdx)
+                uiRowDef['text'][colIdx] = cellText
+                if len(cellText) > self.maxTextLen[colIdx]:
+                    self.maxTextLen[colIdx] = len(cellText)
+                    self.columnWidthMayHaveGrown.emit(colIdx)
+            return cellText
+        if role == Qt.BackgroundRole:
+            return self.uiRowDefs[rowIdx]['bg'][colIdx]
+        if role == Qt.ForegroundRole:
+            return self.brushText
+        if role == Qt.TextAlignmentRole:
+            return self.alignments[colIdx]
+        return None
+
+    def formatCell(self, uiRowDef, colIdx):
+        colDef = self.uiColDefs[colIdx]
+        colValName = colDef['colValName']
+        if colValName == 'sym':
+            return uiRowDef['sym']
+        stkValues = uiRowDef['stkValues']
+        if stkValues is None or uiRowDef['cellValues'] is None:
+            return ""
+        # Handle display validity
+        if 'onlyIfValid' in colDef:
+            if stkValues.get(colDef['onlyIfValid'], "") == "":
+                return ""
+        cellNewText = ""
+        if colDef['dataType'] == 'decimal':
+            cellNewText = ValuationEngine.formatScaled(self.getCellValue(uiRowDef, colValName), self.colFormats[colIdx])
+        else: # must be string
+            cellNewText = str(stkValues[colValName]) if (colValName in stkValues) else ""
+        txtPrefix = colDef['prfxStr'] if 'prfxStr' in colDef else ""
+        txtSuffix = colDef['pstfxStr'] if ('pstfxStr' in colDef) else ""
+        return txtPrefix + cellNewText + txtSuffix
+
+    def getCellValue(self, uiRowDef, colValName):
+        """Scaled integer value of a decimal cell"""
+        cellValues = uiRowDef['cellValues']
+        if colValName in cellValues:
+            return cellValues[colValName]
+        stkValues = uiRowDef['stkValues']
+        if colValName in stkValues:
+            return ValuationEngine.toScaled(stkValues[colValName]) or 0
+        return 0
+
+    def updateFromQuotes(self, stockValues, exDivDates, changedStockDict):
+        """Refresh rows whose quotes changed (all rows if changedStockDict is None) and the totals"""
+        valuation = self.valuation
+        # Only rows of changed symbols are visited - the totals are adjusted by their difference
+        if changedStockDict is None:
+            rowsToUpdate = range(len(self.uiRowDefs))
+        else:
+            rowsToUpdate = sorted(rowIdx for symbolName in changedStockDict for rowIdx in self.symbolRows.get(symbolName, ()))
+        # Rows whose quote version hasn't moved are skipped
+        getQuoteVersion = getattr(stockValues, 'getQuoteVersion', None)
+        for rowIdx in rowsToUpdate:
+            uiRowDef = self.uiRowDefs[rowIdx]
+            symbolName = uiRowDef['sym']
+            if getQuoteVersion is not None:
+                quoteVersion = getQuoteVersion(symbolName)
+                if changedStockDict is not None and uiRowDef['ver'] == quoteVersion:
+                    continue
+                uiRowDef['ver'] = quoteVersion
+            stkValues = stockValues.getStockData(symbolName)
+            if stkValues is None:
+                valuation.clearPrice(rowIdx)
+                continue
+            exDivDates.addToStockInfo(symbolName, stkValues)
+            if not "price" in stkValues or not valuation.setPrice(rowIdx, stkValues["price"]):
+                logger.debug("StockTableModel updateFromQuotes: No price found for %s, skipping", symbolName)
+                valuation.clearPrice(rowIdx)
+                continue
+            self._setRowValues(rowIdx, uiRowDef, stkValues,
+                               { 'hld':valuation.getHolding(rowIdx), 'cost':valuation.getCost(rowIdx),
+                                 'profit':valuation.getProfit(rowIdx), 'totalvalue':valuation.getValue(rowIdx) })
+        self.tableTotals = valuation.getTotals()
+        self._setTotals()
+        return self.getTotals()
+
+    def _setRowValues(self, rowIdx, uiRowDef, stkValues, cellValues):
+        prevTexts = uiRowDef['text']
+        prevBackgrounds = uiRowDef['bg']
+        # Texts of flashing columns are needed now to see whether they changed
+        prevFlashTexts = {}
+        for colIdx in self.flashCols:
+            prevFlashTexts[colIdx] = prevTexts[colIdx] if prevTexts[colIdx] is not None else self.formatCell(uiRowDef, colIdx)
+        prevStkValues = uiRowDef['stkValues']
+        prevCellValues = uiRowDef['cellValues']
+        uiRowDef['stkValues'] = stkValues
+        uiRowDef['cellValues'] = cellValues
+        newTexts = [None] * len(self.uiColDefs)
+        newBackgrounds = list(prevBackgrounds)
+        changedCols = []
+        for colIdx, colDef in enumerate(self.uiColDefs):
+            colValName = colDef['colValName']
+            valChanged = False
+            if colIdx in prevFlashTexts:
+                newTexts[colIdx] = self.formatCell(uiRowDef, colIdx)
+                valChanged = newTexts[colIdx] != prevFlashTexts[colIdx]
+            # Handle colour coding
+            if 'colourCode' in colDef:
+                colourCode = colDef['colourCode']
+                if colourCode == 'PosNeg' or colourCode == 'PosBad' or ((colourCode == 'FlashPosNeg') and valChanged):
+                    colourByVal = self.getCellValue(uiRowDef, colValName) if colDef['dataType'] == 'decimal' else 0
+                    if 'colourBy' in colDef:
+                        if colDef['colourBy'] == 'change':
+                            colourByVal = colourByVal - (ValuationEngine.toScaled(prevFlashTexts.get(colIdx, "")) or 0)
+                        elif colDef['colourBy'] == 'exDivFromHoldings':
+                            colourByVal = -1
+                    elif 'colourByCol' in colDef:
+                        colToColourBy = colDef['colourByCol']
+                        if colToColourBy in stkValues:
+                            colourByVal = stkValues[colToColourBy]
+                    valToColourBy = 0
+                    try:
+                        valToColourBy = float(colourByVal)
+                    except:
+                        valToColourBy = 0
+                    if valToColourBy > 0:
+                        newBackgrounds[colIdx] = self.brushRed if colourCode == 'PosBad' else self.brushGreen
+                    elif valToColourBy < 0:
+                        newBackgrounds[colIdx] = self.brushGreen if colourCode == 'PosBad' else self.brushRed
+                    else:
+                        newBackgrounds[colIdx] = self.brushNeutral
+                if colourCode == 'FlashPosNeg' and valChanged:
+                    self._scheduleFlashClear(rowIdx, colIdx)
+            # Only cells whose source value or colour moved need repainting
+            if valChanged or newBackgrounds[colIdx] is not prevBackgrounds[colIdx] or prevStkValues is None:
+                changedCols.append(colIdx)
+            elif colValName in cellValues:
+                if prevCellValues is None or prevCellValues.get(colValName) != cellValues[colValName]:
+                    changedCols.append(colIdx)
+            elif prevStkValues.get(colValName) != stkValues.get(colValName) or \
+                    ('onlyIfValid' in colDef and prevStkValues.get(colDef['onlyIfValid']) != stkValues.get(colDef['onlyIfValid'])):
+                changedCols.append(colIdx)
+            else:
+                newTexts[colIdx] = prevTexts[colIdx]
+        uiRowDef['text'] = newTexts
+        uiRowDef['bg'] = newBackgrounds
+        if changedCols:
+            self.dataChanged.emit(self.index(rowIdx, changedCols[0]), self.index(rowIdx, changedCols[-1]))
+
+    def _setTotals(self):
+        if not self.bTotalsRow:
+            return
+        totalVal, totalProfit, rowsWithTotalValue, numRows = self.tableTotals
+        newText = { self.totalsLabelCol: "Totals",
+                    self.totalProfitCol: self.currencySign + ValuationEngine.formatScaled(totalProfit, self.TOTALS_FORMAT),
+                    self.totalValueCol: self.currencySign + ValuationEngine.formatScaled(totalVal, self.TOTALS_FORMAT),
+                    self.totalCommentCol: "" if rowsWithTotalValue == numRows else "Missing Values" }
+        newBackground = { self.totalCommentCol: self.brushNeutral if rowsWithTotalValue == numRows else self.brushRed }
+        if newText != self.totalsText or newBackground != self.totalsBackground:
+            self.totalsText = newText
+            self.totalsBackground = newBackground
+            self.dataChanged.emit(self.index(self.totalsRow, 0), self.index(self.totalsRow, len(self.uiColDefs) - 1))
+
+    def getNumMissingValues(self):
+        """Rows without a price, which are left out of the totals"""
+        return self.valuation.getNumMissing()
+
+    def getTotals(self):
+        """[total value, total profit, rows with a value, rows] as of the last update - amounts in pounds"""
+        totalVal, totalProfit, rowsWithTotalValue, numRows = self.tableTotals
+        return [ValuationEngine.toDecimal(totalVal), ValuationEngine.toDecimal(totalProfit), rowsWithTotalValue, numRows]
+
+    def _scheduleFlashClear(self, rowIdx, colIdx):
+        # A cell that flashes again before it clears just gets a later expiry
+        expiry = time.monotonic() + self.dataFlashTimeMs / 1000
+        self.flashExpiry[(rowIdx, colIdx)] = expiry
+        heapq.heappush(self.flashHeap, (expiry, rowIdx, colIdx))
+        if not self.flashTimer.isActive():
+            self._startFlashTimer(expiry)
+
+    def _startFlashTimer(self, expiry):
+        self.flashTimer.start(max(0, int((expiry - time.monotonic()) * 1000) + 1))
+
+    def updateFlash(self, now=None):
+        """Clear the flash colour of cells whose flash time has elapsed"""
+        now = time.monotonic() if now is None else now
+        flashHeap = self.flashHeap
+        while flashHeap and flashHeap[0][0] <= now:
+            expiry, rowIdx, colIdx = heapq.heappop(flashHeap)
+            # Entries superseded by a later flash of the same cell are dropped
+            if self.flashExpiry.get((rowIdx, colIdx)) != expiry:
+                continue
+            del self.flashExpiry[(rowIdx, colIdx)]
+            self.uiRowDefs[rowIdx]['bg'][colIdx] = self.brushNeutral
+            cellIndex = self.index(rowIdx, colIdx)
+            self.dataChanged.emit(cellIndex, cellIndex, [Qt.BackgroundRole])
+        # Wake up again for the next cell due to clear
+        if flashHeap:
+            self._startFlashTimer(flashHeap[0][0])
+        else:
+            self.flashTimer.stop()
+
+    def numFlashingCells(self):
+        return len(self.flashExpiry)
+
+class StockTableRowRange(QtCore.QSortFilterProxyModel):
+    """Shows rows [firstRow, lastRow) of a shared StockTableModel, plus its totals row if wanted"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.firstRow = 0
+        self.lastRow = 0
+        self.showTotalsRow = False
+        # Rows only move when the range changes - don't refilter on every dataChanged
+        self.setDynamicSortFilter(False)
+
+    def setRowRange(self, firstRow, lastRow, showTotalsRow):
+        # Qt 6.10 replaced invalidateRowsFilter with begin/endFilterChange
+        hasFilterChange = hasattr(self, 'beginFilterChange')
+        if hasFilterChange:
+            self.beginFilterChange()
+        self.firstRow = firstRow
+        self.lastRow = lastRow
+        self.showTotalsRow = showTotalsRow
+        if hasFilterChange:
+            self.endFilterChange(QtCore.QSortFilterProxyModel.Direction.Rows)
+        else:
+            self.invalidateRowsFilter()
+
+    def filterAcceptsRow(self, sourceRow, sourceParent):
+        if self.firstRow <= sourceRow < self.lastRow:
+            return True
+        return self.showTotalsRow and sourceRow == self.sourceModel().totalsRow
+
+    def getSymbol(self, rowIdx):
+        sourceIndex = self.mapToSource(self.index(rowIdx, 0))
+        return self.sourceModel().getSymbol(sourceIndex.row())
+
+    def isTotalsRow(self, rowIdx):
+        sourceIndex = self.mapToSource(self.index(rowIdx, 0))
+        return sourceIndex.row() == self.sourceModel().totalsRow
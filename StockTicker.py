@@ -15,12 +15,19 @@ from StockSettingsDialog import StockSettingsDialog
 from StockSymbolList import StockSymbolList
 from ExDivDates import ExDivDates
 from StockTable import StockTable
-from decimal import Decimal
+from StockTableModel import StockTableModel
 from ExchangeRates import ExchangeRates
 from LocalConfig import LocalConfig
 from HostedConfigFile import HostedConfigFile
+from ConfigIniFile import ConfigIniFile
 from ResourcePath import getResourcePath
-from StockProviderManager import StockProviderManager
+from StockProviderManager import StockProviderManager, tickLogger
+from StartupLoader import StartupLoader, StartupTimings
+from UIRefreshCoalescer import UIRefreshCoalescer
+from LatencyTracker import latencyTracker
+from DiagnosticsDialog import DiagnosticsDialog
+from LogUtils import setupQueueLogging
+from PollScheduler import PollScheduler
 
 '''
 Created on 4 Sep 2013
@@ -46,7 +53,14 @@ SEND_TO_MESSAGE_BOARD = False
 
 class RStockTicker(QtWidgets.QMainWindow):
 
-    def __init__(self):
+    # Local copies of network-sourced data used to show the window immediately at startup
+    HOSTED_CONFIG_CACHE_FILE = "privatesettings/stockTickerConfig.cache.json"
+    SYMBOL_LIST_CACHE_FILE = "privatesettings/stockSymbolList.cache.json"
+
+    # Visible rows are re-read this long after the last resize or splitter move
+    VISIBLE_SYMBOLS_DEBOUNCE_MS = 250
+
+    def __init__(self, configIni=None):
         # Superclass
         super(RStockTicker, self).__init__()
         # Init
@@ -54,47 +68,72 @@ class RStockTicker(QtWidgets.QMainWindow):
         self.stocksViewLock = threading.Lock()
         self.stocksListChanged = False
         self.windowTitle = ""
-        self.MARKET_OPEN_CHECK_TICKS = 60
-        self.ticksBeforeMarketOpenCheck = self.MARKET_OPEN_CHECK_TICKS
+        self.MARKET_OPEN_CHECK_INTERVAL_MS = 120000
         self.numWatchTables = 3
         self.numFolioTables = 3
         self.stockHoldings = StockHoldings()
 
+        # Startup is staged - the window is shown straight away from local caches and the
+        # network work is done on worker threads that signal back (see startupTaskFinished)
+        self.startupTimings = StartupTimings()
+        self.startupTimings.start("show window")
+
         # Local config
         self.localConfigFile = LocalConfig("localConfig.json")
 
-        # Hosted config
-        self.hostedConfigFile = HostedConfigFile()
-        self.hostedConfigFile.initFromFile('privatesettings/stockTickerConfig.json')
-        #self.stockreader.readFromShareScopeCSV("robstkexpt.csv")
-        stocksDataFileContents = self.hostedConfigFile.getConfigDataFromLocation()
+        # Private settings (API keys, provider chain) shared by all users of config.ini -
+        # main() passes the instance it read the log settings from
+        self.configIni = configIni if configIni is not None else ConfigIniFile("privatesettings/config.ini")
 
-        # Load stocks from file
-        self.stockHoldings.loadFromStocksDataFileContents(stocksDataFileContents)
-        heldStockSymbols = self.stockHoldings.getStockSymbols()
+        # Hosted config - the last copy fetched is used until the hosted one arrives
+        with self.startupTimings.timePhase("local caches"):
+            self.hostedConfigFile = HostedConfigFile()
+            self.hostedConfigFile.initFromFile('privatesettings/stockTickerConfig.json')
+            #self.stockreader.readFromShareScopeCSV("robstkexpt.csv")
+            stocksDataFileContents = self.hostedConfigFile.getConfigDataFromCache(self.HOSTED_CONFIG_CACHE_FILE)
+
+            # Load stocks from file
+            self.stockHoldings.loadFromStocksDataFileContents(stocksDataFileContents)
+            heldStockSymbols = self.stockHoldings.getStockSymbols()
+
+            # Symbol universe (for the settings dialog)
+            self.stockSymbolList = StockSymbolList()
+            self.stockSymbolList.loadFromCache(self.SYMBOL_LIST_CACHE_FILE)
+            # self.stockSymbolList.getStocksFromCSV()
+
+        # The display is refreshed when quotes change (pushed from the provider threads),
+        # at most once per frame interval and with a cap on the symbols applied per frame
+        self.maxSymbolsPerFrame = self.configIni.getInt("UI_MAX_SYMBOLS_PER_FRAME", 200)
+        self.uiRefresh = UIRefreshCoalescer(self.updateStockValues,
+                                            self.configIni.getInt("UI_MIN_FRAME_INTERVAL_MS", UIRefreshCoalescer.DEFAULT_MIN_FRAME_INTERVAL_MS), self)
 
         # Exchange rate getter
-        self.exchangeRates = ExchangeRates()
+        self.exchangeRates = ExchangeRates(self.configIni)
         self.exchangeRates.start()
 
-        # Stock values getter - use provider manager with intelligent fallback
-        self.stockValues = StockProviderManager(self.symbolDataChanged, self.localConfigFile)
-        logger.info("Using StockProviderManager with intelligent fallback")
-
-        self.stockValues.setStocks(heldStockSymbols)
-        self.stockValues.start()
+        # Stock values getter - use provider manager with intelligent fallback. Providers are
+        # created on a worker thread - until then the last-known quotes snapshot is shown
+        with self.startupTimings.timePhase("provider manager"):
+            self.stockValues = StockProviderManager(self.symbolDataChanged, self.localConfigFile, self.configIni, deferProviderInit=True)
+            logger.info("Using StockProviderManager with intelligent fallback")
+            self.stockValues.setStocks(heldStockSymbols)
+            self.stockValues.start()
 
         # Ex-dividend dates getter
-        self.exDivDates = ExDivDates(self.exchangeRates)
+        self.exDivDates = ExDivDates(self.exchangeRates, self.configIni)
         # self.exDivDates.run()
 
-        # Update for the display
-        self.updateTimer = QTimer(self)
-        self.updateTimer.timeout.connect(self.updateStockValues)
-        self.updateTimer.start(2000)
-        self.stockSymbolList = StockSymbolList()
-#        self.stockSymbolList.getStocksFromCSV()
-        self.stockSymbolList.getStocksFromWeb()
+        # Window title shows the market open status
+        self.marketStatusTimer = QTimer(self)
+        self.marketStatusTimer.timeout.connect(self.updateMarketOpenStatus)
+        self.marketStatusTimer.start(self.MARKET_OPEN_CHECK_INTERVAL_MS)
+
+        # Visible symbols are re-read once resizing or splitter moves have settled
+        self._visibleSymbolsPushed = None
+        self.visibleSymbolsTimer = QTimer(self)
+        self.visibleSymbolsTimer.setSingleShot(True)
+        self.visibleSymbolsTimer.setInterval(self.VISIBLE_SYMBOLS_DEBOUNCE_MS)
+        self.visibleSymbolsTimer.timeout.connect(self.updateVisibleSymbols)
         self.portfolioTableColDefs = [
             { 'colLbl':"Sym", 'colValName':"sym", 'dataType':'str', 'fmtStr':'', 'prfxStr':'', 'pstfxStr':'', 'anchor':"e", 'sticky':"EW", 'align':'left', 'fontSize':'large', 'colourCode':'PosNeg', 'colourByCol':'change' },
             { 'colLbl':"Name", 'colValName':"name", 'dataType':'str', 'fmtStr':'', 'prfxStr':'', 'pstfxStr':'', 'anchor':"e", 'sticky':"EW", 'align':'left', 'fontSize':'small', 'colourCode':'PosBad', 'colourByCol':'failCount' },
@@ -111,7 +150,7 @@ class RStockTicker(QtWidgets.QMainWindow):
             ]
         self.watchTableColDefs = [
             { 'colLbl':"Sym", 'colValName':"sym", 'dataType':'str', 'fmtStr':'', 'prfxStr':'', 'pstfxStr':'', 'anchor':"e", 'sticky':"EW", 'align':'left', 'fontSize':'large', 'colourCode':'PosNeg', 'colourByCol':'change' },
-            { 'colLbl':"Name", 'colValName':"name", 'dataType':'str', 'fmtStr':'', 'prfxStr':'', 'pstfxStr':'', 'anchor':"e", 'sticky':"EW", 'align':'left', 'fontSize':'small' },
+            { 'colLbl':"Name", 'colValName':"name", 'dataType':'str', 'fmtStr':'', 'prfxStr':'', 'pstfxStr':'', 'anchor':"e", 'sticky':"EW", 'align':'left', 'fontSize':'small', 'colourCode':'PosBad', 'colourByCol':'failCount' },
             { 'colLbl':"Last", 'colValName':"price", 'dataType':'decimal', 'fmtStr':'{:0.2f}', 'prfxStr':'', 'pstfxStr':'', 'anchor':"e", 'sticky':"EW", 'align':'right', 'colourCode':'FlashPosNeg', 'colourBy':'change' },
             { 'colLbl':"Change", 'colValName':"change", 'dataType':'decimal', 'fmtStr':'{:0.2f}', 'prfxStr':'', 'pstfxStr':'', 'anchor':"e", 'sticky':"EW", 'align':'right' },
             { 'colLbl':"Change%", 'colValName':"chg_percent", 'dataType':'decimal', 'fmtStr':'{:0.2f}', 'prfxStr':'', 'pstfxStr':'', 'anchor':"e", 'sticky':"EW", 'align':'right' },
@@ -121,6 +160,20 @@ class RStockTicker(QtWidgets.QMainWindow):
             { 'colLbl':"PayDate", 'colValName':"paymentDate", 'dataType':'str', 'fmtStr':'', 'prfxStr':'', 'pstfxStr':'', 'anchor':"e", 'sticky':"EW", 'align':'right' },
             ]
         self.initUI()
+        self.startupTimings.finish("show window")
+        # Show any last-known quotes loaded from the snapshot
+        self.uiRefresh.notify()
+
+        # Slow startup work
+        self.startupLoader = StartupLoader(self.startupTimings, self)
+        self.startupLoader.taskFinished.connect(self.startupTaskFinished)
+        self.startupLoader.taskFailed.connect(self.startupTaskFailed)
+        self.startupLoader.allTasksFinished.connect(self.startupFinished)
+        self.startupLoader.runInBackground("providers", self.stockValues.initializeProviders)
+        # An edit saved before the hosted config arrives would be overwritten by it
+        self.editAction.setEnabled(False)
+        self.startupLoader.runInBackground("hosted config", self.hostedConfigFile.getConfigDataFromLocation)
+        self.startupLoader.runInBackground("symbol list", self.stockSymbolList.getStocksFromWeb)
 
     def getFontAction(self, title, connectParam1, connectParam2):
         fontAction = QtGui.QAction(QtGui.QIcon(getResourcePath('font.png')), '&' + title, self)
@@ -134,22 +187,34 @@ class RStockTicker(QtWidgets.QMainWindow):
         editAction = QtGui.QAction(QtGui.QIcon(getResourcePath('edit.png')), '&Edit', self)
         editAction.setStatusTip('Edit shares')
         editAction.triggered.connect(self.editStocksList)
+        self.editAction = editAction
 
         # Exit menu action
         exitAction = QtGui.QAction(QtGui.QIcon(getResourcePath('exit.png')), '&Exit', self)
         exitAction.setStatusTip('Exit application')
         exitAction.triggered.connect(self.quitApp)
 
+        # Diagnostics (quote latency) action
+        diagnosticsAction = QtGui.QAction('&Diagnostics', self)
+        diagnosticsAction.setStatusTip('Show quote latency and refresh statistics')
+        diagnosticsAction.triggered.connect(self.showDiagnostics)
+        self.diagnosticsDialog = None
+
+        # Models shared by the watch and portfolio views
+        self.watchModel = StockTableModel(self.watchTableColDefs, self.currencySign, False, self)
+        self.portfolioModel = StockTableModel(self.portfolioTableColDefs, self.currencySign, True, self)
+
         # Table(s) to handle watch list
         self.watchTableSplitter = QtWidgets.QSplitter()
         self.watchTables: list[StockTable] = []
         for tabIdx in range(self.numWatchTables):
             newTab = StockTable()
-            newTab.initTable(self, self.watchTableColDefs, self.currencySign, False, "watch", self.localConfigFile)
+            newTab.initTable(self, self.watchModel, "watch", self.localConfigFile)
             # Add menu actions
             newTab.addAction(editAction)
             newTab.addAction(self.getFontAction("Normal Font", "watch", "normal"))
             newTab.addAction(self.getFontAction("Large Font", "watch", "large"))
+            newTab.addAction(diagnosticsAction)
             newTab.addAction(exitAction)
             newTab.setContextMenuPolicy(QtCore.Qt.ActionsContextMenu)
             # Add to list of tables
@@ -161,12 +226,13 @@ class RStockTicker(QtWidgets.QMainWindow):
         self.portfolioTables: list[StockTable] = []
         for tabIdx in range(self.numFolioTables):
             newTab = StockTable()
-            newTab.initTable(self, self.portfolioTableColDefs, self.currencySign, tabIdx==self.numFolioTables-1, "folio", self.localConfigFile)
+            newTab.initTable(self, self.portfolioModel, "folio", self.localConfigFile)
             # Add menu actions
             newTab.addAction(editAction)
             newTab.addAction(self.getFontAction("Normal Font", "folio", "normal"))
             newTab.addAction(self.getFontAction("Large Font", "folio", "large"))
             newTab.addAction(self.getFontAction("Totals Font", "folio", "totals"))
+            newTab.addAction(diagnosticsAction)
             newTab.addAction(exitAction)
             newTab.setContextMenuPolicy(QtCore.Qt.ActionsContextMenu)
             # Add to list of tables
@@ -191,19 +257,52 @@ class RStockTicker(QtWidgets.QMainWindow):
         self.setWindowTitle(self.windowTitle)
         self.resize(1280,800)
         self.show()
+        self.updatePollPriorities()
+
+    def startupTaskFinished(self, phaseName, result):
+        # Called on the Qt thread when a background startup task completes
+        if phaseName == "hosted config":
+            self.editAction.setEnabled(True)
+            if result is None:
+                logger.warning("StockTicker: hosted config unavailable - using cached stock list")
+                return
+            self.hostedConfigFile.saveConfigDataToCache(self.HOSTED_CONFIG_CACHE_FILE, result)
+            self.stockHoldings.loadFromStocksDataFileContents(result)
+            self.stockValues.setStocks(self.stockHoldings.getStockSymbols())
+            self.stocksViewLock.acquire()
+            self.stocksListChanged = True
+            self.stocksViewLock.release()
+            self.uiRefresh.notify()
+        elif phaseName == "symbol list":
+            if self.stockSymbolList.getNumStocks() > 0:
+                self.stockSymbolList.saveToCache(self.SYMBOL_LIST_CACHE_FILE)
+        elif phaseName == "providers":
+            self.updatePollPriorities()
+            self.updateMarketOpenStatus()
+
+    def startupTaskFailed(self, phaseName, errorText):
+        if phaseName == "hosted config":
+            logger.warning("StockTicker: hosted config failed - using cached stock list")
+            self.editAction.setEnabled(True)
+
+    def startupFinished(self):
+        logger.info(self.startupTimings.getReport())
 
     def populateTablesWithStocks(self):
         fullStockList = self.stockHoldings.getStockHoldings(False)
         # Watch tables
         watchStocks = [item for item in fullStockList if item['holding'] == 0]
         numWatchStocksPerTable = int((len(watchStocks)+len(self.watchTables)-1)/len(self.watchTables))
+        self.watchModel.setStocks(watchStocks)
         for tabIdx in range(len(self.watchTables)):
-            self.watchTables[tabIdx].populateTable(watchStocks[tabIdx*numWatchStocksPerTable:((tabIdx+1)*numWatchStocksPerTable)])
+            self.watchTables[tabIdx].setRowRange(tabIdx*numWatchStocksPerTable, (tabIdx+1)*numWatchStocksPerTable, False)
         # Portfolio table
         portfolioStocks = [item for item in fullStockList if item['holding'] != 0]
         numPortfolioStocksPerTable = int((len(portfolioStocks)+len(self.portfolioTables)-1)/len(self.portfolioTables))
+        self.portfolioModel.setStocks(portfolioStocks)
         for tabIdx in range(len(self.portfolioTables)):
-            self.portfolioTables[tabIdx].populateTable(portfolioStocks[tabIdx*numPortfolioStocksPerTable:((tabIdx+1)*numPortfolioStocksPerTable)])
+            self.portfolioTables[tabIdx].setRowRange(tabIdx*numPortfolioStocksPerTable, (tabIdx+1)*numPortfolioStocksPerTable,
+                                                     tabIdx == len(self.portfolioTables)-1)
 
     def quitApp(self):
         QtWidgets.qApp.closeAllWindows()
@@ -222,10 +321,19 @@ class RStockTicker(QtWidgets.QMainWindow):
         self.stocksViewLock.acquire()
         self.stocksListChanged = True
         self.stocksViewLock.release()
+        self.uiRefresh.notify()
         configData = self.stockHoldings.getConfigData()
         if self.hostedConfigFile is not None:
             self.hostedConfigFile.configFileUpdate(configData)
 
+    def showDiagnostics(self):
+        if self.diagnosticsDialog is None:
+            self.diagnosticsDialog = DiagnosticsDialog(self.uiRefresh, self.stockValues.getTickHistory(),
+                                                       self.stockValues.getDispatchQueue(),
+                                                       self.stockValues.getProviderHealth(), self.stockValues, self)
+        self.diagnosticsDialog.show()
+        self.diagnosticsDialog.raise_()
+
     def changeFont(self, tableName, tableFont):
         logger.debug(f"changeFont {tableName} {tableFont}")
         if tableName == "watch":
@@ -248,7 +356,7 @@ class RStockTicker(QtWidgets.QMainWindow):
         logger.debug(f"closeEvent {event}")
         self.stockValues.stop()
         self.exDivDates.stop()
-        self.updateTimer.stop()
+        self.marketStatusTimer.stop()
         self.exchangeRates.stop()
         event.accept()
         
@@ -260,32 +368,18 @@ class RStockTicker(QtWidgets.QMainWindow):
             logger.debug(f"updateStockValues stock list changed")
             self.populateTablesWithStocks()
             self.exDivDates.setFromStockHoldings(self.stockHoldings.getStockHoldings(False))
+            self.updatePollPriorities()
             self.stocksListChanged = False
             forceTableUpdate = True
         self.stocksViewLock.release()
 
-        # Update the window title every now and again with market open status
-        if (self.ticksBeforeMarketOpenCheck == 0):
-            stat = self.stockValues.getMarketOpenStatus()
-            if stat != "":
-                newWindowTitle = 'Stock Ticker - ' + stat
-                if self.windowTitle != newWindowTitle:
-                    self.windowTitle = newWindowTitle
-                    self.setWindowTitle(self.windowTitle)
-            self.ticksBeforeMarketOpenCheck = self.MARKET_OPEN_CHECK_TICKS
-        else:
-            self.ticksBeforeMarketOpenCheck -= 1
-
-        # Update data flash
-        for table in self.watchTables:
-            table.updateFlash()
-        for table in self.portfolioTables:
-            table.updateFlash()
-
-        # Get list of stocks updated since last UI update
+        # Get list of stocks updated since last UI update - any beyond the per-frame cap
+        # are left for the next frame
         changedStockDict = None
         if not forceTableUpdate:
-            changedStockDict = self.stockValues.getMapOfStocksChangedSinceUIUpdated()
+            changedStockDict = self.stockValues.getMapOfStocksChangedSinceUIUpdated(self.maxSymbolsPerFrame)
+            if self.stockValues.getNumStocksChangedSinceUIUpdated() > 0:
+                self.uiRefresh.notify()
             if len(changedStockDict) == 0:
                 # logger.debug(f"No Update Required {changedStockDict}")
                 return
@@ -293,15 +387,13 @@ class RStockTicker(QtWidgets.QMainWindow):
             #     logger.debug(f"Doing update {changedStockDict}")
 
         # Update the tables
-        logger.debug(f"Updating tables with changedStockDict: {changedStockDict}")
-        for i, table in enumerate(self.watchTables):
-            logger.debug(f"Updating watchTable {i}")
-            table.updateTable(self.stockValues, self.exDivDates, changedStockDict, [Decimal("0"),Decimal("0"),0,0])
-        tableTotals = [Decimal("0"),Decimal("0"),0,0]
-        for i, table in enumerate(self.portfolioTables):
-            logger.debug(f"Updating portfolioTable {i}")
-            tableTotals = table.updateTable(self.stockValues, self.exDivDates, changedStockDict, tableTotals)
-            table.SetTotals(tableTotals)
+        tickLogger.debug("Updating tables with changedStockDict: %s", changedStockDict)
+        self.watchModel.updateFromQuotes(self.stockValues, self.exDivDates, changedStockDict)
+        self.portfolioModel.updateFromQuotes(self.stockValues, self.exDivDates, changedStockDict)
+        latencyTracker.markDisplayed(changedStockDict)
+        if forceTableUpdate:
+            for table in self.watchTables + self.portfolioTables:
+                table.resizeColumnsToContents()
 
         if SEND_TO_MESSAGE_BOARD:
             try:
@@ -311,21 +403,55 @@ class RStockTicker(QtWidgets.QMainWindow):
             except:
                 logger.debug("StockTicker: Failed to send stock data to LED Panel")
 
+    def updateMarketOpenStatus(self):
+        # Update the window title with market open status
+        stat = self.stockValues.getMarketOpenStatus()
+        if stat != "":
+            newWindowTitle = 'Stock Ticker - ' + stat
+            if self.windowTitle != newWindowTitle:
+                self.windowTitle = newWindowTitle
+                self.setWindowTitle(self.windowTitle)
+
+    def getPortfolioTotals(self):
+        # [total value, total profit, holdings with a price, holdings] - amounts in pounds
+        return self.portfolioModel.getTotals()
+
+    def updatePollPriorities(self):
+        # Larger positions and symbols on screen are polled more often - called when the
+        # stock list or the providers change. A symbol held in several rows is summed
+        holdings = {}
+        for item in self.stockHoldings.getStockHoldings(False):
+            holding = PollScheduler.toFloat(item['holding']) or 0.0
+            holdings[item['symbol']] = holdings.get(item['symbol'], 0.0) + holding
+        self.stockValues.setHoldings(holdings)
+        self.updateVisibleSymbols(force=True)
+
+    def updateVisibleSymbols(self, force=False):
+        # Only pushed to the providers if the rows on screen have changed
+        visibleSymbols = set()
+        for table in self.watchTables + self.portfolioTables:
+            visibleSymbols.update(table.getVisibleSymbols())
+        if not force and visibleSymbols == self._visibleSymbolsPushed:
+            return
+        self._visibleSymbolsPushed = visibleSymbols
+        self.stockValues.setVisibleSymbols(visibleSymbols)
+
     def resizeEvent(self, event):
         # logger.debug(f"resizeEvent {event.size().width()} {event.size().height()}")
         for table in self.watchTables:
             table.resizeTableCells()
+        self.visibleSymbolsTimer.start()
 
     def splitterMoved(self, pos, index):
         # logger.debug(f"splitterResizedOrMoved")
         for table in self.watchTables:
             table.resizeTableCells()
+        self.visibleSymbolsTimer.start()
 
     def symbolDataChanged(self, symbol):
         """Callback for when stock data changes"""
-        logger.debug(f"symbolDataChanged called for symbol: {symbol}")
-        # This callback is triggered when stock data has been updated
-        # The actual UI update is handled by the timer-based updateStockValues method
+        # Called on provider threads - schedules a coalesced refresh on the Qt thread
+        self.uiRefresh.notify(symbol)
 
 def main():
     # Create logs folder if it doesn't exist
@@ -334,6 +460,17 @@ def main():
             os.makedirs("logs")
     except:
         pass
+    # Log levels (names like DEBUG or INFO) from the private settings
+    configIni = ConfigIniFile("privatesettings/config.ini")
+    fileLogLevel = logging.getLevelName(configIni.getStr("FILE_LOG_LEVEL", "DEBUG").upper())
+    consoleLogLevel = logging.getLevelName(configIni.getStr("CONSOLE_LOG_LEVEL", "INFO").upper())
+    if not isinstance(fileLogLevel, int):
+        fileLogLevel = logging.DEBUG
+    if not isinstance(consoleLogLevel, int):
+        consoleLogLevel = logging.INFO
+    # Debug messages are only formatted at all if a handler wants them
+    logger.setLevel(min(fileLogLevel, consoleLogLevel))
+    tickLogger.setSampleEvery(configIni.getInt("LOG_TICK_SAMPLE_EVERY", 100))
     # Log to file in logs folder with name based on data and time uniquely
     logFileName = "logs/StockTicker_" + datetime.datetime.now().strftime("%Y%m%d_%H%M%S") + ".log"
     # Logging to file and console with format including time, level and module
@@ -341,21 +478,23 @@ def main():
     # Logging to file
     fh = logging.FileHandler(logFileName)
     fh.setFormatter(formatter)
-    fh.setLevel(logging.DEBUG)
-    logging.getLogger('').addHandler(fh)
+    fh.setLevel(fileLogLevel)
 
     # Logging to console
     ch = logging.StreamHandler()
     ch.setFormatter(formatter)
-    ch.setLevel(logging.DEBUG)
-    logging.getLogger('').addHandler(ch)
+    ch.setLevel(consoleLogLevel)
+
+    # Records are queued and written on a listener thread so logging never blocks the provider threads
+    logListener = setupQueueLogging([fh, ch])
 
     # Start the app
     logger.debug(f"StockTicker: Starting")
     app = QtWidgets.QApplication(sys.argv)
     app.setWindowIcon(QtGui.QIcon(getResourcePath('StockTickerIcon.ico')))
-    stockTicker = RStockTicker()
+    stockTicker = RStockTicker(configIni)
     curExitCode = app.exec()
+    logListener.stop()
     sys.exit(curExitCode)
 
 if __name__ == '__main__':
@@ -3,11 +3,16 @@ import datetime
 import pytz
 import time
 import copy
-from urllib.request import Request, urlopen
 import json
-from bs4 import BeautifulSoup
 import requests
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from RateLimiter import TokenBucketRateLimiter
+from PollScheduler import PollScheduler
+from LatencyTracker import latencyTracker
+from HtmlTableExtractor import HtmlTableExtractor
+from StockProvider import StockProvider
 
 '''
 Created on 11 Nov 2017
@@ -17,15 +22,25 @@ Created on 11 Nov 2017
 
 logger = logging.getLogger("StockTickerLogger")
 
-class StockValues_Google:
+class StockValues_Google(StockProvider):
     bOnlyUpdateWhileMarketOpen = True
     bUpdateFullListWhenMarketClosed = True
-    pendingTickerlist = None
     fullTickerList = []
+    
+    # Default quota if none is configured
+    DEFAULT_REQUESTS_PER_MINUTE = 2
+    DEFAULT_REQUEST_BURST = 2
+
+    # Symbols looked up at once (each tries Google and then the alternate source)
+    DEFAULT_MAX_CONCURRENT_REQUESTS = 4
+    REQUEST_TIMEOUT_SECS = 10
 
     def __init__(self, callback=None):
         self._symbolChangedCallback = callback
+        # Subscribed symbols are polled at all times, the full list only while the
+        # market is closed - both are replaced (never modified in place) under listUpdateLock
         self.highFreqSymList = []
+        self._subscriptionsChanged = False
         self.running = False
         self.openhour = 8
         self.openmin = 0
@@ -42,24 +57,71 @@ class StockValues_Google:
         self._dictOfStocksChangedSinceUIUpdate = {}
         self._lockOnStockChangeList = threading.Lock()
         
+        # Every request (primary or alternate source) acquires from the rate limiter
+        self._rateLimiter = TokenBucketRateLimiter("google", self.DEFAULT_REQUESTS_PER_MINUTE, self.DEFAULT_REQUEST_BURST)
+
+        # The scheduler picks the most urgent symbol for each request
+        self._scheduler = PollScheduler()
+        self.minRefreshSecsMarketOpen = 15
+        self.minRefreshSecsMarketClosed = 300
+
+        # Lookups run on a worker pool over pooled keep-alive connections to each host
+        self.googleBaseUrl = "https://finance.google.com"
+        self.alternateBaseUrl = "http://eoddata.com"
+        self.maxConcurrentRequests = self.DEFAULT_MAX_CONCURRENT_REQUESTS
+        self._session = None
+        self._executor = None
+        self._createHttpPool()
+        
         logger.info("StockValues_Google initialized")
         self.start()
 
+    @classmethod
+    def fromConfig(cls, configIni, callback):
+        provider = cls(callback)
+        provider.setMaxConcurrentRequests(configIni.getInt("GOOGLE_MAX_CONCURRENT_REQUESTS", cls.DEFAULT_MAX_CONCURRENT_REQUESTS))
+        provider.setRateLimiter(TokenBucketRateLimiter.fromConfig(
+            configIni, "GOOGLE", cls.DEFAULT_REQUESTS_PER_MINUTE, cls.DEFAULT_REQUEST_BURST))
+        return provider
+
     def addStock(self, symbol):
         """Add a single stock symbol (legacy method for compatibility)"""
-        logger.debug(f"StockValues_Google: Adding symbol {symbol} to be got from Google")
-        self.listUpdateLock.acquire()
-        curList = []
-        for sym in self.highFreqSymList:
-            curList.append(sym)
-        if self.pendingTickerlist is not None:
-            for sym in self.pendingTickerlist:
-                if sym not in curList:
-                    curList.append(sym)
-        if symbol not in curList:
-            curList.append(symbol)
-        self.pendingTickerlist = curList
-        self.listUpdateLock.release()
+        self.subscribe([symbol])
+
+    def subscribe(self, symbols):
+        """Start polling symbols - those already subscribed keep their data and schedule"""
+        with self.listUpdateLock:
+            current = set(self.highFreqSymList)
+            added = []
+            for sym in symbols:
+                if sym not in current:
+                    current.add(sym)
+                    added.append(sym)
+                    self._scheduler.addSymbol(sym)
+            if added:
+                self.highFreqSymList = self.highFreqSymList + added
+                self._subscriptionsChanged = True
+        if added:
+            logger.info(f"StockValues_Google subscribe: {len(added)} symbols: {added}")
+        return added
+
+    def unsubscribe(self, symbols):
+        """Stop polling symbols (in either list) and drop their cached data"""
+        removedSet = set(symbols)
+        with self.listUpdateLock:
+            removed = [sym for sym in self.highFreqSymList if sym in removedSet]
+            removed += [sym for sym in self.fullTickerList if sym in removedSet and sym not in removed]
+            if removed:
+                self.highFreqSymList = [sym for sym in self.highFreqSymList if sym not in removedSet]
+                self.fullTickerList = [sym for sym in self.fullTickerList if sym not in removedSet]
+                for sym in removed:
+                    self._scheduler.removeSymbol(sym)
+        if removed:
+            with self.lock:
+                for sym in removed:
+                    self.stockData.pop(sym, None)
+            logger.info(f"StockValues_Google unsubscribe: {len(removed)} symbols: {removed}")
+        return removed
 
     def setAllStocks(self, stockList):
         """Set all stocks (legacy method, calls setStocks)"""
@@ -73,13 +135,56 @@ class StockValues_Google:
             curList.append(sym)
         self.listUpdateLock.acquire()
         self.fullTickerList = curList
+        self._updateSchedulerSymbols()
         self.listUpdateLock.release()
 
+    def _updateSchedulerSymbols(self):
+        """Scheduler tracks both lists - caller must hold listUpdateLock"""
+        allSyms = list(self.highFreqSymList)
+        for sym in self.fullTickerList:
+            if sym not in allSyms:
+                allSyms.append(sym)
+        self._scheduler.setSymbols(allSyms)
+
     def setCallback(self, callback):
         """Set the callback function to be called when stock data changes"""
         self._symbolChangedCallback = callback
         logger.debug(f"StockValues_Google callback set to {callback}")
 
+    def setHoldings(self, holdingsBySymbol):
+        """Set shares held per symbol - larger positions are refreshed more often"""
+        self._scheduler.setHoldings(holdingsBySymbol)
+
+    def setVisibleSymbols(self, visibleSymbols):
+        """Set symbols visible in the UI - these are refreshed ahead of hidden ones"""
+        self._scheduler.setVisibleSymbols(visibleSymbols)
+
+    def setRateLimiter(self, rateLimiter):
+        """Set the rate limiter to acquire from before each request"""
+        self._rateLimiter = rateLimiter
+
+    def _createHttpPool(self):
+        session = requests.Session()
+        # A pool per host (Google and the alternate source) sized for all the workers
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=self.maxConcurrentRequests)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        oldSession, oldExecutor = self._session, self._executor
+        self._session = session
+        self._executor = ThreadPoolExecutor(max_workers=self.maxConcurrentRequests, thread_name_prefix="GoogleFetch")
+        if oldExecutor is not None:
+            oldExecutor.shutdown(wait=False)
+        if oldSession is not None:
+            oldSession.close()
+
+    def setMaxConcurrentRequests(self, maxConcurrentRequests):
+        """Set the number of symbols that can be looked up at once"""
+        maxConcurrentRequests = max(1, int(maxConcurrentRequests))
+        if maxConcurrentRequests != self.maxConcurrentRequests:
+            self.maxConcurrentRequests = maxConcurrentRequests
+            self._createHttpPool()
+        logger.debug(f"StockValues_Google setMaxConcurrentRequests: {maxConcurrentRequests}")
+
     def symbolDataChanged(self, symbol):
         """Called when a symbol's data changes"""
         with self._lockOnStockChangeList:
@@ -87,7 +192,7 @@ class StockValues_Google:
         
         # Call the callback if one has been set (for StockProviderManager)
         if self._symbolChangedCallback:
-            logger.debug(f"StockValues_Google symbolDataChanged calling callback for {symbol}")
+            logger.debug("StockValues_Google symbolDataChanged calling callback for %s", symbol)
             self._symbolChangedCallback(symbol)
 
     def getMapOfStocksChangedSinceUIUpdated(self):
@@ -134,12 +239,20 @@ class StockValues_Google:
             logger.error(f"StockValues_Google getMarketOpenStatus error: {e}")
             return "Market Status Unknown"
 
+    def getHealth(self):
+        return {"status": self.status, "subscribed": len(self.highFreqSymList), "running": self.running,
+                "rateLimiter": self._rateLimiter.getStats()}
+
     def run(self):
         """Start the provider (called by start())"""
         pass  # Already started in constructor
         
     def start(self):
-        """Start the provider"""
+        """Start the provider - the constructor already has, so a second call does nothing"""
+        if self.running:
+            return
+        if self._executor is None:
+            self._createHttpPool()
         logger.info("StockValues_Google started")
         self.running = True
         self.t = threading.Thread(target=self.stockUpdateThread)
@@ -148,27 +261,28 @@ class StockValues_Google:
     def stop(self):
         """Stop the provider"""
         self.running = False
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
         logger.info("StockValues_Google stopped")
         
     def stockUpdateThread(self):
         firstpass = True
-        nextStockIdx = 0
-        maxStocksPerPass = 1
         for delayCount in range(20):
             if not self.running:
                 break
             time.sleep(1)
 
         while self.running:
-            # Check if the stock list has been updated
+            time.sleep(1)
+
+            # New subscriptions are polled even if the market is closed
             updateNeeded = False
-            self.listUpdateLock.acquire()
-            if self.pendingTickerlist is not None:
-                self.highFreqSymList = self.pendingTickerlist
-                self.pendingTickerlist = None
-                self.dataUpdatedSinceLastUIUpdate = True
-                updateNeeded = True
-            self.listUpdateLock.release()
+            with self.listUpdateLock:
+                if self._subscriptionsChanged:
+                    self._subscriptionsChanged = False
+                    self.dataUpdatedSinceLastUIUpdate = True
+                    updateNeeded = True
 
             # Check if the market opening times are important
             nowInUk = datetime.datetime.now(pytz.timezone('GB'))
@@ -192,21 +306,25 @@ class StockValues_Google:
             if len(self.highFreqSymList) <= 0 and (not updateUsingFullList):
                 continue
 
-            # Update the list
-            if updateUsingFullList:
-                stocks = self.fullTickerList[nextStockIdx:nextStockIdx + maxStocksPerPass]
-            else:
-                stocks = self.highFreqSymList[nextStockIdx:nextStockIdx + maxStocksPerPass]
+            # Pick the most urgent symbols from the list in use - one per worker
+            self._scheduler.setMinRefreshSecs(self.minRefreshSecsMarketOpen if marketOpen else self.minRefreshSecsMarketClosed)
+            candidates = None if updateUsingFullList else set(self.highFreqSymList)
+            stocks = self._scheduler.nextBatch(self.maxConcurrentRequests, candidates=candidates)
             if len(stocks) <= 0:
+                firstpass = False
                 continue
 
             stkdataValid = False
             try:
                 stkdata = self.get_quotes(stocks)
                 stkdataValid = True
+                for sym in stkdata:
+                    latencyTracker.markReceived(sym, "google")
             except:
                 logger.debug(f"get_quote failed for {stocks[0]}")
                 self.status = "failed for " + str(stocks[0])
+                for sym in stocks:
+                    self._scheduler.recordPollAttempt(sym)
                 # self.lock.acquire()
                 # if not ticker in self.stockData:
                 #     self.stockData[ticker] = {}
@@ -216,9 +334,13 @@ class StockValues_Google:
                 # self.lock.release()
 
             if stkdataValid:
+                subscribed = set(self.highFreqSymList).union(self.fullTickerList)
                 try:
                     self.lock.acquire()
                     for ticker,values in stkdata.items():
+                        # Unsubscribed while the request was in flight
+                        if ticker not in subscribed:
+                            continue
                         for k,v in values.items():
                             if not (ticker in self.stockData and k in self.stockData[ticker] and self.stockData[ticker][k] == v):
                                 self.dataUpdatedSinceLastUIUpdate = True
@@ -228,73 +350,88 @@ class StockValues_Google:
                         self.stockData[ticker] = values
                         self.stockData[ticker]['failCount'] = 0
                         self.stockData[ticker]['time'] = nowInUk
-                        logger.debug(f"stockUpdateThread {self.stockData[ticker]}")
+                        logger.debug("stockUpdateThread %s", self.stockData[ticker])
                 finally:
                     self.lock.release()
-
-            if nextStockIdx + maxStocksPerPass >= (len(self.fullTickerList) if updateUsingFullList else len(self.highFreqSymList)):
-                nextStockIdx = 0
-                firstpass = False
-            else:
-                nextStockIdx += maxStocksPerPass
-            delayTime = 10 if firstpass else 120
-            for delayCount in range(delayTime):
-                if not self.running:
-                    break
-                time.sleep(1)
+                for sym in stocks:
+                    if sym in stkdata:
+                        self._scheduler.recordQuote(sym, stkdata[sym].get('price'))
+                    else:
+                        self._scheduler.recordPollAttempt(sym)
+            # No fixed delay here - requests are paced by the rate limiter
 
     def get_quotes(self, symbols):
         """
         Get all available quote data for the given ticker symbols.
-        Returns a dictionary.
+        Returns a dictionary. Symbols are looked up concurrently (up to
+        maxConcurrentRequests), each going on to the alternate source as soon as
+        Google fails for it, so one slow symbol doesn't hold up the rest
         """
-        tryAlternateList = []
+        if len(symbols) == 1:
+            results = [self._getQuote(symbols[0])]
+        else:
+            results = self._executor.map(self._getQuote, symbols)
         quotes = {}
-        for symbol in symbols:
-            try:
-                stockInfoJson = self.requestFromGoogle(symbol)
-                stkData = json.loads(stockInfoJson)
-                if len(stkData) > 0:
-                    stkFirst = stkData[0]
-                    quotes[symbol] = dict( name=stkFirst["name"] )
-                    if "l" in stkFirst:
-                        quotes[symbol]["price"] = stkFirst["l"]
-                    if "c" in stkFirst:
-                        quotes[symbol]["change"] = stkFirst["c"]
-                    if "vo" in stkFirst:
-                        quotes[symbol]["volume"] = stkFirst["vo"]
-                    if "cp" in stkFirst:
-                        quotes[symbol]["chg_percent"] = stkFirst["cp"]
-            except:
-                logger.debug(f"StockValues_Google: failed to get quote for {symbol}")
-                tryAlternateList.append(symbol)
-        # Now try an alternate source
-        for symbol in tryAlternateList:
-            try:
-                dotPos = symbol.find(".")
-                if dotPos >= 0:
-                    sym = symbol[:dotPos]
-                    exchange = symbol[dotPos+1:]
-                    if exchange == "L":
-                        exchange = "LSE"
-                    stockInfo = self.requestFromAlternate(sym, exchange)
-                    quotes[symbol] = stockInfo
-            except:
-                logger.debug(f"Couldn't get quote for {symbol} from alternate source")
+        for symbol, quote in zip(symbols, results):
+            if quote is not None:
+                quotes[symbol] = quote
         return quotes
 
+    def _getQuote(self, symbol):
+        """Quote for one symbol from Google, else the alternate source - None if neither has it"""
+        try:
+            stkData = json.loads(self.requestFromGoogle(symbol))
+            if len(stkData) <= 0:
+                return None
+            stkFirst = stkData[0]
+            quote = dict( name=stkFirst["name"] )
+            if "l" in stkFirst:
+                quote["price"] = stkFirst["l"]
+            if "c" in stkFirst:
+                quote["change"] = stkFirst["c"]
+            if "vo" in stkFirst:
+                quote["volume"] = stkFirst["vo"]
+            if "cp" in stkFirst:
+                quote["chg_percent"] = stkFirst["cp"]
+            return quote
+        except Exception:
+            logger.debug("StockValues_Google: failed to get quote for %s", symbol)
+        # Now try an alternate source
+        try:
+            dotPos = symbol.find(".")
+            if dotPos >= 0:
+                sym = symbol[:dotPos]
+                exchange = symbol[dotPos+1:]
+                if exchange == "L":
+                    exchange = "LSE"
+                return self.requestFromAlternate(sym, exchange)
+        except Exception:
+            logger.debug("Couldn't get quote for %s from alternate source", symbol)
+        return None
+
+    def _rateLimitedGet(self, url):
+        """GET over the pooled session once the rate limiter allows it - raises on HTTP errors"""
+        self._acquireRequestSlot()
+        response = self._session.get(url, timeout=self.REQUEST_TIMEOUT_SECS)
+        if self._rateLimiter.notifyResponse(response.status_code, response.headers.get('Retry-After')):
+            raise RuntimeError(f"StockValues_Google: rate limited by {url}")
+        response.raise_for_status()
+        return response
+
+    def _acquireRequestSlot(self):
+        if not self._rateLimiter.acquire(abortCheck=lambda: not self.running):
+            raise RuntimeError("StockValues_Google: stopped while waiting for rate limiter")
+
     # def stripQuotes(self, inStr):
     #     if inStr.startswith('"') and inStr.endswith('"'):
     #         inStr = inStr[1:-1]
     #     return inStr
     
     def requestFromGoogle(self, symbol):
-        url = 'https://finance.google.com/finance?output=json&q=' + symbol
-        logger.debug(f"StockValues_Google: Requesting {url}")
-        req = Request(url)
-        resp = urlopen(req)
-        readVal = resp.read()
-        jsonStr = str(readVal.decode('utf-8').strip())
+        url = self.googleBaseUrl + '/finance?output=json&q=' + symbol
+        logger.debug("StockValues_Google: Requesting %s", url)
+        resp = self._rateLimitedGet(url)
+        jsonStr = resp.content.decode('utf-8').strip()
         # Check if it starts with // and remove if so
         slashslashPos = jsonStr.find("//")
         if slashslashPos >= 0 and slashslashPos < 10:
@@ -305,17 +442,16 @@ class StockValues_Google:
 
     def requestFromAlternate(self, symbol, exchange):
 
-        url = 'http://eoddata.com/stockquote/' + exchange + "/" + symbol + ".htm"
-        logger.debug(f"StockValues_Google: Requesting {url}")
-        req = requests.get(url)
-        # Get page and parse
-        soup = BeautifulSoup(req.text, "html5lib")
+        url = self.alternateBaseUrl + '/stockquote/' + exchange + "/" + symbol + ".htm"
+        logger.debug("StockValues_Google: Requesting %s", url)
+        req = self._rateLimitedGet(url)
+        # Only the name and performance tables are scanned - the rest of the page is skipped
         stockInfo = {}
-        nameTable = soup.select("#ctl00_cph1_qp1_div1 div.rc_bg_bl table tr td")
+        nameTable = HtmlTableExtractor.extractCells(req.text, "#ctl00_cph1_qp1_div1 div.rc_bg_bl table")
         if len(nameTable) > 2:
-            stockInfo["name"] = nameTable[1].getText().strip()
+            stockInfo["name"] = nameTable[1]
 
-        perfTable = soup.select("#ctl00_cph1_qp1_div1 div.cb table tr td b")
+        perfTable = HtmlTableExtractor.extractCells(req.text, "#ctl00_cph1_qp1_div1 div.cb table", cellSubTag="b")
         # Extract stocks table info
 
         attrNames = ["price", "change", "open", "high", "ask", "volume", "chg_percent", "prev", "low", "bid",
@@ -323,5 +459,5 @@ class StockValues_Google:
         for elIdx in range(len(perfTable)):
             if elIdx >= len(attrNames):
                 break
-            stockInfo[attrNames[elIdx]] = perfTable[elIdx].getText().strip()
+            stockInfo[attrNames[elIdx]] = perfTable[elIdx]
         return stockInfo
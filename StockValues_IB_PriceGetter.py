@@ -12,6 +12,7 @@ import logging
 from ibapi import contract
 from StockValues_IB_MarketDataWrapper import StockValues_IB_MarketDataWrapper
 from StockValues_IB_MarketDataClient import StockValues_IB_MarketDataClient
+from LatencyTracker import latencyTracker
 
 logger = logging.getLogger("StockTickerLogger")
 
@@ -40,6 +41,10 @@ class StockValues_IB_PriceGetter(StockValues_IB_MarketDataWrapper, StockValues_I
         StockValues_IB_MarketDataWrapper.__init__(self)
         StockValues_IB_MarketDataClient.__init__(self, wrapper=self)
         
+        # A lock for the dictionary used to access symbol values - created before the
+        # threads that use it are started
+        self.mapsLock = threading.Lock()
+
         # Connect using the passed params
         self.connect(ipaddress, portid, clientid)
         
@@ -48,17 +53,18 @@ class StockValues_IB_PriceGetter(StockValues_IB_MarketDataWrapper, StockValues_I
         self.getterThread.start()
         setattr(self, "_thread", self.getterThread)
         
-        # A thread for adding the market requests
-        self.requestAddStockList = []
-        self.requestRemoveStockList = []
+        # A thread for adding the market requests - symbols waiting to be requested or
+        # cancelled (dicts used as ordered sets). Subscribe/unsubscribe decide from the
+        # symbols wanted rather than those already requested, so a change made while the
+        # request thread is applying earlier ones is queued rather than lost
+        self._wantedSymbols = set()
+        self.requestAddStocks = {}
+        self.requestRemoveStocks = {}
         self.requestStockListChanged = False
         self.requestListLock = threading.Lock()
         self.requestThreadRunning = True
         self.requestThread = threading.Thread(target = self.requestMarketData)
         self.requestThread.start()
-        
-        # A lock for the dictionary used to access symbol values
-        self.mapsLock = threading.Lock()
 
     def error(self, reqId:int, errorCode:int, errorString:str):
         if errorCode == 200 or errorCode == 504: # security not found OR not connected
@@ -83,17 +89,36 @@ class StockValues_IB_PriceGetter(StockValues_IB_MarketDataWrapper, StockValues_I
         self.requestThreadRunning = False
 
     def setStocks(self, stockList):
-        # Record list to be got
+        # Subscribe and unsubscribe the differences from the symbols currently wanted
+        wanted = set(stockList)
         with self.requestListLock:
-            self.requestAddStockList = []
-            with self.mapsLock:
-                for sym in stockList:
-                    if sym not in self._mapSymbolToPriceReqId:
-                        self.requestAddStockList.append(sym)
-                for sym, reqId in self._mapSymbolToPriceReqId.items():
-                    if sym not in stockList:
-                        self.requestRemoveStockList.append(sym)
-            if len(self.requestAddStockList) > 0 or len(self.requestRemoveStockList) > 0:
+            current = set(self._wantedSymbols)
+        self.unsubscribe([sym for sym in current if sym not in wanted])
+        self.subscribe(stockList)
+
+    def subscribe(self, symbols):
+        # Market data requests are made on the request thread
+        with self.requestListLock:
+            for sym in symbols:
+                if sym in self._wantedSymbols:
+                    continue
+                self._wantedSymbols.add(sym)
+                # A cancel not yet applied is dropped - one already taken by the request
+                # thread is applied before this request
+                self.requestRemoveStocks.pop(sym, None)
+                self.requestAddStocks[sym] = True
+            if self.requestAddStocks or self.requestRemoveStocks:
+                self.requestStockListChanged = True
+
+    def unsubscribe(self, symbols):
+        with self.requestListLock:
+            for sym in symbols:
+                if sym not in self._wantedSymbols:
+                    continue
+                self._wantedSymbols.discard(sym)
+                self.requestAddStocks.pop(sym, None)
+                self.requestRemoveStocks[sym] = True
+            if self.requestAddStocks or self.requestRemoveStocks:
                 self.requestStockListChanged = True
 
     def clear(self):
@@ -192,25 +217,24 @@ class StockValues_IB_PriceGetter(StockValues_IB_MarketDataWrapper, StockValues_I
         while self.requestThreadRunning:
             # Check if there is new data
             if self.requestStockListChanged:
-                self.requestStockListChanged = False
-                # Add new stocks
-                stockList = []
-                with self.requestListLock:
-                    for stk in self.requestAddStockList:
-                        stockList.append(stk)
-                # Go through adding stocks
-                for stk in stockList:
-                    self.addYSymbol(stk)
-                # Remove unwanted stocks
-                stockList = []
-                with self.requestListLock:
-                    for stk in self.requestRemoveStockList:
-                        stockList.append(stk)
-                # Go through adding stocks
-                for stk in stockList:
-                    self.removeSymbol(stk)
+                self.applyRequestChanges()
             time.sleep(1)
 
+    def applyRequestChanges(self):
+        # Take the waiting changes - only these symbols' requests are touched. Changes
+        # made meanwhile are queued and applied next time (adding and removing a symbol
+        # already requested or cancelled does nothing)
+        with self.requestListLock:
+            self.requestStockListChanged = False
+            addList = list(self.requestAddStocks)
+            removeList = list(self.requestRemoveStocks)
+            self.requestAddStocks = {}
+            self.requestRemoveStocks = {}
+        for stk in addList:
+            self.addYSymbol(stk)
+        for stk in removeList:
+            self.removeSymbol(stk)
+
     def marketDataCallback(self, reqId, tickType, price, attrib):
         pass
 
@@ -275,6 +299,7 @@ class StockValues_IB_PriceGetter(StockValues_IB_MarketDataWrapper, StockValues_I
                     self._nextReqId += 1
         # Callback if data has changed
         if symbolDataChanged is not None:
+            latencyTracker.markReceived(symbolDataChanged, "interactive_brokers")
             self._symbolChangedCallback(symbolDataChanged)
 
     def tickSize(self, reqId:int, tickType:int, size:int):
@@ -301,6 +326,7 @@ class StockValues_IB_PriceGetter(StockValues_IB_MarketDataWrapper, StockValues_I
                     stockInfo["time"] = nowInUk
         # Callback if data has changed
         if symbolDataChanged is not None:
+            latencyTracker.markReceived(symbolDataChanged, "interactive_brokers")
             self._symbolChangedCallback(symbolDataChanged)
 
     def tickString(self, reqId:int, tickType:int, value:str):
@@ -10,10 +10,11 @@ import time
 import copy
 import logging
 from StockValues_IB_PriceGetter import StockValues_IB_PriceGetter
+from StockProvider import StockProvider
 
 logger = logging.getLogger("StockTickerLogger")
 
-class StockValues_InteractiveBrokers:
+class StockValues_InteractiveBrokers(StockProvider):
     """
     Interactive Brokers stock data provider.
     Refactored to remove internal fallback mechanisms - fallback logic is now handled by StockProviderManager.
@@ -43,6 +44,20 @@ class StockValues_InteractiveBrokers:
         logger.info(f"StockValues_InteractiveBrokers setStocks: {len(stockList)} symbols: {stockList}")
         self._priceGetter.setStocks(stockList)
 
+    def subscribe(self, symbols):
+        """Start market data for symbols - existing subscriptions are left alone"""
+        logger.info(f"StockValues_InteractiveBrokers subscribe: {len(symbols)} symbols: {symbols}")
+        self._priceGetter.subscribe(symbols)
+
+    def unsubscribe(self, symbols):
+        """Cancel market data for symbols"""
+        logger.info(f"StockValues_InteractiveBrokers unsubscribe: {len(symbols)} symbols: {symbols}")
+        self._priceGetter.unsubscribe(symbols)
+
+    def addStock(self, symbol):
+        """Add a single stock symbol (legacy method for compatibility)"""
+        self.subscribe([symbol])
+
     def setCallback(self, callback):
         """Set the callback function to be called when stock data changes"""
         self._symbolChangedCallback = callback
@@ -55,7 +70,7 @@ class StockValues_InteractiveBrokers:
         
         # Call the callback if one has been set (for StockProviderManager)
         if self._symbolChangedCallback:
-            logger.debug(f"StockValues_InteractiveBrokers symbolDataChanged calling callback for {symbol}")
+            logger.debug("StockValues_InteractiveBrokers symbolDataChanged calling callback for %s", symbol)
             self._symbolChangedCallback(symbol)
 
     def getMapOfStocksChangedSinceUIUpdated(self):
@@ -10,10 +10,12 @@ import copy
 import datetime
 import pytz
 from typing import Dict, Optional, Callable
+from LatencyTracker import latencyTracker
+from StockProvider import StockProvider
 
 logger = logging.getLogger("StockTickerLogger")
 
-class StockValues_Test:
+class StockValues_Test(StockProvider):
     """Test stock provider that returns predictable, changing values"""
     
     bOnlyUpdateWhileMarketOpen = False
@@ -66,12 +68,21 @@ class StockValues_Test:
         logger.info("StockValues_Test initialized with test data for UI testing")
     
     def setStocks(self, stockList):
-        """Set list of symbols to provide test data for"""
-        self._stock_list = stockList
-        logger.info(f"StockValues_Test setStocks: {len(stockList)} symbols: {stockList}")
-        
-        # Initialize any missing symbols with default data
-        for symbol in stockList:
+        """Set list of symbols to provide test data for - applied as subscribe/unsubscribe of the differences"""
+        wanted = set(stockList)
+        self.unsubscribe([symbol for symbol in self._stock_list if symbol not in wanted])
+        self.subscribe(stockList)
+
+    def subscribe(self, symbols):
+        """Start providing test data for symbols - existing symbols carry on their price cycle"""
+        current = set(self._stock_list)
+        added = []
+        for symbol in symbols:
+            if symbol in current:
+                continue
+            current.add(symbol)
+            added.append(symbol)
+            # Initialize any missing symbols with default data
             if symbol not in self._test_data:
                 # Create deterministic but varied test data
                 base_price = 100.0 + (hash(symbol) % 500)
@@ -82,10 +93,28 @@ class StockValues_Test:
                     'name': f'Test Company {symbol}'
                 }
                 logger.debug(f"StockValues_Test: Added test data for {symbol} with base price {base_price}")
+        if added:
+            # Replaced rather than appended to as the update loop iterates over it
+            self._stock_list = self._stock_list + added
+            logger.info(f"StockValues_Test subscribe: {len(added)} symbols: {added}")
         
         # Start the update loop if not already running
         if not self._running:
             self.run()
+        return added
+
+    def unsubscribe(self, symbols):
+        """Stop providing test data for symbols"""
+        removedSet = set(symbols)
+        removed = [symbol for symbol in self._stock_list if symbol in removedSet]
+        if removed:
+            self._stock_list = [symbol for symbol in self._stock_list if symbol not in removedSet]
+            logger.info(f"StockValues_Test unsubscribe: {len(removed)} symbols: {removed}")
+        return removed
+
+    def addStock(self, symbol):
+        """Add a single stock symbol (legacy method for compatibility)"""
+        self.subscribe([symbol])
     
     def setCallback(self, callback):
         """Set the callback function to be called when stock data changes"""
@@ -99,7 +128,7 @@ class StockValues_Test:
         
         # Call the callback if one has been set (for StockProviderManager)
         if self._symbolChangedCallback:
-            logger.debug(f"StockValues_Test symbolDataChanged calling callback for {symbol}")
+            logger.debug("StockValues_Test symbolDataChanged calling callback for %s", symbol)
             self._symbolChangedCallback(symbol)
     
     def getMapOfStocksChangedSinceUIUpdated(self):
@@ -127,7 +156,7 @@ class StockValues_Test:
                 'last_update': time.time(),
                 'failCount': 0
             }
-            logger.debug(f"StockValues_Test getStockData for {symbol}: price={data['current']:.2f}, change={change:+.2f}")
+            logger.debug("StockValues_Test getStockData for %s: price=%.2f, change=%+.2f", symbol, data['current'], change)
             return result
         else:
             logger.warning(f"StockValues_Test getStockData: No test data for {symbol}")
@@ -155,6 +184,9 @@ class StockValues_Test:
             logger.error(f"StockValues_Test getMarketOpenStatus error: {e}")
             return "Market Status Unknown (Test Mode)"
     
+    def getHealth(self):
+        return {"subscribed": len(self._stock_list), "running": self._running}
+
     def start(self):
         """Start the test provider (alias for run())"""
         self.run()
@@ -199,10 +231,11 @@ class StockValues_Test:
                             data['cycle'] += 1
                             
                             # Notify of change
+                            latencyTracker.markReceived(symbol, "test")
                             self.symbolDataChanged(symbol)
                             symbols_updated += 1
                             
-                            logger.debug(f"StockValues_Test: Updated {symbol} to {data['current']:.2f} (variation: {variation_pct:+.1f}%)")
+                            logger.debug("StockValues_Test: Updated %s to %.2f (variation: %+.1f%%)", symbol, data['current'], variation_pct)
                     
                     if symbols_updated > 0:
                         logger.info(f"StockValues_Test: Updated {symbols_updated} symbols in test cycle")
@@ -5,15 +5,31 @@ import time
 import copy
 import requests
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from RateLimiter import TokenBucketRateLimiter
+from PollScheduler import PollScheduler
+from LatencyTracker import latencyTracker
+from StockProvider import StockProvider
 
 logger = logging.getLogger("StockTickerLogger")
 
-class StockValues_YahooAPI:
+class StockValues_YahooAPI(StockProvider):
     bOnlyUpdateWhileMarketOpen = False
     
+    # Symbols per quotes request and default number of requests in flight at once
+    SYMBOLS_PER_REQUEST = 10
+    DEFAULT_MAX_CONCURRENT_REQUESTS = 4
+    
+    # Default quota if none is configured and attempts at a request rejected with HTTP 429
+    DEFAULT_REQUESTS_PER_MINUTE = 2
+    DEFAULT_REQUEST_BURST = 5
+    MAX_RATE_LIMITED_ATTEMPTS = 3
+    
     def __init__(self, callback=None):
+        # Subscribed symbols - replaced (never modified in place) under listUpdateLock
         self.tickerlist = []
-        self.pendingTickerlist = None
+        self._subscriptionsChanged = False
         self.running = False
         self.openhour = 8
         self.openmin = 0
@@ -42,6 +58,69 @@ class StockValues_YahooAPI:
             'X-RapidAPI-Host': self.api_host
         }
         
+        # Pooled HTTP connections (kept alive between passes) and a worker pool
+        # so several batches can be in flight at once
+        self.maxConcurrentRequests = self.DEFAULT_MAX_CONCURRENT_REQUESTS
+        self._session = None
+        self._executor = None
+        self._createHttpPool()
+        
+        # Requests are paced by the rate limiter and the scheduler picks the most urgent
+        # symbols for each pass. When the market is closed there's little point using
+        # quota so symbols are only refreshed every few minutes
+        self._rateLimiter = TokenBucketRateLimiter("yahoo_api", self.DEFAULT_REQUESTS_PER_MINUTE, self.DEFAULT_REQUEST_BURST)
+        self._stopping = False
+        self._scheduler = PollScheduler()
+        self.minRefreshSecsMarketOpen = 15
+        self.minRefreshSecsMarketClosed = 300
+        
+    @classmethod
+    def fromConfig(cls, configIni, callback):
+        provider = cls(callback)
+        apiKey = configIni.getStr("YAHOO_FINANCE_API_KEY")
+        apiHost = configIni.getStr("YAHOO_API_HOST", "yahoo-finance15.p.rapidapi.com")
+        if apiKey:
+            provider.setApiKey(apiKey)
+        if apiHost:
+            provider.setApiHost(apiHost)
+        provider.setMaxConcurrentRequests(configIni.getInt("YAHOO_API_MAX_CONCURRENT_REQUESTS", cls.DEFAULT_MAX_CONCURRENT_REQUESTS))
+        provider.setRateLimiter(TokenBucketRateLimiter.fromConfig(
+            configIni, "YAHOO_API", cls.DEFAULT_REQUESTS_PER_MINUTE, cls.DEFAULT_REQUEST_BURST))
+        return provider
+
+    def _createHttpPool(self):
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=self.maxConcurrentRequests)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        oldSession, oldExecutor = self._session, self._executor
+        self._session = session
+        self._executor = ThreadPoolExecutor(max_workers=self.maxConcurrentRequests, thread_name_prefix="YahooAPIFetch")
+        if oldExecutor is not None:
+            oldExecutor.shutdown(wait=False)
+        if oldSession is not None:
+            oldSession.close()
+
+    def setHoldings(self, holdingsBySymbol):
+        """Set shares held per symbol - larger positions are refreshed more often"""
+        self._scheduler.setHoldings(holdingsBySymbol)
+
+    def setVisibleSymbols(self, visibleSymbols):
+        """Set symbols visible in the UI - these are refreshed ahead of hidden ones"""
+        self._scheduler.setVisibleSymbols(visibleSymbols)
+
+    def setRateLimiter(self, rateLimiter):
+        """Set the rate limiter to acquire from before each request"""
+        self._rateLimiter = rateLimiter
+
+    def setMaxConcurrentRequests(self, maxConcurrentRequests):
+        """Set the number of quote requests that can be in flight at once"""
+        maxConcurrentRequests = max(1, int(maxConcurrentRequests))
+        if maxConcurrentRequests != self.maxConcurrentRequests:
+            self.maxConcurrentRequests = maxConcurrentRequests
+            self._createHttpPool()
+        logger.debug(f"StockValues_YahooAPI setMaxConcurrentRequests: {maxConcurrentRequests}")
+        
     def setApiKey(self, api_key):
         self.api_key = api_key
         self.headers['X-RapidAPI-Key'] = api_key
@@ -53,14 +132,50 @@ class StockValues_YahooAPI:
         self.base_url = f"https://{api_host}"
         
     def setStocks(self, stockList):
-        """Set list of symbols to monitor"""
-        logger.info(f"StockValues_YahooAPI setStocks: {len(stockList)} symbols: {stockList}")
-        curList = []
-        for sym in stockList:
-            curList.append(sym)
-        self.listUpdateLock.acquire()
-        self.pendingTickerlist = curList
-        self.listUpdateLock.release()
+        """Set list of symbols to monitor - applied as subscribe/unsubscribe of the differences"""
+        with self.listUpdateLock:
+            wanted = set(stockList)
+            removed = [sym for sym in self.tickerlist if sym not in wanted]
+        self.unsubscribe(removed)
+        self.subscribe(stockList)
+
+    def subscribe(self, symbols):
+        """Start getting quotes for symbols - those already subscribed keep their data and schedule"""
+        with self.listUpdateLock:
+            current = set(self.tickerlist)
+            added = []
+            for sym in symbols:
+                if sym not in current:
+                    current.add(sym)
+                    added.append(sym)
+                    self._scheduler.addSymbol(sym)
+            if added:
+                self.tickerlist = self.tickerlist + added
+                self._subscriptionsChanged = True
+        if added:
+            logger.info(f"StockValues_YahooAPI subscribe: {len(added)} symbols: {added}")
+        return added
+
+    def unsubscribe(self, symbols):
+        """Stop getting quotes for symbols and drop their cached data"""
+        with self.listUpdateLock:
+            current = set(self.tickerlist)
+            removed = [sym for sym in dict.fromkeys(symbols) if sym in current]
+            for sym in removed:
+                self._scheduler.removeSymbol(sym)
+            if removed:
+                removedSet = set(removed)
+                self.tickerlist = [sym for sym in self.tickerlist if sym not in removedSet]
+        if removed:
+            with self.lock:
+                for sym in removed:
+                    self.stockData.pop(sym, None)
+            logger.info(f"StockValues_YahooAPI unsubscribe: {len(removed)} symbols: {removed}")
+        return removed
+
+    def addStock(self, symbol):
+        """Add a single stock symbol (legacy method for compatibility)"""
+        self.subscribe([symbol])
 
     def setCallback(self, callback):
         """Set the callback function to be called when stock data changes"""
@@ -74,7 +189,7 @@ class StockValues_YahooAPI:
         
         # Call the callback if one has been set (for StockProviderManager)
         if self._symbolChangedCallback:
-            logger.debug(f"StockValues_YahooAPI symbolDataChanged calling callback for {symbol}")
+            logger.debug("StockValues_YahooAPI symbolDataChanged calling callback for %s", symbol)
             self._symbolChangedCallback(symbol)
 
     def getMapOfStocksChangedSinceUIUpdated(self):
@@ -108,20 +223,31 @@ class StockValues_YahooAPI:
         self.bOnlyUpdateWhileMarketOpen = onlyWhenOpen
         logger.debug(f"StockValues_YahooAPI setOnlyUpdateWhenMarketOpen: {onlyWhenOpen}")
         
+    def getHealth(self):
+        return {"status": self.status, "subscribed": len(self.tickerlist), "running": self.running,
+                "rateLimiter": self._rateLimiter.getStats()}
+
     def start(self):
         """Start the provider (alias for run())"""
         self.run()
         
     def run(self):
-        """Start the provider"""
+        """Start the provider - the worker pool shut down by stop() is recreated"""
+        if self._executor is None:
+            self._createHttpPool()
         logger.info("StockValues_YahooAPI started")
         self.running = True
+        self._stopping = False
         self.t = threading.Thread(target=self.stockUpdateThread)
         self.t.start()        
 
     def stop(self):
         """Stop the provider"""
         self.running = False
+        self._stopping = True
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
         logger.info("StockValues_YahooAPI stopped")
         
     def getMarketOpenStatus(self):
@@ -139,21 +265,21 @@ class StockValues_YahooAPI:
 
     def stockUpdateThread(self):
         firstpass = True
-        nextStockIdx = 0
-        maxStocksPerPass = 10  # Smaller batches for API rate limits
+        passDidWork = False
         
         while self.running:
-            time.sleep(1)
+            if not passDidWork:
+                time.sleep(1)
+            passDidWork = False
 
-            # Check if the stock list has been updated
+            # New subscriptions are fetched even if the market is closed - the scheduler
+            # already has them (never polled, so first in the next batch)
             updateNeeded = False
-            self.listUpdateLock.acquire()
-            if self.pendingTickerlist != None:
-                self.tickerlist = self.pendingTickerlist
-                self.pendingTickerlist = None
-                self.dataUpdatedSinceLastUIUpdate = True
-                updateNeeded = True
-            self.listUpdateLock.release()
+            with self.listUpdateLock:
+                if self._subscriptionsChanged:
+                    self._subscriptionsChanged = False
+                    self.dataUpdatedSinceLastUIUpdate = True
+                    updateNeeded = True
 
             # Check market status
             nowInUk = datetime.datetime.now(pytz.timezone('GB'))
@@ -172,72 +298,93 @@ class StockValues_YahooAPI:
             if not updateNeeded:
                 continue
 
-            # Check list isn't empty
-            if len(self.tickerlist) <= 0:
-                continue
-
-            # Update the list
-            stocks = self.tickerlist[nextStockIdx:nextStockIdx+maxStocksPerPass]
+            # Pick the most urgent symbols - enough for one request on each connection
+            self._scheduler.setMinRefreshSecs(self.minRefreshSecsMarketOpen if marketOpen else self.minRefreshSecsMarketClosed)
+            stocks = self._scheduler.nextBatch(self.SYMBOLS_PER_REQUEST * self.maxConcurrentRequests)
             if len(stocks) <= 0:
+                if self._scheduler.numSymbols() > 0:
+                    firstpass = False
                 continue
 
-            stkdataValid = False
+            # Batches are fetched concurrently, paced by the rate limiter
             try:
-                stkdata = self.get_quotes(stocks)
-                stkdataValid = True
+                stkdata = self.get_quotes_concurrent(stocks)
+                for sym in stocks:
+                    quote = stkdata.get(sym)
+                    if quote is not None and quote.get('failCount', 0) == 0:
+                        latencyTracker.markReceived(sym, "yahoo_api")
+                        self._scheduler.recordQuote(sym, quote.get('price'))
+                    else:
+                        self._scheduler.recordPollAttempt(sym)
+                self._storeQuotes(stkdata, nowInUk)
             except Exception as e:
-                logger.debug(f"Yahoo API get_quote failed for {stocks}: {e}")
+                logger.error(f"Error in stockUpdateThread: {e}")
                 self.status = "failed for " + str(stocks[0])
+                for sym in stocks:
+                    self._scheduler.recordPollAttempt(sym)
+            passDidWork = True
 
-            if stkdataValid:
-                try:
-                    # Store the data and track changes
-                    changed_symbols = []
-                    
-                    self.lock.acquire()
-                    for ticker, values in stkdata.items():
-                        # Store the data first
-                        old_data = self.stockData.get(ticker, {})
-                        self.stockData[ticker] = values
-                        self.stockData[ticker]['failCount'] = 0
-                        self.stockData[ticker]['time'] = nowInUk
-                        logger.debug(f"Updated {ticker}: {self.stockData[ticker]}")
-                        
-                        # Check if data has changed
-                        data_changed = False
-                        for k, v in values.items():
-                            if k not in old_data or old_data[k] != v:
-                                data_changed = True
-                                break
-                        
-                        if data_changed:
-                            self.dataUpdatedSinceLastUIUpdate = True
-                            changed_symbols.append(ticker)
-                            
-                    self.lock.release()
+    def _storeQuotes(self, stkdata, nowInUk):
+        """Store quote data and notify of symbols whose data has changed"""
+        changed_symbols = []
+        # Quotes for symbols unsubscribed while the request was in flight are discarded
+        subscribed = set(self.tickerlist)
+        with self.lock:
+            for ticker, values in stkdata.items():
+                if ticker not in subscribed:
+                    continue
+                # Store the data first
+                old_data = self.stockData.get(ticker, {})
+                self.stockData[ticker] = values
+                self.stockData[ticker]['failCount'] = values.get('failCount', 0)
+                self.stockData[ticker]['time'] = nowInUk
+                logger.debug("Updated %s: %s", ticker, self.stockData[ticker])
+                
+                # Check if data has changed
+                data_changed = False
+                for k, v in values.items():
+                    if k != 'time' and (k not in old_data or old_data[k] != v):
+                        data_changed = True
+                        break
+                
+                if data_changed:
+                    self.dataUpdatedSinceLastUIUpdate = True
+                    changed_symbols.append(ticker)
                     
-                    # Call callbacks AFTER releasing the lock to avoid deadlock
-                    for ticker in changed_symbols:
-                        self.symbolDataChanged(ticker)
-                        
-                except Exception as e:
-                    logger.error(f"Error in stockUpdateThread: {e}")
-                    if hasattr(self, 'lock') and self.lock.locked():
-                        self.lock.release()
+        # Call callbacks AFTER releasing the lock to avoid deadlock
+        for ticker in changed_symbols:
+            self.symbolDataChanged(ticker)
 
-            # Move to next batch
-            if nextStockIdx + maxStocksPerPass >= len(self.tickerlist):
-                nextStockIdx = 0
-                firstpass = False
-            else:
-                nextStockIdx += maxStocksPerPass
-            
-            # Delay between requests to respect rate limits
-            delayTime = 5 if firstpass else (30 if marketOpen else 300)
-            for delayCount in range(delayTime):
-                if not self.running:
-                    break
-                time.sleep(1)
+    def get_quotes_concurrent(self, symbols):
+        """
+        Get quotes for any number of symbols, splitting them into batches which are
+        requested concurrently (up to maxConcurrentRequests) over pooled connections
+        """
+        batches = [symbols[i:i + self.SYMBOLS_PER_REQUEST] for i in range(0, len(symbols), self.SYMBOLS_PER_REQUEST)]
+        quotes = {}
+        if len(batches) == 1:
+            quotes.update(self.get_quotes(batches[0]))
+            return quotes
+        # Stopped (and the pool shut down) while a pass was starting
+        executor = self._executor
+        if executor is None:
+            return quotes
+        for batchQuotes in executor.map(self.get_quotes, batches):
+            quotes.update(batchQuotes)
+        return quotes
+
+    def _rateLimitedGet(self, url, params):
+        """
+        GET using the pooled session once the rate limiter allows it, retrying if the
+        server answers HTTP 429. Returns None if still rate limited or stopping
+        """
+        for attempt in range(self.MAX_RATE_LIMITED_ATTEMPTS):
+            if not self._rateLimiter.acquire(abortCheck=lambda: self._stopping):
+                return None
+            response = self._session.get(url, headers=self.headers, params=params, timeout=10)
+            if not self._rateLimiter.notifyResponse(response.status_code, response.headers.get('Retry-After')):
+                return response
+        return None
 
     def get_quotes(self, symbols):
         """
@@ -253,7 +400,11 @@ class StockValues_YahooAPI:
             ticker_param = ','.join(symbols)
             params = {'ticker': ticker_param}
             
-            response = requests.get(url, headers=self.headers, params=params, timeout=10)
+            response = self._rateLimitedGet(url, params)
+            if response is None:
+                # Not a failure of these symbols so don't mark them failed - they'll be retried
+                logger.warning(f"StockValues_YahooAPI: rate limited, skipping {symbols}")
+                return quotes
             response.raise_for_status()
             
             data = response.json()
@@ -276,7 +427,7 @@ class StockValues_YahooAPI:
                             'low': item.get('regularMarketDayLow', 0),
                             'close': item.get('regularMarketPreviousClose', 0),
                         }
-                        logger.debug(f"Successfully got quote for {symbol}: price={quotes[symbol]['price']}")
+                        logger.debug("Successfully got quote for %s: price=%s", symbol, quotes[symbol]['price'])
             else:
                 logger.warn(f"Unexpected API response format: {data}")
                 
@@ -307,7 +458,9 @@ class StockValues_YahooAPI:
             url = f"{self.base_url}/v1/search"
             params = {'query': query}
             
-            response = requests.get(url, headers=self.headers, params=params, timeout=10)
+            response = self._rateLimitedGet(url, params)
+            if response is None:
+                return None
             response.raise_for_status()
             
             return response.json()
@@ -327,7 +480,9 @@ class StockValues_YahooAPI:
                 'period': period
             }
             
-            response = requests.get(url, headers=self.headers, params=params, timeout=10)
+            response = self._rateLimitedGet(url, params)
+            if response is None:
+                return None
             response.raise_for_status()
             
             return response.json()
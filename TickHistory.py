@@ -0,0 +1,225 @@
+"""
+Persistent tick history for quotes received from the providers.
+Ticks are queued by the caller and appended to an SQLite file by a
+background writer thread, which also rolls them up into 1 minute, 5 minute
+and 1 day OHLCV bars. The query API reads ticks and bars by symbol and time
+range so a session can be replayed or charts backfilled without network.
+"""
+
+import os
+import queue
+import sqlite3
+import threading
+import time
+import logging
+
+logger = logging.getLogger("StockTickerLogger")
+
+class TickHistory:
+    """Append-only SQLite tick log with background OHLCV rollups"""
+
+    # Bar sizes rolled up from ticks (seconds) - day bars are aligned to UTC midnight
+    BAR_INTERVALS_SECS = (60, 300, 86400)
+
+    # Ticks waiting for the writer - further ticks are dropped (and counted) if full
+    MAX_QUEUED_TICKS = 100000
+    # Most ticks written in one transaction
+    MAX_BATCH_TICKS = 1000
+
+    _SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS ticks (symbol TEXT NOT NULL, time REAL NOT NULL, price REAL NOT NULL, volume REAL)",
+        "CREATE INDEX IF NOT EXISTS ticks_symbol_time ON ticks (symbol, time)",
+        "CREATE INDEX IF NOT EXISTS ticks_time ON ticks (time)",
+        "CREATE TABLE IF NOT EXISTS bars (symbol TEXT NOT NULL, interval INTEGER NOT NULL, start REAL NOT NULL, "
+        "open REAL NOT NULL, high REAL NOT NULL, low REAL NOT NULL, close REAL NOT NULL, volume REAL NOT NULL, "
+        "PRIMARY KEY (symbol, interval, start)) WITHOUT ROWID",
+    )
+
+    # Merge a batch's bar into the stored bar - open is kept from the earliest batch
+    _BAR_UPSERT = (
+        "INSERT INTO bars (symbol, interval, start, open, high, low, close, volume) VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+        "ON CONFLICT (symbol, interval, start) DO UPDATE SET "
+        "high = max(high, excluded.high), low = min(low, excluded.low), "
+        "close = excluded.close, volume = volume + excluded.volume"
+    )
+
+    def __init__(self, fileName="tickHistory.db"):
+        self._fileName = fileName
+        self._queue = queue.Queue(self.MAX_QUEUED_TICKS)
+        self._writerThread = None
+        self._running = False
+        self._droppedTicks = 0
+        self._writtenTicks = 0
+        # Last cumulative (day) volume per symbol - bar volume is the increase in it
+        self._lastCumulativeVolume = {}
+        self._readLock = threading.Lock()
+        self._readConnection = None
+
+    @classmethod
+    def fromConfig(cls, configIni):
+        """Create from TICK_HISTORY_FILE - returns None unless TICK_HISTORY_ENABLED is set"""
+        if not configIni.getBool("TICK_HISTORY_ENABLED", False):
+            return None
+        return cls(configIni.getStr("TICK_HISTORY_FILE", "tickHistory.db"))
+
+    def getFileName(self):
+        return self._fileName
+
+    def start(self):
+        if self._running:
+            return
+        dirName = os.path.dirname(self._fileName)
+        if dirName:
+            os.makedirs(dirName, exist_ok=True)
+        # Create the schema before any reader or the writer thread needs it
+        conn = self._connect()
+        conn.close()
+        self._running = True
+        self._writerThread = threading.Thread(target=self._writerLoop, name="TickHistoryWriter", daemon=True)
+        self._writerThread.start()
+        logger.info(f"TickHistory: recording ticks to {self._fileName}")
+
+    def stop(self):
+        """Write any queued ticks and stop the writer thread"""
+        if not self._running:
+            return
+        self._running = False
+        self._queue.put(None)
+        self._writerThread.join()
+        self._writerThread = None
+        with self._readLock:
+            if self._readConnection is not None:
+                self._readConnection.close()
+                self._readConnection = None
+        logger.info(f"TickHistory: stopped - {self._writtenTicks} ticks written, {self._droppedTicks} dropped")
+
+    def recordTick(self, symbol, price, volume=None, timestamp=None):
+        """Queue a tick for writing - never blocks the caller"""
+        if not self._running or price is None:
+            return
+        timestamp = time.time() if timestamp is None else timestamp
+        try:
+            self._queue.put_nowait((symbol, float(timestamp), float(price), None if volume is None else float(volume)))
+        except queue.Full:
+            self._droppedTicks += 1
+
+    def flush(self):
+        """Wait until every tick queued so far has been written"""
+        if self._running:
+            self._queue.join()
+
+    def getStats(self):
+        return {"queued": self._queue.qsize(), "written": self._writtenTicks, "dropped": self._droppedTicks}
+
+    def getSymbols(self):
+        return [row[0] for row in self._query("SELECT DISTINCT symbol FROM bars WHERE interval = ? ORDER BY symbol",
+                                              (self.BAR_INTERVALS_SECS[-1],))]
+
+    def getTicks(self, symbol, startTime=None, endTime=None):
+        """Ticks as (time, price, volume) tuples in time order, endTime exclusive"""
+        return self._query("SELECT time, price, volume FROM ticks WHERE symbol = ? AND time >= ? AND time < ? "
+                           "ORDER BY time, rowid", (symbol,) + self._timeRange(startTime, endTime))
+
+    def getBars(self, symbol, intervalSecs, startTime=None, endTime=None):
+        """OHLCV bars starting within the time range as dicts in time order"""
+        if intervalSecs not in self.BAR_INTERVALS_SECS:
+            raise ValueError(f"TickHistory: no {intervalSecs}s bars, choose from {self.BAR_INTERVALS_SECS}")
+        rows = self._query("SELECT start, open, high, low, close, volume FROM bars "
+                           "WHERE symbol = ? AND interval = ? AND start >= ? AND start < ? ORDER BY start",
+                           (symbol, intervalSecs) + self._timeRange(startTime, endTime))
+        return [{'start': start, 'open': openVal, 'high': high, 'low': low, 'close': close, 'volume': volume}
+                for start, openVal, high, low, close, volume in rows]
+
+    def replay(self, callback, startTime=None, endTime=None, symbols=None):
+        """Call callback(symbol, {'price', 'volume', 'time'}) for each stored tick in time order"""
+        rows = self._query("SELECT symbol, time, price, volume FROM ticks WHERE time >= ? AND time < ? "
+                           "ORDER BY time, rowid", self._timeRange(startTime, endTime))
+        symbolSet = None if symbols is None else set(symbols)
+        count = 0
+        for symbol, tickTime, price, volume in rows:
+            if symbolSet is not None and symbol not in symbolSet:
+                continue
+            tick = {'price': price, 'time': tickTime}
+            if volume is not None:
+                tick['volume'] = volume
+            callback(symbol, tick)
+            count += 1
+        return count
+
+    def _connect(self):
+        conn = sqlite3.connect(self._fileName, check_same_thread=False)
+        # WAL lets queries run while the writer is appending
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        for statement in self._SCHEMA:
+            conn.execute(statement)
+        conn.commit()
+        return conn
+
+    def _query(self, sql, params):
+        with self._readLock:
+            if self._readConnection is None:
+                self._readConnection = self._connect()
+            return self._readConnection.execute(sql, params).fetchall()
+
+    @staticmethod
+    def _timeRange(startTime, endTime):
+        return (float("-inf") if startTime is None else startTime, float("inf") if endTime is None else endTime)
+
+    def _writerLoop(self):
+        conn = self._connect()
+        try:
+            stopping = False
+            while not stopping:
+                batch = []
+                item = self._queue.get()
+                while True:
+                    if item is None:
+                        stopping = True
+                    else:
+                        batch.append(item)
+                    if stopping or len(batch) >= self.MAX_BATCH_TICKS:
+                        break
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                try:
+                    self._writeBatch(conn, batch)
+                except sqlite3.Error as e:
+                    logger.error(f"TickHistory: failed to write {len(batch)} ticks: {e}")
+                for i in range(len(batch) + (1 if stopping else 0)):
+                    self._queue.task_done()
+        finally:
+            conn.close()
+
+    def _writeBatch(self, conn, batch):
+        if not batch:
+            return
+        bars = {}
+        for symbol, tickTime, price, volume in batch:
+            volumeDelta = self._volumeDelta(symbol, volume)
+            for intervalSecs in self.BAR_INTERVALS_SECS:
+                key = (symbol, intervalSecs, tickTime - (tickTime % intervalSecs))
+                bar = bars.get(key)
+                if bar is None:
+                    bars[key] = [price, price, price, price, volumeDelta]
+                else:
+                    bar[1] = max(bar[1], price)
+                    bar[2] = min(bar[2], price)
+                    bar[3] = price
+                    bar[4] += volumeDelta
+        with conn:
+            conn.executemany("INSERT INTO ticks (symbol, time, price, volume) VALUES (?, ?, ?, ?)", batch)
+            conn.executemany(self._BAR_UPSERT, [key + tuple(bar) for key, bar in bars.items()])
+        self._writtenTicks += len(batch)
+
+    def _volumeDelta(self, symbol, volume):
+        """Quote volume is cumulative for the day - a drop means a new day has started"""
+        if volume is None:
+            return 0.0
+        lastVolume = self._lastCumulativeVolume.get(symbol)
+        self._lastCumulativeVolume[symbol] = volume
+        if lastVolume is None:
+            return 0.0
+        return volume - lastVolume if volume >= lastVolume else volume
@@ -0,0 +1,93 @@
+"""
+Push-driven UI refresh. Provider threads call notify() when a quote changes;
+this posts a queued signal to the Qt thread which runs the refresh function
+at most once per minimum frame interval, however many notifications arrive
+in between. Nothing runs (no timer wakeups) while no quotes are changing.
+The time from the first notification of a frame to the end of its refresh
+is recorded so tick-to-screen latency can be reported.
+"""
+
+import time
+import threading
+import logging
+from collections import deque
+from PySide6 import QtCore
+
+logger = logging.getLogger("StockTickerLogger")
+
+class UIRefreshCoalescer(QtCore.QObject):
+    """Coalesces change notifications from any thread into rate-limited refreshes on the Qt thread"""
+
+    DEFAULT_MIN_FRAME_INTERVAL_MS = 100
+    # Latencies kept for the statistics
+    LATENCY_HISTORY_LEN = 500
+
+    # Posted (queued) to the Qt thread by the first notification of a frame
+    _refreshRequested = QtCore.Signal()
+
+    def __init__(self, refreshFunction, minFrameIntervalMs=DEFAULT_MIN_FRAME_INTERVAL_MS, parent=None):
+        super().__init__(parent)
+        self._refreshFunction = refreshFunction
+        self._minFrameIntervalSecs = minFrameIntervalMs / 1000
+        self._lock = threading.Lock()
+        # Time of the first notification not yet refreshed (None when nothing is pending)
+        self._pendingSince = None
+        self._numNotifications = 0
+        self._lastRefreshTime = None
+        self._numRefreshes = 0
+        self._latenciesSecs = deque(maxlen=self.LATENCY_HISTORY_LEN)
+        self._frameTimer = QtCore.QTimer(self)
+        self._frameTimer.setSingleShot(True)
+        self._frameTimer.timeout.connect(self._runRefresh)
+        self._refreshRequested.connect(self._scheduleRefresh, QtCore.Qt.QueuedConnection)
+
+    def setMinFrameIntervalMs(self, minFrameIntervalMs):
+        self._minFrameIntervalSecs = minFrameIntervalMs / 1000
+
+    def notify(self, symbol=None):
+        """Request a refresh - safe to call from any thread"""
+        with self._lock:
+            self._numNotifications += 1
+            if self._pendingSince is not None:
+                return
+            self._pendingSince = time.perf_counter()
+        self._refreshRequested.emit()
+
+    def isRefreshPending(self):
+        with self._lock:
+            return self._pendingSince is not None
+
+    def _scheduleRefresh(self):
+        if self._frameTimer.isActive():
+            return
+        sinceLastRefresh = float("inf") if self._lastRefreshTime is None else time.perf_counter() - self._lastRefreshTime
+        waitSecs = self._minFrameIntervalSecs - sinceLastRefresh
+        if waitSecs <= 0:
+            self._runRefresh()
+        else:
+            self._frameTimer.start(int(waitSecs * 1000) + 1)
+
+    def _runRefresh(self):
+        # Notifications from now on belong to the next frame
+        with self._lock:
+            pendingSince = self._pendingSince
+            self._pendingSince = None
+        if pendingSince is None:
+            return
+        try:
+            self._refreshFunction()
+        except Exception as excp:
+            logger.error(f"UIRefreshCoalescer: refresh failed: {excp}", exc_info=True)
+        self._lastRefreshTime = time.perf_counter()
+        self._numRefreshes += 1
+        self._latenciesSecs.append(self._lastRefreshTime - pendingSince)
+
+    def getStats(self):
+        """Notification and refresh counts with notify-to-refreshed latency (ms) over recent frames"""
+        latencies = sorted(self._latenciesSecs)
+        stats = {"notifications": self._numNotifications, "refreshes": self._numRefreshes}
+        if latencies:
+            stats["latencyMeanMs"] = sum(latencies) * 1000 / len(latencies)
+            stats["latencyP95Ms"] = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000
+            stats["latencyMaxMs"] = latencies[-1] * 1000
+        return stats
@@ -0,0 +1,195 @@
+"""
+Fixed-point valuation of the portfolio. Holdings, costs and prices are kept
+as integers scaled by 10^4 (so 480.5p is 4805000) in flat arrays, and value
+and profit are worked out with integer arithmetic - no Decimal or string
+parsing on the per-tick path. Totals and the count of rows without a price
+are kept running, adjusted by the difference each time a row is revalued.
+
+Rounding policy: inputs are rounded to 4 decimal places (half to even) as
+they are scaled, products are rounded back to 4 decimal places (half to
+even), and display formatting rounds half to even to the column's number
+of decimal places.
+"""
+
+import re
+import itertools
+from array import array
+from decimal import Decimal
+
+class ValuationEngine:
+    """Scaled-integer value and profit for each row of a table"""
+
+    SCALE_DIGITS = 4
+    SCALE = 10 ** SCALE_DIGITS
+    # Prices and costs are in pence, values and profits in pounds
+    PENCE_PER_POUND = 100
+
+    _FIXED_FORMAT = re.compile(r"^\{:0?(,?)\.(\d)f\}$")
+
+    def __init__(self):
+        self.setHoldings([])
+
+    def setHoldings(self, holdings):
+        """holdings is a list of (holding, cost per share in pence) - prices are cleared"""
+        numRows = len(holdings)
+        self._holdings = array('q', (self.toScaled(holding) or 0 for holding, cost in holdings))
+        self._costs = array('q', (self.toScaled(cost) or 0 for holding, cost in holdings))
+        self._origCosts = array('q', (self._toPounds(cost * holding) for cost, holding in zip(self._costs, self._holdings)))
+        self._prices = array('q', bytes(8 * numRows))
+        self._values = array('q', bytes(8 * numRows))
+        self._profits = array('q', bytes(8 * numRows))
+        self._hasPrice = bytearray(numRows)
+        # Running totals over the rows with a price - kept up to date by each change
+        self._totalValue = 0
+        self._totalProfit = 0
+        self._numPriced = 0
+
+    def numRows(self):
+        return len(self._holdings)
+
+    def setPrice(self, rowIdx, price):
+        """Revalue a row at a new price - returns False (and clears the row) if the price isn't a number"""
+        scaledPrice = self.toScaled(price)
+        if scaledPrice is None:
+            self.clearPrice(rowIdx)
+            return False
+        value = self._toPounds(scaledPrice * self._holdings[rowIdx])
+        profit = value - self._origCosts[rowIdx]
+        if self._hasPrice[rowIdx]:
+            self._totalValue += value - self._values[rowIdx]
+            self._totalProfit += profit - self._profits[rowIdx]
+        else:
+            self._totalValue += value
+            self._totalProfit += profit
+            self._numPriced += 1
+        self._prices[rowIdx] = scaledPrice
+        self._values[rowIdx] = value
+        self._profits[rowIdx] = profit
+        self._hasPrice[rowIdx] = 1
+        return True
+
+    def clearPrice(self, rowIdx):
+        if self._hasPrice[rowIdx]:
+            self._totalValue -= self._values[rowIdx]
+            self._totalProfit -= self._profits[rowIdx]
+            self._numPriced -= 1
+        self._prices[rowIdx] = 0
+        self._values[rowIdx] = 0
+        self._profits[rowIdx] = 0
+        self._hasPrice[rowIdx] = 0
+
+    def revalueAll(self, prices):
+        """Revalue every row in one pass - prices is a sequence of prices (None if unknown) by row"""
+        scaledPrices = [self.toScaled(price) for price in prices]
+        self._hasPrice = bytearray(price is not None for price in scaledPrices)
+        self._prices = array('q', (price or 0 for price in scaledPrices))
+        self._values = array('q', (self._toPounds(price * holding) for price, holding in zip(self._prices, self._holdings)))
+        self._profits = array('q', (value - origCost if hasPrice else 0
+                                    for value, origCost, hasPrice in zip(self._values, self._origCosts, self._hasPrice)))
+        self._totalValue, self._totalProfit, self._numPriced = self._sumTotals()
+
+    def hasPrice(self, rowIdx):
+        return self._hasPrice[rowIdx] != 0
+
+    def getHolding(self, rowIdx):
+        return self._holdings[rowIdx]
+
+    def getCost(self, rowIdx):
+        return self._costs[rowIdx]
+
+    def getValue(self, rowIdx):
+        return self._values[rowIdx]
+
+    def getProfit(self, rowIdx):
+        return self._profits[rowIdx]
+
+    def getTotals(self):
+        """(total value, total profit, rows with a price, rows) - value and profit scaled"""
+        return (self._totalValue, self._totalProfit, self._numPriced, len(self._holdings))
+
+    def getNumMissing(self):
+        """Rows without a price - these are left out of the totals"""
+        return len(self._holdings) - self._numPriced
+
+    def _sumTotals(self):
+        return (sum(itertools.compress(self._values, self._hasPrice)),
+                sum(itertools.compress(self._profits, self._hasPrice)),
+                sum(self._hasPrice))
+
+    @classmethod
+    def _toPounds(cls, scaledPenceProduct):
+        """Product of two scaled numbers in pence -> scaled pounds, rounded half to even"""
+        return cls._divRound(scaledPenceProduct, cls.SCALE * cls.PENCE_PER_POUND)
+
+    @staticmethod
+    def _divRound(numerator, denominator):
+        quotient, remainder = divmod(numerator, denominator)
+        if 2 * remainder > denominator or (2 * remainder == denominator and quotient % 2 == 1):
+            quotient += 1
+        return quotient
+
+    @classmethod
+    def toScaled(cls, value):
+        """Number or numeric string (with optional thousands separators or M suffix) -> scaled int, None if invalid"""
+        if type(value) is float:
+            # NaN and infinity aren't prices
+            if value - value != 0.0:
+                return None
+            return round(value * cls.SCALE)
+        if value is None:
+            return None
+        if type(value) is int:
+            return value * cls.SCALE
+        if type(value) is str:
+            value = value.replace(",", "").strip()
+            mult = 1
+            if value.endswith("M"):
+                value = value[:-1]
+                mult = 1000000
+            try:
+                return round(float(value) * mult * cls.SCALE)
+            except ValueError:
+                return None
+        try:
+            scaled = float(value) * cls.SCALE
+        except (TypeError, ValueError):
+            return None
+        if scaled != scaled or scaled in (float("inf"), float("-inf")):
+            return None
+        return round(scaled)
+
+    @classmethod
+    def toFloat(cls, scaledValue):
+        return scaledValue / cls.SCALE
+
+    @classmethod
+    def toDecimal(cls, scaledValue):
+        return Decimal(scaledValue).scaleb(-cls.SCALE_DIGITS)
+
+    @classmethod
+    def parseFormat(cls, fmtStr):
+        """
+        Column format string -> a cell format for formatScaled. Fixed point formats
+        like {:0,.2f} are formatted from the integer, anything else via Decimal
+        """
+        if fmtStr is None or fmtStr == "":
+            fmtStr = "{:.0f}"
+        match = cls._FIXED_FORMAT.match(fmtStr)
+        if match is None or int(match.group(2)) > cls.SCALE_DIGITS:
+            return fmtStr
+        decimals = int(match.group(2))
+        intFormat = "{:,}" if match.group(1) == "," else "{}"
+        template = intFormat + (".{:0" + str(decimals) + "d}" if decimals > 0 else "")
+        return (10 ** (cls.SCALE_DIGITS - decimals), 10 ** decimals, decimals > 0, template)
+
+    @classmethod
+    def formatScaled(cls, scaledValue, cellFormat):
+        """Format a scaled value with a cell format from parseFormat"""
+        if type(cellFormat) is str:
+            return cellFormat.format(cls.toDecimal(scaledValue))
+        roundDivisor, fracDivisor, hasFraction, template = cellFormat
+        rounded, remainder = divmod(-scaledValue if scaledValue < 0 else scaledValue, roundDivisor)
+        if 2 * remainder > roundDivisor or (2 * remainder == roundDivisor and rounded & 1):
+            rounded += 1
+        text = template.format(*divmod(rounded, fracDivisor)) if hasFraction else template.format(rounded)
+        return "-" + text if scaledValue < 0 and rounded != 0 else text
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Benchmark the cost of a UI update tick for a 500 symbol portfolio where only
+5 symbols are ticking. Compares draining the per-symbol changed set against the
+previous behaviour of treating every cached symbol as changed.
+
+Usage: python tests/bench_changed_symbols.py
+"""
+
+import os
+import sys
+import time
+import logging
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from test_changed_symbols import makeTestModeManager
+
+NUM_SYMBOLS = 500
+NUM_TICKING = 5
+NUM_UI_TICKS = 200
+
+def uiTick(manager, changedStockDict):
+    """Stand-in for the per-row work StockTable.updateTable does for a changed symbol"""
+    cellsUpdated = 0
+    for symbol in changedStockDict:
+        stkValues = manager.getStockData(symbol)
+        for colName in ('price', 'change', 'chg_percent', 'volume'):
+            "{:0.2f}".format(float(stkValues.get(colName, 0)))
+            cellsUpdated += 1
+    return cellsUpdated
+
+def runBenchmark():
+    logging.getLogger("StockTickerLogger").setLevel(logging.WARNING)
+    manager = makeTestModeManager()
+    symbols = [f"SYM{i}.L" for i in range(NUM_SYMBOLS)]
+    for sym in symbols:
+        manager._providerSymbolChanged(sym, {'price': 100.0, 'change': 0.0, 'failCount': 0})
+    manager.getMapOfStocksChangedSinceUIUpdated()
+
+    results = {}
+    for mode in ("all symbols (previous)", "changed set"):
+        cells = 0
+        startTime = time.perf_counter()
+        for tick in range(NUM_UI_TICKS):
+            for i in range(NUM_TICKING):
+                manager._providerSymbolChanged(symbols[i], {'price': 100.0 + tick, 'change': tick, 'failCount': 0})
+            changed = manager.getMapOfStocksChangedSinceUIUpdated()
+            if mode.startswith("all"):
+                changed = {sym: True for sym in manager.quoteStore.getSymbols()}
+            cells += uiTick(manager, changed)
+        elapsed = time.perf_counter() - startTime
+        results[mode] = elapsed
+        print(f"{mode:24s}: {elapsed * 1000 / NUM_UI_TICKS:8.3f} ms/tick, {cells // NUM_UI_TICKS} cells/tick")
+    print(f"Speedup: {results['all symbols (previous)'] / results['changed set']:.1f}x")
+
+if __name__ == "__main__":
+    runBenchmark()
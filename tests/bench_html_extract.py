@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Benchmark parse time of the recorded dividenddata and eoddata pages with the
+previous BeautifulSoup/html5lib selects and with the streaming HtmlTableExtractor.
+
+Usage: python tests/bench_html_extract.py
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup
+from HtmlTableExtractor import HtmlTableExtractor
+from test_html_table_extractor import readFixture
+
+NUM_RUNS = 20
+
+def exDivWithSoup(page):
+    soup = BeautifulSoup(page, "html5lib")
+    return [[cell.getText().strip() for cell in row.select("td")] for row in soup.select("body section table tbody tr")]
+
+def exDivWithExtractor(page):
+    return HtmlTableExtractor.extractRows(page, "body section table")
+
+def quoteWithSoup(page):
+    soup = BeautifulSoup(page, "html5lib")
+    nameTable = [el.getText().strip() for el in soup.select("#ctl00_cph1_qp1_div1 div.rc_bg_bl table tr td")]
+    perfTable = [el.getText().strip() for el in soup.select("#ctl00_cph1_qp1_div1 div.cb table tr td b")]
+    return nameTable, perfTable
+
+def quoteWithExtractor(page):
+    nameTable = HtmlTableExtractor.extractCells(page, "#ctl00_cph1_qp1_div1 div.rc_bg_bl table")
+    perfTable = HtmlTableExtractor.extractCells(page, "#ctl00_cph1_qp1_div1 div.cb table", cellSubTag="b")
+    return nameTable, perfTable
+
+def timeParse(parseFn, page):
+    startTime = time.perf_counter()
+    for i in range(NUM_RUNS):
+        result = parseFn(page)
+    return (time.perf_counter() - startTime) / NUM_RUNS, result
+
+def runBenchmark():
+    for pageName, fixture, soupFn, extractorFn in (
+            ("dividenddata ex-div", "dividenddata_exdiv.html", exDivWithSoup, exDivWithExtractor),
+            ("eoddata quote", "eoddata_quote_LSE_BP.htm", quoteWithSoup, quoteWithExtractor)):
+        page = readFixture(fixture)
+        soupSecs, soupResult = timeParse(soupFn, page)
+        extractorSecs, extractorResult = timeParse(extractorFn, page)
+        assert soupResult == extractorResult
+        print(f"{pageName:20s}: html5lib {soupSecs * 1000:7.2f} ms, extractor {extractorSecs * 1000:7.2f} ms "
+              f"({soupSecs / extractorSecs:.1f}x)")
+
+if __name__ == "__main__":
+    runBenchmark()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Benchmark provider callback throughput (StockProviderManager._providerSymbolChanged)
+with logging off, with DEBUG logging to a file through the queue sink, and with
+DEBUG logging to a file handler written on the calling thread.
+
+Usage: python tests/bench_logging.py
+"""
+
+import os
+import sys
+import time
+import logging
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from LogUtils import setupQueueLogging
+from test_changed_symbols import makeTestModeManager
+
+NUM_SYMBOLS = 100
+NUM_CALLBACKS = 50000
+
+def runCallbacks(manager):
+    startTime = time.perf_counter()
+    for i in range(NUM_CALLBACKS):
+        manager._providerSymbolChanged(f"SYM{i % NUM_SYMBOLS}.L",
+                                       {'price': 100.0 + (i % 7), 'volume': float(i), 'failCount': 0})
+    return time.perf_counter() - startTime
+
+def runBenchmark():
+    logger = logging.getLogger("StockTickerLogger")
+    logger.propagate = False
+    manager = makeTestModeManager()
+    logDir = tempfile.mkdtemp()
+    formatter = logging.Formatter('%(asctime)s %(levelname)s %(module)s %(funcName)s %(message)s')
+    results = {}
+
+    logger.setLevel(logging.WARNING)
+    results["logging off"] = runCallbacks(manager)
+
+    logger.setLevel(logging.DEBUG)
+    fileHandler = logging.FileHandler(os.path.join(logDir, "queued.log"))
+    fileHandler.setFormatter(formatter)
+    listener = setupQueueLogging([fileHandler], logger)
+    results["DEBUG, queued file sink"] = runCallbacks(manager)
+    listener.stop()
+    logger.handlers = []
+    fileHandler.close()
+
+    fileHandler = logging.FileHandler(os.path.join(logDir, "direct.log"))
+    fileHandler.setFormatter(formatter)
+    logger.addHandler(fileHandler)
+    results["DEBUG, direct file"] = runCallbacks(manager)
+    logger.removeHandler(fileHandler)
+    fileHandler.close()
+
+    for mode, elapsed in results.items():
+        print(f"{mode:26s}: {NUM_CALLBACKS / elapsed:10.0f} callbacks/s")
+
+if __name__ == "__main__":
+    runBenchmark()
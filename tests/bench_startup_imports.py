@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Benchmark cold-start import time of the app (python -X importtime -c "import StockTicker")
+and fail if it regresses - either a heavy optional dependency is imported at
+startup or the total import time is over budget. The best of several runs is
+used as the first run also pays for a cold disk cache.
+
+Usage: python tests/bench_startup_imports.py [--budget-ms 600] [--runs 5] [--top 15]
+"""
+
+import os
+import sys
+import argparse
+import subprocess
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Only loaded when the feature needing them is used
+LAZY_MODULES = ("ibapi", "selenium", "bs4", "html5lib", "arrow")
+
+DEFAULT_BUDGET_MS = 600
+
+def measureImports(moduleName="StockTicker"):
+    """Run a fresh interpreter importing the module - returns {module: (self us, cumulative us)}"""
+    env = dict(os.environ, QT_QPA_PLATFORM="offscreen")
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {moduleName}"],
+                            cwd=ROOT_DIR, env=env, capture_output=True, text=True, timeout=120)
+    if result.returncode != 0:
+        raise RuntimeError(f"import {moduleName} failed: {result.stderr[-2000:]}")
+    timings = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        selfUs, cumulativeUs, name = line[len("import time:"):].split("|")
+        if not selfUs.strip().isdigit():
+            continue
+        timings[name.strip()] = (int(selfUs), int(cumulativeUs))
+    return timings
+
+def runBenchmark(budgetMs, runs, top):
+    best = None
+    for i in range(runs):
+        timings = measureImports()
+        totalMs = timings["StockTicker"][1] / 1000
+        if best is None or totalMs < best[0]:
+            best = (totalMs, timings)
+    totalMs, timings = best
+
+    print(f"import StockTicker: {totalMs:.1f} ms (best of {runs}, budget {budgetMs} ms)")
+    print("Slowest modules (self time):")
+    for name, (selfUs, cumulativeUs) in sorted(timings.items(), key=lambda item: -item[1][0])[:top]:
+        print(f"  {name:50s} {selfUs / 1000:8.1f} ms  (cumulative {cumulativeUs / 1000:8.1f} ms)")
+
+    loadedLazy = sorted(set(name.split(".")[0] for name in timings) & set(LAZY_MODULES))
+    failed = False
+    if loadedLazy:
+        print(f"FAIL: imported at startup: {', '.join(loadedLazy)}")
+        failed = True
+    if totalMs > budgetMs:
+        print(f"FAIL: startup imports took {totalMs:.1f} ms, over the {budgetMs} ms budget")
+        failed = True
+    return not failed
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cold-start import time benchmark")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+    sys.exit(0 if runBenchmark(args.budget_ms, args.runs, args.top) else 1)
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark valuing and formatting a 500 holding portfolio on every tick.
+Compares the previous per-cell Decimal path (ToDecimal on holding, price,
+cost and each decimal column, with str.format on the Decimals) against the
+scaled-integer ValuationEngine.
+
+Usage: python tests/bench_valuation.py
+"""
+
+import os
+import sys
+import time
+import random
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ValuationEngine import ValuationEngine
+
+NUM_HOLDINGS = 500
+NUM_TICKS = 50
+
+def ToDecimal(value):
+    """The previous StockTable.ToDecimal"""
+    try:
+        if type(value) is str:
+            mult = 1
+            if "M" in value:
+                value = value.replace("M","")
+                mult = 1000000
+            outVal = Decimal(value.replace(",", "")) * mult
+        else:
+            outVal = Decimal(value)
+        return outVal
+    except:
+        return Decimal("0")
+
+def tickDecimal(holdings, quotes):
+    totalVal = ToDecimal("0.00")
+    totalProfit = ToDecimal("0.00")
+    texts = []
+    for (holding, cost), quote in zip(holdings, quotes):
+        stkHolding = ToDecimal(holding)
+        stkPricePence = ToDecimal(quote['price'])
+        stkCurValue = (stkPricePence * stkHolding) / ToDecimal("100")
+        stkCostPerSharePence = ToDecimal(cost)
+        stkOrigCost = (stkCostPerSharePence * stkHolding) / ToDecimal("100")
+        stkCurProfit = stkCurValue - stkOrigCost
+        totalProfit += stkCurProfit
+        totalVal += stkCurValue
+        texts.append('{:0.2f}'.format(ToDecimal(quote['price'])))
+        texts.append('{:0.2f}'.format(ToDecimal(quote['change'])))
+        texts.append('{:0,.0f}'.format(ToDecimal(quote['volume'])))
+        texts.append('{:0,.2f}'.format(stkCurValue))
+        texts.append('{:0,.2f}'.format(stkCurProfit))
+    return totalVal, totalProfit, texts
+
+def tickScaled(engine, quotes, formats):
+    priceFormat, volumeFormat, amountFormat = formats
+    texts = []
+    engine.revalueAll([quote['price'] for quote in quotes])
+    for rowIdx, quote in enumerate(quotes):
+        texts.append(ValuationEngine.formatScaled(ValuationEngine.toScaled(quote['price']), priceFormat))
+        texts.append(ValuationEngine.formatScaled(ValuationEngine.toScaled(quote['change']), priceFormat))
+        texts.append(ValuationEngine.formatScaled(ValuationEngine.toScaled(quote['volume']), volumeFormat))
+        texts.append(ValuationEngine.formatScaled(engine.getValue(rowIdx), amountFormat))
+        texts.append(ValuationEngine.formatScaled(engine.getProfit(rowIdx), amountFormat))
+    totalVal, totalProfit, rowsWithValue, numRows = engine.getTotals()
+    return totalVal, totalProfit, texts
+
+def runBenchmark():
+    rand = random.Random(1)
+    holdings = [(rand.randint(1, 20000), round(rand.uniform(10, 5000), 2)) for i in range(NUM_HOLDINGS)]
+    ticks = [[{'price': round(rand.uniform(10, 5000), 2), 'change': round(rand.uniform(-50, 50), 2),
+               'volume': float(rand.randint(0, 50000000))} for i in range(NUM_HOLDINGS)] for t in range(NUM_TICKS)]
+    engine = ValuationEngine()
+    engine.setHoldings(holdings)
+    formats = tuple(ValuationEngine.parseFormat(fmtStr) for fmtStr in ('{:0.2f}', '{:0,.0f}', '{:0,.2f}'))
+
+    startTime = time.perf_counter()
+    for quotes in ticks:
+        decimalResult = tickDecimal(holdings, quotes)
+    decimalElapsed = time.perf_counter() - startTime
+
+    startTime = time.perf_counter()
+    for quotes in ticks:
+        scaledResult = tickScaled(engine, quotes, formats)
+    scaledElapsed = time.perf_counter() - startTime
+
+    # Both paths agree on the totals to the penny
+    assert abs(decimalResult[0] - ValuationEngine.toDecimal(scaledResult[0])) < Decimal("0.01")
+    assert abs(decimalResult[1] - ValuationEngine.toDecimal(scaledResult[1])) < Decimal("0.01")
+    print(f"{'Decimal (previous)':24s}: {decimalElapsed * 1000 / NUM_TICKS:8.3f} ms/tick")
+    print(f"{'scaled integer':24s}: {scaledElapsed * 1000 / NUM_TICKS:8.3f} ms/tick")
+    print(f"Speedup: {decimalElapsed / scaledElapsed:.1f}x")
+
+if __name__ == "__main__":
+    runBenchmark()
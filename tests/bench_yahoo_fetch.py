@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Benchmark refreshing a 300 symbol portfolio from the Yahoo quotes endpoint using
+a local stub server with simulated network latency. Compares the previous
+approach (sequential batches of 10, new connection per request via
+requests.get) with the pooled, concurrent fetch.
+
+Usage: python tests/bench_yahoo_fetch.py [latencyMs]
+"""
+
+import os
+import sys
+import time
+import logging
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from StockValues_YahooAPI import StockValues_YahooAPI
+from RateLimiter import TokenBucketRateLimiter
+from stub_quote_server import StubQuoteServer
+
+NUM_SYMBOLS = 300
+
+def fetchSequentialUnpooled(provider, symbols):
+    """The previous fetch pattern - one requests.get per batch of 10, one after another"""
+    quotes = {}
+    for i in range(0, len(symbols), provider.SYMBOLS_PER_REQUEST):
+        batch = symbols[i:i + provider.SYMBOLS_PER_REQUEST]
+        response = requests.get(f"{provider.base_url}/api/v1/markets/stock/quotes",
+                                headers=provider.headers, params={'ticker': ','.join(batch)}, timeout=10)
+        for item in response.json()['body']:
+            quotes[item['symbol']] = item
+    return quotes
+
+def runBenchmark(latencyMs):
+    logging.getLogger("StockTickerLogger").setLevel(logging.WARNING)
+    symbols = [f"S{i:03d}.L" for i in range(NUM_SYMBOLS)]
+    with StubQuoteServer(latencySecs=latencyMs / 1000) as server:
+        provider = StockValues_YahooAPI()
+        provider.base_url = server.baseUrl
+        # Unlimited quota so only the fetch mechanics are measured
+        provider.setRateLimiter(TokenBucketRateLimiter("bench", 1e9, 1000))
+
+        startTime = time.perf_counter()
+        quotes = fetchSequentialUnpooled(provider, symbols)
+        sequentialSecs = time.perf_counter() - startTime
+        sequentialConns = server.connectionCount
+        print(f"Sequential, unpooled : {sequentialSecs:6.3f}s for {len(quotes)} quotes, {sequentialConns} connections")
+
+        for maxConcurrent in (1, 4, 8):
+            provider.setMaxConcurrentRequests(maxConcurrent)
+            connsBefore = server.connectionCount
+            startTime = time.perf_counter()
+            quotes = provider.get_quotes_concurrent(symbols)
+            elapsed = time.perf_counter() - startTime
+            print(f"Pooled, {maxConcurrent} concurrent : {elapsed:6.3f}s for {len(quotes)} quotes, "
+                  f"{server.connectionCount - connsBefore} connections, {sequentialSecs / elapsed:5.1f}x")
+        provider.stop()
+
+if __name__ == "__main__":
+    runBenchmark(float(sys.argv[1]) if len(sys.argv) > 1 else 50)
@@ -0,0 +1,53 @@
+"""
+Minimal third-party style provider used by the provider registry tests -
+returns a fixed price for each subscribed symbol when polled.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from StockProvider import StockProvider
+
+class ExampleFeedProvider(StockProvider):
+    """Provider with canned data, updated by calling poll()"""
+
+    @classmethod
+    def fromConfig(cls, configIni, callback):
+        provider = cls(configIni.getFloat("EXAMPLE_FEED_PRICE", 100.0))
+        provider.setCallback(callback)
+        return provider
+
+    def __init__(self, price=100.0):
+        self.price = price
+        self.symbols = []
+        self.running = False
+        self._callback = None
+
+    def subscribe(self, symbols):
+        self.symbols = self.symbols + [sym for sym in symbols if sym not in self.symbols]
+
+    def unsubscribe(self, symbols):
+        self.symbols = [sym for sym in self.symbols if sym not in symbols]
+
+    def getStockData(self, symbol):
+        if symbol not in self.symbols:
+            return None
+        return {'price': self.price, 'failCount': 0}
+
+    def setCallback(self, callback):
+        self._callback = callback
+
+    def start(self):
+        self.running = True
+
+    def stop(self):
+        self.running = False
+
+    def getHealth(self):
+        return {"subscribed": len(self.symbols), "running": self.running}
+
+    def poll(self):
+        for symbol in self.symbols:
+            self._callback(symbol)
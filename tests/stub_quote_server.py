@@ -0,0 +1,195 @@
+"""
+Local stub of the RapidAPI Yahoo Finance quotes endpoint for offline tests and
+benchmarks. Serves /api/v1/markets/stock/quotes with a configurable latency and
+records how many requests, connections and concurrent requests it saw.
+Also serves the Google finance JSON (/finance?q=) and alternate source quote
+page (/stockquote/<exchange>/<symbol>.htm) used by StockValues_Google, and the
+ex-dividend page (/exdiv) used by ExDivDates with ETag/Last-Modified support.
+
+Usage:
+    with StubQuoteServer(latencySecs=0.05) as server:
+        provider.base_url = server.baseUrl
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+class _StubQuoteHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Send headers and body in one segment so keep-alive isn't penalised by Nagle/delayed ACK
+    wbufsize = 65536
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        self.server.stub._connectionOpened()
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        stub = self.server.stub
+        stub._requestStarted()
+        try:
+            if stub.latencySecs > 0:
+                time.sleep(stub.latencySecs)
+            parsed = urlparse(self.path)
+            if parsed.path == "/finance":
+                self._sendGoogleQuote(stub, parse_qs(parsed.query).get("q", [""])[0])
+                return
+            if parsed.path.startswith("/stockquote/"):
+                self._sendAlternateQuote(stub, parsed.path)
+                return
+            if parsed.path == "/exdiv":
+                self._sendExDivPage(stub)
+                return
+            if parsed.path != "/api/v1/markets/stock/quotes":
+                self._sendJson(404, {"error": "not found"})
+                return
+            if stub.rateLimitResponses > 0:
+                stub.rateLimitResponses -= 1
+                self._sendJson(429, {"message": "Too many requests"}, {"Retry-After": str(stub.retryAfterSecs)})
+                return
+            tickers = parse_qs(parsed.query).get("ticker", [""])[0].split(",")
+            body = [stub.makeQuote(sym) for sym in tickers if sym and sym not in stub.unknownSymbols]
+            self._sendJson(200, {"body": body})
+        finally:
+            stub._requestFinished()
+
+    def _sendGoogleQuote(self, stub, symbol):
+        time.sleep(stub.symbolLatencySecs.get(symbol, 0))
+        if symbol in stub.unknownSymbols or symbol in stub.googleFailSymbols:
+            self._sendJson(404, {"error": "not found"})
+            return
+        quote = stub.makeQuote(symbol)
+        item = {"name": quote["longName"], "l": f"{quote['regularMarketPrice']:.2f}", "c": "+1.50",
+                "vo": str(quote["regularMarketVolume"]), "cp": f"{quote['regularMarketChangePercent']:.2f}"}
+        self._sendBody(200, "application/json", "// " + json.dumps([item]))
+
+    def _sendAlternateQuote(self, stub, path):
+        exchange, fileName = path[len("/stockquote/"):].split("/", 1)
+        symbol = fileName[:-len(".htm")] + (".L" if exchange == "LSE" else "." + exchange)
+        time.sleep(stub.symbolLatencySecs.get(symbol, 0))
+        if symbol in stub.unknownSymbols:
+            self._sendBody(404, "text/html", "<html><body>Not found</body></html>")
+            return
+        self._sendBody(200, "text/html", stub.makeAlternatePage(symbol))
+
+    def _sendExDivPage(self, stub):
+        validators = {"ETag": stub.exDivEtag, "Last-Modified": stub.exDivLastModified}
+        if self.headers.get("If-None-Match") == stub.exDivEtag or self.headers.get("If-Modified-Since") == stub.exDivLastModified:
+            stub.notModifiedCount += 1
+            self._sendBody(304, "text/html", "", validators)
+            return
+        self._sendBody(200, "text/html", stub.exDivPage, validators)
+
+    def _sendBody(self, status, contentType, text, extraHeaders=None):
+        data = text.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", contentType)
+        self.send_header("Content-Length", str(len(data)))
+        for key, val in (extraHeaders or {}).items():
+            self.send_header(key, val)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _sendJson(self, status, payload, extraHeaders=None):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, val in (extraHeaders or {}).items():
+            self.send_header(key, val)
+        self.end_headers()
+        self.wfile.write(data)
+
+class StubQuoteServer:
+    """Threaded local HTTP server returning deterministic quotes"""
+
+    def __init__(self, latencySecs=0.0):
+        self.latencySecs = latencySecs
+        self.unknownSymbols = set()
+        # Google lookups for these fail so the alternate source is used
+        self.googleFailSymbols = set()
+        # Extra latency for particular symbols (Google and alternate lookups)
+        self.symbolLatencySecs = {}
+        self.rateLimitResponses = 0
+        self.retryAfterSecs = 1
+        # Ex-dividend page and its validators - 304 is sent if the request's validators match
+        self.exDivPage = "<html><body></body></html>"
+        self.exDivEtag = '"exdiv-1"'
+        self.exDivLastModified = "Fri, 16 Oct 2026 04:00:00 GMT"
+        self.notModifiedCount = 0
+        self.requestCount = 0
+        self.connectionCount = 0
+        self.maxConcurrentRequests = 0
+        self._activeRequests = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _StubQuoteHandler)
+        self._server.daemon_threads = True
+        self._server.stub = self
+        self._thread = None
+
+    @property
+    def baseUrl(self):
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def makeQuote(self, symbol):
+        price = 100.0 + (sum(ord(c) for c in symbol) % 400)
+        return {
+            "symbol": symbol,
+            "longName": f"Stub {symbol}",
+            "regularMarketPrice": price,
+            "regularMarketChange": 1.5,
+            "regularMarketChangePercent": 1.5 * 100 / price,
+            "regularMarketVolume": 123456,
+            "regularMarketOpen": price - 1,
+            "regularMarketDayHigh": price + 2,
+            "regularMarketDayLow": price - 2,
+            "regularMarketPreviousClose": price - 1.5,
+        }
+
+    def makeAlternatePage(self, symbol):
+        """Quote page laid out like the alternate source's (name table and bold figures)"""
+        quote = self.makeQuote(symbol)
+        price = quote["regularMarketPrice"]
+        figures = [f"{price:.2f}", "1.50", f"{price - 1:.2f}", f"{price + 2:.2f}", f"{price + 0.1:.2f}",
+                   f"{quote['regularMarketVolume']:,}", f"{quote['regularMarketChangePercent']:.2f}",
+                   f"{price - 1.5:.2f}", f"{price - 2:.2f}", f"{price - 0.1:.2f}", "0"]
+        cells = "".join(f"<td><b>{figure}</b></td>" for figure in figures)
+        return ("<html><body><div id=\"ctl00_cph1_qp1_div1\">"
+                "<div class=\"rc_bg_bl\"><table><tr><td>Name</td><td>" + quote["longName"] + "</td><td></td></tr></table></div>"
+                "<div class=\"cb\"><table><tr>" + cells + "</tr></table></div>"
+                "</div></body></html>")
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, excType, excVal, excTb):
+        self.stop()
+
+    def _connectionOpened(self):
+        with self._lock:
+            self.connectionCount += 1
+
+    def _requestStarted(self):
+        with self._lock:
+            self.requestCount += 1
+            self._activeRequests += 1
+            self.maxConcurrentRequests = max(self.maxConcurrentRequests, self._activeRequests)
+
+    def _requestFinished(self):
+        with self._lock:
+            self._activeRequests -= 1
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Test that StockProviderManager only reports the symbols that actually changed
+since the last UI update, rather than every symbol it holds.
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from StockProviderManager import StockProviderManager
+from ConfigIniFile import ConfigIniFile
+
+def makeTestModeManager():
+    """Create a manager using only the test provider (no network providers)"""
+    configFileName = os.path.join(tempfile.mkdtemp(), "config.ini")
+    with open(configFileName, "w") as f:
+        f.write("TEST_MODE=true\n")
+    return StockProviderManager(lambda symbol: None, config_ini=ConfigIniFile(configFileName))
+
+def test_only_changed_symbols_reported():
+    manager = makeTestModeManager()
+    symbols = [f"SYM{i}.L" for i in range(50)]
+    for sym in symbols:
+        manager._providerSymbolChanged(sym, {'price': 100.0, 'failCount': 0})
+
+    # First drain returns everything that has been received
+    changed = manager.getMapOfStocksChangedSinceUIUpdated()
+    assert set(changed.keys()) == set(symbols)
+
+    # Nothing changed since, so nothing to redraw
+    assert manager.getMapOfStocksChangedSinceUIUpdated() == {}
+
+    # Tick two symbols - only those come back
+    manager._providerSymbolChanged("SYM3.L", {'price': 101.0, 'failCount': 0})
+    manager._providerSymbolChanged("SYM7.L", {'price': 99.0, 'failCount': 0})
+    manager._providerSymbolChanged("SYM3.L", {'price': 102.0, 'failCount': 0})
+    changed = manager.getMapOfStocksChangedSinceUIUpdated()
+    assert set(changed.keys()) == {"SYM3.L", "SYM7.L"}
+    assert manager.getStockData("SYM3.L")['price'] == 102.0
+
+def test_invalid_data_not_marked_changed():
+    manager = makeTestModeManager()
+    manager._providerSymbolChanged("BAD.L", {'price': 0, 'failCount': 1})
+    assert manager.getMapOfStocksChangedSinceUIUpdated() == {}
+
+if __name__ == "__main__":
+    test_only_changed_symbols_reported()
+    test_invalid_data_not_marked_changed()
+    print("Changed symbol tests passed")
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Test the cached config.ini reader - parsing, typed getters and mtime-based reload.
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ConfigIniFile import ConfigIniFile
+
+def writeConfig(fileName, text, mtimeNs=None):
+    with open(fileName, "w") as f:
+        f.write(text)
+    if mtimeNs is not None:
+        os.utime(fileName, ns=(mtimeNs, mtimeNs))
+
+def test_typed_getters():
+    fileName = os.path.join(tempfile.mkdtemp(), "config.ini")
+    writeConfig(fileName, "# comment\nTEST_MODE=true\nCOUNT = 12\nBAD_INT=abc\n"
+                          "STOCK_PROVIDER_FALLBACK_CHAIN=yahoo_api, google,,\nRATE=1.5\n")
+    config = ConfigIniFile(fileName)
+    assert config.getBool("TEST_MODE") is True
+    assert config.getBool("MISSING", True) is True
+    assert config.getInt("COUNT") == 12
+    assert config.getInt("BAD_INT", 7) == 7
+    assert config.getFloat("RATE") == 1.5
+    assert config.getList("STOCK_PROVIDER_FALLBACK_CHAIN") == ["yahoo_api", "google"]
+    assert config.getList("MISSING", ["a", "b"]) == ["a", "b"]
+    assert config.getStr("COUNT") == "12"
+
+    # Returned lists are copies so callers can't corrupt the cache
+    config.getList("STOCK_PROVIDER_FALLBACK_CHAIN").append("test")
+    assert config.getList("STOCK_PROVIDER_FALLBACK_CHAIN") == ["yahoo_api", "google"]
+
+def test_parsed_once_and_reloaded_on_mtime_change():
+    fileName = os.path.join(tempfile.mkdtemp(), "config.ini")
+    writeConfig(fileName, "TEST_MODE=false\n", mtimeNs=1_000_000_000)
+    config = ConfigIniFile(fileName)
+    config.MTIME_CHECK_INTERVAL_SECS = 0
+    for i in range(100):
+        assert config.getBool("TEST_MODE") is False
+    assert config.getLoadCount() == 1
+
+    writeConfig(fileName, "TEST_MODE=true\n", mtimeNs=2_000_000_000)
+    assert config.getBool("TEST_MODE") is True
+    assert config.getLoadCount() == 2
+
+def test_missing_file_uses_defaults():
+    config = ConfigIniFile(os.path.join(tempfile.mkdtemp(), "nofile.ini"))
+    assert config.getStr("YAHOO_API_HOST", "default.host") == "default.host"
+    assert config.getList("STOCK_PROVIDER_FALLBACK_CHAIN", ["google"]) == ["google"]
+
+if __name__ == "__main__":
+    test_typed_getters()
+    test_parsed_once_and_reloaded_on_mtime_change()
+    test_missing_file_uses_defaults()
+    print("ConfigIniFile tests passed")
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Test the HTTP fetch of the ex-dividend page (conditional requests and the
+opt-in browser fallback) against a local stub server, and that selenium isn't
+imported unless the fallback is used.
+"""
+
+import os
+import sys
+import subprocess
+import tempfile
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ExDivDates import ExDivDates
+from ConfigIniFile import ConfigIniFile
+from stub_quote_server import StubQuoteServer
+from test_html_table_extractor import readFixture, FixedExchangeRates
+
+def makeExDivDates(pageURL, seleniumFallback=False):
+    configFileName = os.path.join(tempfile.mkdtemp(), "config.ini")
+    with open(configFileName, "w") as f:
+        f.write(f"EXDIV_URL={pageURL}\nEXDIV_SELENIUM_FALLBACK={seleniumFallback}\nEXDIV_REQUEST_TIMEOUT_SECS=5\n")
+    return ExDivDates(FixedExchangeRates(), ConfigIniFile(configFileName))
+
+def test_conditional_fetch():
+    with StubQuoteServer() as server:
+        server.exDivPage = readFixture("dividenddata_exdiv.html")
+        exDivDates = makeExDivDates(server.baseUrl + "/exdiv")
+        exDivInfo = exDivDates.fetchExDivInfo()
+        assert len(exDivInfo) == 112
+        exDivDates.storeExDivInfo(exDivInfo)
+        # FTSE listed EPICs get the .L suffix
+        assert any(sym.endswith(".L") for sym in exDivDates.stocksExDivInfo)
+
+        # Unchanged page - not downloaded again and the stored data is kept
+        assert exDivDates.fetchExDivInfo() is None
+        assert server.notModifiedCount == 1
+
+        # Changed page - fetched in full
+        server.exDivEtag = '"exdiv-2"'
+        server.exDivLastModified = "Sat, 17 Oct 2026 04:00:00 GMT"
+        assert len(exDivDates.fetchExDivInfo()) == 112
+        assert server.notModifiedCount == 1
+
+def test_validators_kept_only_for_parsed_page():
+    with StubQuoteServer() as server:
+        exDivDates = makeExDivDates(server.baseUrl + "/exdiv")
+        # Page without the table - next fetch must not be answered with 304
+        assert exDivDates.fetchExDivInfo() == {}
+        server.exDivPage = readFixture("dividenddata_exdiv.html")
+        assert len(exDivDates.fetchExDivInfo()) == 112
+        assert server.notModifiedCount == 0
+
+def test_browser_fallback_is_opt_in():
+    with StubQuoteServer() as server:
+        pageURL = server.baseUrl + "/missing"
+        exDivDates = makeExDivDates(pageURL)
+        try:
+            exDivDates.fetchExDivInfo()
+            assert False, "HTTP error should be raised without the fallback"
+        except requests.HTTPError as excp:
+            assert "404" in str(excp)
+
+        exDivDates = makeExDivDates(pageURL, seleniumFallback=True)
+        exDivDates._fetchWithBrowser = lambda: readFixture("dividenddata_exdiv.html")
+        assert len(exDivDates.fetchExDivInfo()) == 112
+
+def test_selenium_not_imported_at_startup():
+    rootDir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    code = "import sys, ExDivDates; print('selenium' in sys.modules)"
+    result = subprocess.run([sys.executable, "-c", code], cwd=rootDir, capture_output=True, text=True, timeout=60)
+    assert result.stdout.strip() == "False", result.stderr
+
+if __name__ == "__main__":
+    test_conditional_fetch()
+    test_validators_kept_only_for_parsed_page()
+    test_browser_fallback_is_opt_in()
+    test_selenium_not_imported_at_startup()
+    print("Ex-dividend fetch tests passed")
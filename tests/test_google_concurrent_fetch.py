@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Test the worker-pool quote lookups in StockValues_Google against a local stub
+server (no network access needed).
+"""
+
+import os
+import sys
+import time
+import logging
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from StockValues_Google import StockValues_Google
+from RateLimiter import TokenBucketRateLimiter
+from stub_quote_server import StubQuoteServer
+
+logging.getLogger("StockTickerLogger").setLevel(logging.WARNING)
+
+def makeProvider(server, maxConcurrent):
+    provider = StockValues_Google()
+    # Only the lookups are under test - not the polling thread started by the constructor
+    provider.stop()
+    provider.t.join()
+    provider.setMaxConcurrentRequests(maxConcurrent)
+    provider._createHttpPool()
+    # Waits for the rate limiter are abandoned if the provider isn't running
+    provider.running = True
+    provider.googleBaseUrl = server.baseUrl
+    provider.alternateBaseUrl = server.baseUrl
+    provider.setRateLimiter(TokenBucketRateLimiter("test", 60000, 100))
+    return provider
+
+def test_lookups_run_concurrently_over_pooled_connections():
+    symbols = [f"S{i:02d}.L" for i in range(40)]
+    with StubQuoteServer(latencySecs=0.05) as server:
+        provider = makeProvider(server, 8)
+        startTime = time.perf_counter()
+        quotes = provider.get_quotes(symbols)
+        elapsed = time.perf_counter() - startTime
+        provider.stop()
+    assert set(quotes.keys()) == set(symbols)
+    assert float(quotes["S00.L"]["price"]) == server.makeQuote("S00.L")["regularMarketPrice"]
+    # 40 x 50 ms one at a time would be 2 s
+    assert elapsed < 1.0
+    assert 1 < server.maxConcurrentRequests <= 8
+    assert server.connectionCount <= 8
+
+def test_failed_google_lookup_goes_to_alternate():
+    with StubQuoteServer() as server:
+        server.googleFailSymbols = {"ALT.L"}
+        server.unknownSymbols = {"NONE.L"}
+        provider = makeProvider(server, 4)
+        quotes = provider.get_quotes(["BP.L", "ALT.L", "NONE.L"])
+        provider.stop()
+    assert set(quotes.keys()) == {"BP.L", "ALT.L"}
+    price = server.makeQuote("ALT.L")["regularMarketPrice"]
+    assert quotes["ALT.L"]["name"] == "Stub ALT.L" and quotes["ALT.L"]["price"] == f"{price:.2f}"
+    assert quotes["ALT.L"]["volume"] == "123,456"
+
+def test_slow_symbol_does_not_hold_up_others():
+    with StubQuoteServer() as server:
+        # One symbol is slow on both sources - the rest finish long before it
+        server.googleFailSymbols = {"SLOW.L"}
+        server.symbolLatencySecs = {"SLOW.L": 0.5}
+        provider = makeProvider(server, 4)
+        completed = []
+        originalGetQuote = provider._getQuote
+        def recordingGetQuote(symbol):
+            quote = originalGetQuote(symbol)
+            completed.append((symbol, time.perf_counter()))
+            return quote
+        provider._getQuote = recordingGetQuote
+        startTime = time.perf_counter()
+        quotes = provider.get_quotes(["SLOW.L", "A.L", "B.L", "C.L"])
+        provider.stop()
+    finishTimes = dict(completed)
+    assert set(quotes.keys()) == {"SLOW.L", "A.L", "B.L", "C.L"}
+    assert all(finishTimes[sym] - startTime < 0.4 for sym in ("A.L", "B.L", "C.L"))
+    assert finishTimes["SLOW.L"] - startTime >= 1.0
+
+if __name__ == "__main__":
+    test_lookups_run_concurrently_over_pooled_connections()
+    test_failed_google_lookup_goes_to_alternate()
+    test_slow_symbol_does_not_hold_up_others()
+    print("Google concurrent fetch tests passed")
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Test tick-to-screen latency tracking and the diagnostics dialog.
+"""
+
+import os
+import sys
+import json
+import time
+import tempfile
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PySide6 import QtWidgets
+from LatencyTracker import LatencyTracker, latencyTracker
+from test_changed_symbols import makeTestModeManager
+
+app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+def test_stages_and_percentiles():
+    tracker = LatencyTracker()
+    for i in range(100):
+        tracker.markReceived(f"S{i}.L", "yahoo_api")
+        tracker.markCached(f"S{i}.L", "yahoo_api")
+    time.sleep(0.01)
+    tracker.markDisplayed([f"S{i}.L" for i in range(100)])
+    report = tracker.getReport()
+    assert set(report["yahoo_api"].keys()) == set(LatencyTracker.STAGES)
+    total = report["yahoo_api"]["total"]
+    assert total["count"] == 100
+    assert 10 <= total["p50Ms"] <= total["p95Ms"] <= total["p99Ms"] <= total["maxMs"]
+    assert report["yahoo_api"]["provider"]["maxMs"] < report["yahoo_api"]["ui"]["p50Ms"]
+    assert "yahoo_api" in tracker.formatReport()
+
+def test_only_cached_updates_are_measured():
+    tracker = LatencyTracker()
+    # Received but never stored (e.g. unchanged quote) - not displayed
+    tracker.markReceived("A.L", "google")
+    tracker.markDisplayed(["A.L"])
+    assert tracker.getReport() == {}
+    # A provider without a receive mark is measured from the cache
+    tracker.markCached("B.L", "interactive_brokers")
+    tracker.markDisplayed(None)
+    assert tracker.getReport()["interactive_brokers"]["total"]["count"] == 1
+    # Nothing left pending
+    tracker.markDisplayed(None)
+    assert tracker.getReport()["interactive_brokers"]["total"]["count"] == 1
+
+def test_dump_to_file():
+    tracker = LatencyTracker()
+    tracker.markReceived("A.L", "test")
+    tracker.markCached("A.L", "test")
+    tracker.markDisplayed(["A.L"])
+    fileName = os.path.join(tempfile.mkdtemp(), "latency.json")
+    tracker.dumpToFile(fileName, {"displayRefresh": {"refreshes": 1}})
+    with open(fileName) as f:
+        contents = json.load(f)
+    assert contents["latency"]["test"]["total"]["count"] == 1
+    assert contents["displayRefresh"] == {"refreshes": 1}
+
+def test_manager_marks_cached_and_dialog_reports():
+    from DiagnosticsDialog import DiagnosticsDialog
+    latencyTracker.reset()
+    manager = makeTestModeManager()
+    latencyTracker.markReceived("SYM1.L", "unknown")
+    manager._providerSymbolChanged("SYM1.L", {'price': 100.0, 'failCount': 0})
+    latencyTracker.markDisplayed(manager.getMapOfStocksChangedSinceUIUpdated())
+    assert latencyTracker.getReport()["unknown"]["total"]["count"] == 1
+    dialog = DiagnosticsDialog()
+    assert "unknown" in dialog.getReportText()
+    dialog.resetStats()
+    assert "No quote updates" in dialog.reportText.toPlainText()
+    latencyTracker.reset()
+
+if __name__ == "__main__":
+    test_stages_and_percentiles()
+    test_only_cached_updates_are_measured()
+    test_dump_to_file()
+    test_manager_marks_cached_and_dialog_reports()
+    print("Latency tracker tests passed")
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Test the sampled logger and queued log sink used on the quote hot path.
+"""
+
+import os
+import sys
+import logging
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from LogUtils import SampledLogger, setupQueueLogging
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+class CountingStr:
+    numFormats = 0
+
+    def __str__(self):
+        CountingStr.numFormats += 1
+        return "value"
+
+def makeLogger(name, level):
+    logger = logging.getLogger(name)
+    logger.propagate = False
+    logger.setLevel(level)
+    handler = ListHandler()
+    logger.handlers = [handler]
+    return logger, handler
+
+def test_sampled_one_in_n():
+    logger, handler = makeLogger("test_sampled_one_in_n", logging.DEBUG)
+    sampled = SampledLogger(logger, 10)
+    for i in range(25):
+        sampled.debug("tick %s", i)
+    assert [record.getMessage() for record in handler.records] == \
+        ["tick 0 [1 in 10 logged]", "tick 10 [1 in 10 logged]", "tick 20 [1 in 10 logged]"]
+    # The record points at the caller rather than SampledLogger
+    assert handler.records[0].funcName == "test_sampled_one_in_n"
+
+def test_no_formatting_when_disabled():
+    logger, handler = makeLogger("test_no_formatting_when_disabled", logging.INFO)
+    sampled = SampledLogger(logger, 1)
+    CountingStr.numFormats = 0
+    for i in range(100):
+        sampled.debug("data %s", CountingStr())
+        logger.debug("data %s", CountingStr())
+    assert handler.records == [] and CountingStr.numFormats == 0
+
+def test_queue_sink_delivers_records():
+    logger, handler = makeLogger("test_queue_sink_delivers_records", logging.DEBUG)
+    logger.handlers = []
+    listener = setupQueueLogging([handler], logger)
+    for i in range(50):
+        logger.info("message %d", i)
+    listener.stop()
+    assert [record.getMessage() for record in handler.records] == [f"message {i}" for i in range(50)]
+
+if __name__ == "__main__":
+    test_sampled_one_in_n()
+    test_no_formatting_when_disabled()
+    test_queue_sink_delivers_records()
+    print("Log utils tests passed")
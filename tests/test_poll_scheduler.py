@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Test the adaptive per-symbol polling scheduler used by the polling providers.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PollScheduler import PollScheduler
+
+def makeScheduler(symbols, now=0.0):
+    scheduler = PollScheduler(minRefreshSecs=10.0)
+    scheduler.setSymbols(symbols)
+    for sym in symbols:
+        scheduler.recordQuote(sym, 100.0, now=now)
+    return scheduler
+
+def test_never_polled_first():
+    scheduler = makeScheduler(["A.L", "B.L"])
+    scheduler.addSymbol("NEW.L")
+    assert scheduler.nextBatch(1, now=0.0) == ["NEW.L"]
+
+def test_min_refresh_interval():
+    scheduler = makeScheduler(["A.L", "B.L"])
+    scheduler.setVisibleSymbols([])
+    # Weight 1 symbols are due after minRefreshSecs
+    assert scheduler.nextBatch(10, now=5.0) == []
+    assert sorted(scheduler.nextBatch(10, now=10.0)) == ["A.L", "B.L"]
+    assert scheduler.secondsUntilNextDue(now=4.0) == 6.0
+
+def test_large_position_polled_more_often():
+    scheduler = makeScheduler(["BIG.L", "SMALL.L", "WATCH.L"])
+    scheduler.setVisibleSymbols([])
+    scheduler.setHoldings({"BIG.L": 10000, "SMALL.L": 10, "WATCH.L": 0})
+    assert scheduler.getPriorityWeight("BIG.L") > scheduler.getPriorityWeight("SMALL.L")
+    assert scheduler.getPriorityWeight("SMALL.L") >= scheduler.getPriorityWeight("WATCH.L")
+    # The big position is due well before the others
+    assert scheduler.nextBatch(10, now=3.0) == ["BIG.L"]
+    assert scheduler.nextBatch(1, now=20.0) == ["BIG.L"]
+
+def test_volatile_symbol_polled_more_often():
+    scheduler = makeScheduler(["CALM.L", "MOVER.L"])
+    scheduler.setVisibleSymbols([])
+    scheduler.recordQuote("CALM.L", 100.0, now=10.0)
+    scheduler.recordQuote("MOVER.L", 105.0, now=10.0)
+    assert scheduler.getPriorityWeight("MOVER.L") > scheduler.getPriorityWeight("CALM.L")
+    assert scheduler.nextBatch(2, now=30.0) == ["MOVER.L", "CALM.L"]
+
+def test_visible_symbols_preferred():
+    scheduler = makeScheduler(["SHOWN.L", "HIDDEN.L"])
+    scheduler.setVisibleSymbols(["SHOWN.L"])
+    assert scheduler.nextBatch(1, now=30.0) == ["SHOWN.L"]
+    assert scheduler.nextBatch(10, now=6.0) == ["SHOWN.L"]
+
+def test_candidates_and_failed_polls():
+    scheduler = makeScheduler(["A.L", "B.L", "C.L"])
+    assert scheduler.nextBatch(10, now=30.0, candidates={"B.L"}) == ["B.L"]
+    # A failed poll still counts as an attempt so the symbol isn't retried immediately
+    scheduler.recordPollAttempt("B.L", now=30.0)
+    assert "B.L" not in scheduler.nextBatch(10, now=31.0)
+
+def test_set_symbols_keeps_state():
+    scheduler = makeScheduler(["A.L", "B.L"])
+    scheduler.setHoldings({"A.L": 50})
+    scheduler.setSymbols(["A.L", "C.L"])
+    assert sorted(scheduler.getSymbols()) == ["A.L", "C.L"]
+    assert scheduler.nextBatch(10, now=1.0) == ["C.L"]
+    assert scheduler.getPriorityWeight("B.L") is None
+
+def test_symbols_added_later_get_holdings_and_visibility():
+    scheduler = makeScheduler(["A.L"])
+    scheduler.setHoldings({"A.L": 10, "MOVED.L": 10000})
+    scheduler.setVisibleSymbols(["A.L"])
+    # e.g. moved to this provider by fallback after the holdings were set
+    scheduler.addSymbol("MOVED.L")
+    scheduler.addSymbol("HIDDEN.L")
+    scheduler.recordQuote("MOVED.L", 100.0, now=0.0)
+    scheduler.recordQuote("HIDDEN.L", 100.0, now=0.0)
+    assert scheduler.getPriorityWeight("MOVED.L") > scheduler.getPriorityWeight("A.L")
+    assert scheduler.getPriorityWeight("HIDDEN.L") < scheduler.getPriorityWeight("A.L")
+    scheduler.setSymbols(["A.L", "MOVED.L", "NEW.L"])
+    scheduler.recordQuote("NEW.L", 100.0, now=0.0)
+    # Not held and not visible - the base weight
+    assert scheduler.getPriorityWeight("NEW.L") == 1.0
+
+def test_string_prices():
+    assert PollScheduler.toFloat("1,234.5") == 1234.5
+    assert PollScheduler.toFloat("n/a") is None
+    assert PollScheduler.toFloat(None) is None
+
+if __name__ == "__main__":
+    test_never_polled_first()
+    test_min_refresh_interval()
+    test_large_position_polled_more_often()
+    test_volatile_symbol_polled_more_often()
+    test_visible_symbols_preferred()
+    test_candidates_and_failed_polls()
+    test_set_symbols_keeps_state()
+    test_symbols_added_later_get_holdings_and_visibility()
+    test_string_prices()
+    print("Poll scheduler tests passed")
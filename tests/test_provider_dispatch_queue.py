@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Test the dispatch queue between provider threads and StockProviderManager -
+posting never waits for the handler, the latest data per symbol wins and the
+number of waiting symbols is bounded.
+"""
+
+import os
+import sys
+import time
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from ProviderDispatchQueue import ProviderDispatchQueue
+from test_changed_symbols import makeTestModeManager
+
+class BlockingHandler:
+    """Handler that waits on an event before returning - stands in for a slow manager"""
+    def __init__(self):
+        self.release = threading.Event()
+        self.entered = threading.Event()
+        self.calls = []
+
+    def __call__(self, symbol, stockData):
+        self.entered.set()
+        self.release.wait(5)
+        self.calls.append((symbol, stockData))
+
+def test_post_does_not_block_on_slow_handler():
+    handler = BlockingHandler()
+    dispatchQueue = ProviderDispatchQueue(handler)
+    dispatchQueue.post("SYM0.L", 1)
+    assert handler.entered.wait(5)
+    # The dispatcher is stuck in the handler - posts still return at once
+    startTime = time.perf_counter()
+    for i in range(10000):
+        dispatchQueue.post(f"SYM{i % 10}.L", i)
+    assert time.perf_counter() - startTime < 1.0
+    handler.release.set()
+    assert dispatchQueue.flush()
+    dispatchQueue.stop()
+
+def test_latest_value_wins():
+    handler = BlockingHandler()
+    dispatchQueue = ProviderDispatchQueue(handler)
+    dispatchQueue.post("BLOCK.L", 0)
+    assert handler.entered.wait(5)
+    for i in range(100):
+        dispatchQueue.post("SYM1.L", i)
+        dispatchQueue.post("SYM2.L", -i)
+    handler.release.set()
+    assert dispatchQueue.flush()
+    dispatchQueue.stop()
+    assert handler.calls == [("BLOCK.L", 0), ("SYM1.L", 99), ("SYM2.L", -99)]
+    stats = dispatchQueue.getStats()
+    assert stats["posted"] == 201 and stats["dispatched"] == 3 and stats["coalesced"] == 198
+    assert stats["dropped"] == 0 and stats["pending"] == 0
+
+def test_bounded_drops_oldest_symbol():
+    handler = BlockingHandler()
+    dispatchQueue = ProviderDispatchQueue(handler, maxPending=3)
+    dispatchQueue.post("BLOCK.L", 0)
+    assert handler.entered.wait(5)
+    for i in range(5):
+        dispatchQueue.post(f"SYM{i}.L", i)
+    assert dispatchQueue.getNumPending() == 3
+    handler.release.set()
+    assert dispatchQueue.flush()
+    dispatchQueue.stop()
+    assert [symbol for symbol, _ in handler.calls] == ["BLOCK.L", "SYM2.L", "SYM3.L", "SYM4.L"]
+    assert dispatchQueue.getStats()["dropped"] == 2
+
+def test_handler_exception_does_not_stop_dispatch():
+    handled = []
+    def handler(symbol, stockData):
+        if symbol == "BAD.L":
+            raise ValueError("bad data")
+        handled.append(symbol)
+    dispatchQueue = ProviderDispatchQueue(handler)
+    dispatchQueue.post("BAD.L")
+    dispatchQueue.post("GOOD.L")
+    assert dispatchQueue.flush()
+    dispatchQueue.post("LATER.L")
+    assert dispatchQueue.flush()
+    dispatchQueue.stop()
+    assert handled == ["GOOD.L", "LATER.L"]
+    assert dispatchQueue.getStats()["errors"] == 1
+
+def test_stop_dispatches_waiting_and_start_resumes():
+    handled = []
+    dispatchQueue = ProviderDispatchQueue(lambda symbol, stockData: handled.append(symbol))
+    dispatchQueue.post("SYM1.L")
+    dispatchQueue.stop()
+    assert handled == ["SYM1.L"]
+    # Kept while stopped, dispatched once started again
+    dispatchQueue.post("SYM2.L")
+    time.sleep(0.05)
+    assert handled == ["SYM1.L"] and dispatchQueue.getNumPending() == 1
+    dispatchQueue.start()
+    assert dispatchQueue.flush()
+    dispatchQueue.stop()
+    assert handled == ["SYM1.L", "SYM2.L"]
+
+def test_stop_timeout_then_start_keeps_one_dispatcher():
+    handler = BlockingHandler()
+    running = []
+    maxRunning = []
+    def countingHandler(symbol, stockData):
+        running.append(threading.current_thread())
+        maxRunning.append(len(running))
+        try:
+            handler(symbol, stockData)
+        finally:
+            running.pop()
+    dispatchQueue = ProviderDispatchQueue(countingHandler, name="DispatchStopTest")
+    dispatchQueue.post("SYM1.L")
+    assert handler.entered.wait(5)
+    # The dispatcher is stuck in the handler - stop gives up waiting for it
+    dispatchQueue.stop(timeoutSecs=0.05)
+    dispatchQueue.start()
+    dispatchQueue.post("SYM2.L")
+    time.sleep(0.05)
+    assert [t.name for t in threading.enumerate()].count("DispatchStopTest") == 1
+    handler.release.set()
+    assert dispatchQueue.flush()
+    assert [symbol for symbol, stockData in handler.calls] == ["SYM1.L", "SYM2.L"]
+    assert max(maxRunning) == 1
+    dispatchQueue.stop()
+    assert [t.name for t in threading.enumerate()].count("DispatchStopTest") == 0
+    # Started again by the next post once the old dispatcher has gone
+    dispatchQueue.start()
+    dispatchQueue.post("SYM3.L")
+    assert dispatchQueue.flush()
+    assert handler.calls[-1][0] == "SYM3.L"
+    dispatchQueue.stop()
+
+def test_manager_provider_callbacks_go_through_queue():
+    manager = makeTestModeManager()
+    manager.setStocks(["SYM1.L", "SYM2.L"])
+    provider = manager.providers['test']
+    provider.symbolDataChanged("SYM1.L")
+    provider.symbolDataChanged("SYM2.L")
+    assert manager.getDispatchQueue().flush()
+    assert {"SYM1.L", "SYM2.L"} <= set(manager.getMapOfStocksChangedSinceUIUpdated().keys())
+    assert manager.getStockData("SYM2.L")['price'] > 0
+    manager.stop()
+
+if __name__ == "__main__":
+    test_post_does_not_block_on_slow_handler()
+    test_latest_value_wins()
+    test_bounded_drops_oldest_symbol()
+    test_handler_exception_does_not_stop_dispatch()
+    test_stop_dispatches_waiting_and_start_resumes()
+    test_stop_timeout_then_start_keeps_one_dispatcher()
+    test_manager_provider_callbacks_go_through_queue()
+    print("Provider dispatch queue tests passed")
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Test that fallback really moves a symbol's subscription between providers, and
+that the failed provider is re-probed with exponential backoff.
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from StockProviderManager import StockProviderManager
+from ConfigIniFile import ConfigIniFile
+from ProviderHealth import ProviderHealth
+
+class FakeProvider:
+    """Provider returning canned data and recording subscription calls"""
+    def __init__(self):
+        self.calls = []
+        self.subscribed = set()
+        self.data = {}
+
+    def subscribe(self, symbols):
+        self.calls.append(("subscribe", list(symbols)))
+        self.subscribed.update(symbols)
+
+    def unsubscribe(self, symbols):
+        self.calls.append(("unsubscribe", list(symbols)))
+        self.subscribed.difference_update(symbols)
+
+    def getStockData(self, symbol):
+        return self.data.get(symbol)
+
+def makeManager(chain="first,second,third"):
+    configDir = tempfile.mkdtemp()
+    configFileName = os.path.join(configDir, "config.ini")
+    with open(configFileName, "w") as f:
+        f.write(f"STOCK_PROVIDER_FALLBACK_CHAIN={chain}\nQUOTE_SNAPSHOT_FILE={os.path.join(configDir, 'snapshot.json')}\n"
+                "PROVIDER_REPROBE_BASE_SECS=60\nPROVIDER_REPROBE_MAX_SECS=200\nPROVIDER_PROBE_TIMEOUT_SECS=30\n")
+    manager = StockProviderManager(lambda symbol: None, config_ini=ConfigIniFile(configFileName), deferProviderInit=True)
+    manager.initializeProviders()
+    manager.providers = {name: FakeProvider() for name in chain.split(",")}
+    return manager
+
+BAD = {'price': 0, 'failCount': 1}
+GOOD = {'price': 100.0, 'failCount': 0}
+
+def test_health_backoff_doubles_and_caps():
+    health = ProviderHealth(10, 50)
+    assert [health.recordFailure("A.L", "p", 0) for i in range(4)] == [10, 20, 40, 50]
+    assert health.isBackingOff("A.L", "p", 49) and not health.isBackingOff("A.L", "p", 50)
+    assert not health.isBackingOff("A.L", "other", 0)
+    health.recordSuccess("A.L", "p")
+    assert health.getFailures("A.L", "p") == 0 and not health.isBackingOff("A.L", "p", 0)
+    health.startProbe("B.L", "p", 100)
+    assert health.getExpiredProbes(30, 129) == [] and health.getExpiredProbes(30, 130) == [("B.L", "p")]
+    stats = health.getStats(130)
+    assert stats["failures"] == 4 and stats["recoveries"] == 1 and stats["probing"] == 1
+
+def test_fallback_moves_subscription():
+    manager = makeManager()
+    first, second = manager.providers['first'], manager.providers['second']
+    manager.setStocks(["A.L", "B.L"])
+    first.calls.clear()
+    first.data["A.L"] = BAD
+    manager._providerSymbolChanged("A.L")
+    assert manager.symbol_to_provider["A.L"] == 'second' and manager.symbol_to_fallback_index["A.L"] == 1
+    assert first.calls == [("unsubscribe", ["A.L"])] and second.calls == [("subscribe", ["A.L"])]
+    assert first.subscribed == {"B.L"}
+    assert manager.getProviderHealth().getFailures("A.L", 'first') == 1
+
+def test_no_data_yet_is_not_a_failure():
+    manager = makeManager()
+    manager.setStocks(["A.L"])
+    # Provider hasn't fetched the symbol yet (or the tick was queued before a move)
+    manager._providerSymbolChanged("A.L")
+    assert manager.symbol_to_provider["A.L"] == 'first'
+
+def test_backed_off_provider_skipped_and_chain_exhausted():
+    manager = makeManager()
+    manager.setStocks(["A.L"])
+    now = 1000.0
+    manager.providerHealth.recordFailure("A.L", 'second', now)
+    assert manager._tryFallbackProvider("A.L", now)
+    assert manager.symbol_to_provider["A.L"] == 'third'
+    # Nowhere left to go - stays put
+    assert not manager._tryFallbackProvider("A.L", now)
+    assert manager.symbol_to_provider["A.L"] == 'third'
+
+def test_reprobe_with_exponential_backoff():
+    manager = makeManager("first,second")
+    first, second = manager.providers['first'], manager.providers['second']
+    health = manager.getProviderHealth()
+    manager.setStocks(["A.L"])
+    now = 1000.0
+    assert manager._tryFallbackProvider("A.L", now)
+
+    # Not yet due
+    manager.reprobeProviders(now + 59)
+    assert manager.symbol_to_provider["A.L"] == 'second'
+
+    # Due - moved back to the preferred provider, which fails again: backoff doubles
+    manager.reprobeProviders(now + 60)
+    assert manager.symbol_to_provider["A.L"] == 'first' and first.subscribed == {"A.L"} and second.subscribed == set()
+    assert manager._tryFallbackProvider("A.L", now + 61)
+    assert health.getFailures("A.L", 'first') == 2
+    manager.reprobeProviders(now + 61 + 119)
+    assert manager.symbol_to_provider["A.L"] == 'second'
+    manager.reprobeProviders(now + 61 + 120)
+    assert manager.symbol_to_provider["A.L"] == 'first'
+
+    # A valid quote from the probed provider clears its failures
+    first.data["A.L"] = GOOD
+    manager._providerSymbolChanged("A.L")
+    assert health.getFailures("A.L", 'first') == 0
+    manager.reprobeProviders(now + 10000)
+    assert manager.symbol_to_provider["A.L"] == 'first'
+
+def test_silent_probe_times_out():
+    manager = makeManager("first,second")
+    manager.setStocks(["A.L"])
+    now = 1000.0
+    manager._tryFallbackProvider("A.L", now)
+    manager.reprobeProviders(now + 60)
+    assert manager.symbol_to_provider["A.L"] == 'first'
+    # The probed provider never reports anything
+    manager.reprobeProviders(now + 89)
+    assert manager.symbol_to_provider["A.L"] == 'first'
+    manager.reprobeProviders(now + 90)
+    assert manager.symbol_to_provider["A.L"] == 'second'
+    assert manager.getProviderHealth().getFailures("A.L", 'first') == 2
+
+def test_removed_symbol_health_forgotten():
+    manager = makeManager()
+    manager.setStocks(["A.L", "B.L"])
+    manager._tryFallbackProvider("A.L", 0)
+    manager.setStocks(["B.L"])
+    assert manager.getProviderHealth().getFailures("A.L", 'first') == 0
+    assert "A.L" not in manager.providers['second'].subscribed
+
+if __name__ == "__main__":
+    test_health_backoff_doubles_and_caps()
+    test_fallback_moves_subscription()
+    test_no_data_yet_is_not_a_failure()
+    test_backed_off_provider_skipped_and_chain_exhausted()
+    test_reprobe_with_exponential_backoff()
+    test_silent_probe_times_out()
+    test_removed_symbol_health_forgotten()
+    print("Provider fallback tests passed")
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Test that provider modules (and heavy optional dependencies) are only imported
+when needed, and that third-party providers plug in through the registry.
+"""
+
+import os
+import sys
+import subprocess
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ProviderRegistry import ProviderRegistry
+from StockProvider import StockProvider
+from StockProviderManager import StockProviderManager
+from ConfigIniFile import ConfigIniFile
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def importedModules(code):
+    """Top-level modules loaded by running code in a fresh interpreter"""
+    env = dict(os.environ, QT_QPA_PLATFORM="offscreen")
+    result = subprocess.run([sys.executable, "-c", code + "\nimport sys\nprint(' '.join(sys.modules))"],
+                            cwd=ROOT_DIR, env=env, capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    return set(name.split(".")[0] for name in result.stdout.split())
+
+def test_registry_imports_on_demand():
+    sys.modules.pop("example_plugin_provider", None)
+    registry = ProviderRegistry()
+    registry.register("example_feed", "example_plugin_provider", "ExampleFeedProvider")
+    assert registry.getNames() == ["example_feed"] and not registry.isLoaded("example_feed")
+    assert "example_plugin_provider" not in sys.modules
+    providerClass = registry.getProviderClass("example_feed")
+    assert providerClass.__name__ == "ExampleFeedProvider" and registry.isLoaded("example_feed")
+    try:
+        registry.getProviderClass("missing")
+        assert False, "unregistered provider should raise"
+    except KeyError:
+        pass
+    # Only StockProvider classes can be providers
+    registry.register("not_a_provider", "json", "JSONDecoder")
+    try:
+        registry.getProviderClass("not_a_provider")
+        assert False, "non-StockProvider class should raise"
+    except TypeError:
+        pass
+
+def test_provider_interface_is_enforced():
+    class IncompleteProvider(StockProvider):
+        def subscribe(self, symbols):
+            pass
+    try:
+        IncompleteProvider()
+        assert False, "provider missing abstract methods should not be created"
+    except TypeError:
+        pass
+
+def test_entry_point_plugin():
+    # An installed distribution advertising a provider in the entry point group
+    siteDir = tempfile.mkdtemp()
+    distInfo = os.path.join(siteDir, "example_feed-1.0.dist-info")
+    os.mkdir(distInfo)
+    with open(os.path.join(distInfo, "METADATA"), "w") as f:
+        f.write("Metadata-Version: 2.1\nName: example-feed\nVersion: 1.0\n")
+    with open(os.path.join(distInfo, "entry_points.txt"), "w") as f:
+        f.write("[qtstockticker.providers]\nexample_feed = example_plugin_provider:ExampleFeedProvider\n")
+    sys.path.insert(0, siteDir)
+    try:
+        registry = ProviderRegistry()
+        registry.loadPlugins()
+        assert registry.isRegistered("example_feed") and not registry.isLoaded("example_feed")
+        assert registry.getProviderClass("example_feed").__name__ == "ExampleFeedProvider"
+    finally:
+        sys.path.remove(siteDir)
+
+def test_config_plugin_used_by_manager():
+    configDir = tempfile.mkdtemp()
+    configFileName = os.path.join(configDir, "config.ini")
+    with open(configFileName, "w") as f:
+        f.write("STOCK_PROVIDER_PLUGINS=example_feed=example_plugin_provider:ExampleFeedProvider\n"
+                "STOCK_PROVIDER_FALLBACK_CHAIN=example_feed\nEXAMPLE_FEED_PRICE=123.5\n"
+                f"QUOTE_SNAPSHOT_FILE={os.path.join(configDir, 'snapshot.json')}\n")
+    changed = []
+    manager = StockProviderManager(changed.append, config_ini=ConfigIniFile(configFileName))
+    provider = manager.providers["example_feed"]
+    assert provider.price == 123.5
+    manager.setStocks(["A.L", "B.L"])
+    manager.start()
+    assert provider.running and provider.symbols == ["A.L", "B.L"]
+    provider.poll()
+    manager.getDispatchQueue().flush(5)
+    assert sorted(changed) == ["A.L", "B.L"]
+    assert manager.getStockData("A.L")["price"] == 123.5
+    assert manager.getProvidersHealth() == {"example_feed": {"subscribed": 2, "running": True}}
+    manager.stop()
+    assert not provider.running
+
+def test_app_startup_imports_no_heavy_dependencies():
+    modules = importedModules("import StockTicker")
+    assert not modules & {"ibapi", "selenium", "bs4", "html5lib", "arrow"}
+
+def test_only_chained_providers_imported():
+    code = """
+import os, tempfile
+from ConfigIniFile import ConfigIniFile
+from StockProviderManager import StockProviderManager
+configFileName = os.path.join(tempfile.mkdtemp(), "config.ini")
+with open(configFileName, "w") as f:
+    f.write("STOCK_PROVIDER_FALLBACK_CHAIN=yahoo_api\\nQUOTE_SNAPSHOT_INTERVAL_SECS=0\\n"
+            f"QUOTE_SNAPSHOT_FILE={os.path.join(os.path.dirname(configFileName), 'snapshot.json')}\\n")
+manager = StockProviderManager(lambda symbol: None, config_ini=ConfigIniFile(configFileName))
+assert list(manager.providers.keys()) == ["yahoo_api"]
+manager.stop()
+"""
+    modules = importedModules(code)
+    assert "StockValues_YahooAPI" in modules
+    assert not modules & {"StockValues_InteractiveBrokers", "ibapi", "StockValues_Google", "StockValues_Test"}
+
+if __name__ == "__main__":
+    test_registry_imports_on_demand()
+    test_provider_interface_is_enforced()
+    test_entry_point_plugin()
+    test_config_plugin_used_by_manager()
+    test_app_startup_imports_no_heavy_dependencies()
+    test_only_chained_providers_imported()
+    print("Provider registry tests passed")
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Test saving and loading the last-known quotes snapshot used at startup.
+"""
+
+import os
+import sys
+import json
+import datetime
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from QuoteStore import QuoteStore
+from QuoteSnapshot import QuoteSnapshot
+from ConfigIniFile import ConfigIniFile
+from StockProviderManager import StockProviderManager
+
+def makeStore():
+    store = QuoteStore()
+    store.update("BP.L", {'name': "BP", 'price': 480.5, 'change': -1.5, 'failCount': 0,
+                          'time': datetime.datetime(2024, 3, 1, 10, 30, tzinfo=datetime.timezone.utc)})
+    store.update("VOD.L", {'name': "Vodafone", 'price': 70.2, 'failCount': 0})
+    # No price - not worth saving
+    store.update("NONE.L", {'name': "Nothing", 'failCount': 1})
+    return store
+
+def test_round_trip_marks_stale():
+    fileName = os.path.join(tempfile.mkdtemp(), "snap", "quoteSnapshot.json")
+    assert QuoteSnapshot(fileName).save(makeStore())
+    assert not os.path.exists(fileName + ".tmp")
+    newStore = QuoteStore()
+    loaded = QuoteSnapshot(fileName).loadInto(newStore)
+    assert sorted(loaded) == ["BP.L", "VOD.L"]
+    quote = newStore.getQuote("BP.L")
+    assert quote['price'] == 480.5 and quote['name'] == "BP" and quote['change'] == -1.5
+    assert quote['time'] == datetime.datetime(2024, 3, 1, 10, 30, tzinfo=datetime.timezone.utc)
+    assert quote['failCount'] == 1
+
+def test_save_skipped_when_unchanged():
+    fileName = os.path.join(tempfile.mkdtemp(), "quoteSnapshot.json")
+    store = makeStore()
+    snapshot = QuoteSnapshot(fileName)
+    assert snapshot.save(store)
+    assert not snapshot.save(store)
+    store.update("BP.L", {'price': 481.0})
+    assert snapshot.save(store)
+
+def test_missing_or_corrupt_file():
+    tempDir = tempfile.mkdtemp()
+    assert QuoteSnapshot(os.path.join(tempDir, "missing.json")).load() == {}
+    corruptFileName = os.path.join(tempDir, "corrupt.json")
+    with open(corruptFileName, "w") as f:
+        f.write('{"version": 1, "quotes": {"BP.L": {"pri')
+    assert QuoteSnapshot(corruptFileName).load() == {}
+    with open(corruptFileName, "w") as f:
+        json.dump({'version': 99, 'quotes': {"BP.L": {'price': 1}}}, f)
+    assert QuoteSnapshot(corruptFileName).load() == {}
+
+def test_manager_loads_before_providers_and_saves_on_stop():
+    tempDir = tempfile.mkdtemp()
+    snapshotFileName = os.path.join(tempDir, "quoteSnapshot.json")
+    QuoteSnapshot(snapshotFileName).save(makeStore())
+    configFileName = os.path.join(tempDir, "config.ini")
+    with open(configFileName, "w") as f:
+        f.write(f"STOCK_PROVIDER_FALLBACK_CHAIN=yahoo_api\nQUOTE_SNAPSHOT_FILE={snapshotFileName}\n")
+    manager = StockProviderManager(lambda symbol: None, config_ini=ConfigIniFile(configFileName))
+    # Available (and reported to the UI) straight away, marked stale
+    assert manager.getStockData("BP.L")['failCount'] == 1
+    assert set(manager.getMapOfStocksChangedSinceUIUpdated().keys()) == {"BP.L", "VOD.L"}
+    # A fresh quote clears the stale marker and is saved on stop
+    manager._providerSymbolChanged("BP.L", {'name': "BP", 'price': 490.0, 'failCount': 0})
+    assert manager.getStockData("BP.L")['failCount'] == 0
+    manager.stop()
+    saved = QuoteSnapshot(snapshotFileName).load()
+    assert saved["BP.L"]['price'] == 490.0 and saved["BP.L"]['failCount'] == 0
+
+if __name__ == "__main__":
+    test_round_trip_marks_stale()
+    test_save_skipped_when_unchanged()
+    test_missing_or_corrupt_file()
+    test_manager_loads_before_providers_and_saves_on_stop()
+    print("Quote snapshot tests passed")
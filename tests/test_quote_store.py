@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Test the columnar quote store used as the StockProviderManager cache.
+"""
+
+import os
+import sys
+import math
+import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from QuoteStore import QuoteStore
+from test_changed_symbols import makeTestModeManager
+
+def test_round_trip():
+    store = QuoteStore()
+    nowInUk = datetime.datetime(2024, 3, 1, 10, 30, tzinfo=datetime.timezone.utc)
+    store.update("BP.L", {'sym': "BP.L", 'name': "BP", 'price': 480.5, 'change': "-1.5",
+                          'volume': "1.2M", 'failCount': 0, 'time': nowInUk})
+    quote = store.getQuote("BP.L")
+    assert quote['name'] == "BP" and quote['sym'] == "BP.L"
+    assert quote['price'] == 480.5 and quote['change'] == -1.5
+    assert quote['volume'] == 1200000 and quote['failCount'] == 0
+    assert quote['time'] == nowInUk
+    # Fields never supplied are left out rather than reported as zero
+    assert 'open' not in quote
+    assert store.getValue("BP.L", 'price') == 480.5
+    assert store.getQuote("NONE.L") is None
+    # Each read is a new dict so callers can add to it
+    quote['exDivDate'] = "01/01/2025"
+    assert 'exDivDate' not in store.getQuote("BP.L")
+
+def test_versions_move_only_on_change():
+    store = QuoteStore()
+    assert store.update("A.L", {'price': 100.0})
+    assert store.update("B.L", {'price': 200.0})
+    versionA = store.getRowVersion("A.L")
+    storeVersion = store.getVersion()
+    # Same values (or only a new time) leave the version alone
+    assert not store.update("A.L", {'price': 100.0, 'time': 12345.0})
+    assert store.getRowVersion("A.L") == versionA
+    assert store.update("A.L", {'price': 101.0})
+    assert store.getRowVersion("A.L") > versionA
+    assert store.getSymbolsChangedSince(storeVersion) == ["A.L"]
+    assert store.getRowVersion("UNKNOWN.L") == 0
+
+def test_column_views_and_growth():
+    store = QuoteStore(initialCapacity=2)
+    store.update("A.L", {'price': 1.0})
+    store.update("B.L", {'price': 2.0})
+    view = store.getColumnView('price')
+    assert view.readonly and list(view) == [1.0, 2.0]
+    # Views see later writes without copying
+    store.update("A.L", {'price': 1.5})
+    assert view[0] == 1.5
+    # Growing while a view is held works - the old view just stops updating
+    for i in range(100):
+        store.update(f"S{i}.L", {'price': float(i)})
+    assert store.numRows() == 102
+    assert store.getRow("S99.L") == 101
+    newView = store.getColumnView('price')
+    assert len(newView) == 102 and newView[101] == 99.0
+    assert math.isnan(store.getColumnView('open')[0])
+    assert len(store.getRowVersionsView()) == 102
+
+def test_remove_keeps_row():
+    store = QuoteStore()
+    store.update("A.L", {'price': 1.0, 'name': "A"})
+    row = store.getRow("A.L")
+    store.remove("A.L")
+    assert store.getQuote("A.L") is None
+    assert store.getRow("A.L") == row
+
+def test_manager_uses_store_versions():
+    manager = makeTestModeManager()
+    manager._providerSymbolChanged("SYM1.L", {'price': 100.0, 'failCount': 0})
+    manager.getMapOfStocksChangedSinceUIUpdated()
+    version = manager.getQuoteVersion("SYM1.L")
+    # A repeat of the same quote isn't reported as a change
+    manager._providerSymbolChanged("SYM1.L", {'price': 100.0, 'failCount': 0})
+    assert manager.getMapOfStocksChangedSinceUIUpdated() == {}
+    assert manager.getQuoteVersion("SYM1.L") == version
+    manager._providerSymbolChanged("SYM1.L", {'price': 100.5, 'failCount': 0})
+    assert list(manager.getMapOfStocksChangedSinceUIUpdated().keys()) == ["SYM1.L"]
+    assert manager.getQuoteVersion("SYM1.L") > version
+
+if __name__ == "__main__":
+    test_round_trip()
+    test_versions_move_only_on_change()
+    test_column_views_and_growth()
+    test_remove_keeps_row()
+    test_manager_uses_store_versions()
+    print("Quote store tests passed")
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Test the token-bucket rate limiter used by the HTTP-based providers.
+"""
+
+import os
+import sys
+import time
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from RateLimiter import TokenBucketRateLimiter
+from ConfigIniFile import ConfigIniFile
+
+def test_burst_then_paced():
+    limiter = TokenBucketRateLimiter("test", requestsPerMinute=600, burst=3)
+    for i in range(3):
+        assert limiter.tryAcquire()
+    assert not limiter.tryAcquire()
+    # 600/min is one token every 100ms
+    startTime = time.monotonic()
+    assert limiter.acquire(timeoutSecs=1.0)
+    elapsed = time.monotonic() - startTime
+    assert 0.05 < elapsed < 0.5
+
+def test_timeout_and_abort():
+    limiter = TokenBucketRateLimiter("test", requestsPerMinute=1, burst=1)
+    assert limiter.tryAcquire()
+    assert not limiter.acquire(timeoutSecs=0.05)
+    assert not limiter.acquire(abortCheck=lambda: True)
+
+def test_backoff_on_429_and_recovery():
+    limiter = TokenBucketRateLimiter("test", requestsPerMinute=600, burst=5)
+    limiter.notifyResponse(429, "0.2")
+    assert limiter.getEffectiveRequestsPerMinute() == 300
+    # Blocked for the Retry-After period even though the bucket had tokens
+    assert not limiter.acquire(timeoutSecs=0.1)
+    assert limiter.acquire(timeoutSecs=1.0)
+    for i in range(30):
+        limiter.notifyResponse(200)
+    assert limiter.getEffectiveRequestsPerMinute() == 600
+    assert limiter.getStats()["rateLimited"] == 1
+
+def test_backoff_has_floor():
+    limiter = TokenBucketRateLimiter("test", requestsPerMinute=100, burst=1)
+    for i in range(20):
+        limiter.notifyRateLimited(0)
+    assert limiter.getEffectiveRequestsPerMinute() == 100 * limiter.MIN_RATE_FRACTION
+
+def test_parse_retry_after():
+    assert TokenBucketRateLimiter.parseRetryAfter("120") == 120
+    assert TokenBucketRateLimiter.parseRetryAfter(None) is None
+    assert TokenBucketRateLimiter.parseRetryAfter("garbage") is None
+    assert TokenBucketRateLimiter.parseRetryAfter("Wed, 21 Oct 2015 07:28:00 GMT") == 0
+
+def test_from_config():
+    fileName = os.path.join(tempfile.mkdtemp(), "config.ini")
+    with open(fileName, "w") as f:
+        f.write("YAHOO_API_REQUESTS_PER_MINUTE=30\nYAHOO_API_REQUEST_BURST=4\n")
+    stats = TokenBucketRateLimiter.fromConfig(ConfigIniFile(fileName), "YAHOO_API", 2, 5).getStats()
+    assert stats["configuredRpm"] == 30 and stats["burst"] == 4
+    stats = TokenBucketRateLimiter.fromConfig(ConfigIniFile(fileName), "GOOGLE", 2, 1).getStats()
+    assert stats["configuredRpm"] == 2 and stats["burst"] == 1
+
+if __name__ == "__main__":
+    test_burst_then_paced()
+    test_timeout_and_abort()
+    test_backoff_on_429_and_recovery()
+    test_backoff_has_floor()
+    test_parse_retry_after()
+    test_from_config()
+    print("Rate limiter tests passed")
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Test the staged startup helpers - background tasks signalling back to the Qt
+thread, phase timings, and deferred provider creation in StockProviderManager.
+"""
+
+import os
+import sys
+import time
+import threading
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PySide6 import QtWidgets
+from StartupLoader import StartupLoader, StartupTimings
+from test_changed_symbols import makeTestModeManager
+from StockProviderManager import StockProviderManager
+from ConfigIniFile import ConfigIniFile
+
+def getApp():
+    # A QApplication so widget tests can share the process
+    return QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+def waitFor(condition, timeoutSecs=5.0):
+    app = getApp()
+    deadline = time.monotonic() + timeoutSecs
+    while not condition() and time.monotonic() < deadline:
+        app.processEvents()
+        time.sleep(0.01)
+    app.processEvents()
+    return condition()
+
+def slowTask(delaySecs, result):
+    time.sleep(delaySecs)
+    return result
+
+def failingTask():
+    raise RuntimeError("no network")
+
+def test_results_delivered_on_qt_thread():
+    getApp()
+    loader = StartupLoader()
+    finished = []
+    failed = []
+    allDone = []
+    loader.taskFinished.connect(lambda phase, result: finished.append((phase, result, threading.current_thread() is threading.main_thread())))
+    loader.taskFailed.connect(lambda phase, err: failed.append((phase, err)))
+    loader.allTasksFinished.connect(lambda: allDone.append(True))
+    startTime = time.monotonic()
+    loader.runInBackground("slow", slowTask, 0.3, {"a": 1})
+    loader.runInBackground("fast", slowTask, 0.0, None)
+    loader.runInBackground("broken", failingTask)
+    # The caller isn't blocked by the tasks
+    assert time.monotonic() - startTime < 0.1
+    assert waitFor(lambda: allDone)
+    assert finished == [("fast", None, True), ("slow", {"a": 1}, True)]
+    assert failed == [("broken", "no network")]
+    assert loader.numOutstandingTasks() == 0
+    durations = {name: duration for name, start, duration, thread in loader.timings.getDurations()}
+    assert durations["slow"] >= 0.25 and durations["fast"] < 0.25
+
+def test_timings_report():
+    timings = StartupTimings()
+    with timings.timePhase("show window"):
+        time.sleep(0.01)
+    timings.start("never finished")
+    report = timings.getReport()
+    assert "show window" in report and "unfinished" in report and "total" in report
+
+def test_deferred_provider_init():
+    manager = makeTestModeManager()
+    assert manager.providersInitialized()
+    configFileName = ConfigIniFile(manager.config_ini.getFileName())
+    deferred = StockProviderManager(lambda symbol: None, config_ini=configFileName, deferProviderInit=True)
+    assert not deferred.providersInitialized() and deferred.providers == {}
+    # Stock list and start request made before the providers exist are applied when they are created
+    deferred.setStocks(["A.L", "B.L"])
+    deferred.start()
+    deferred.initializeProviders()
+    assert deferred.providersInitialized()
+    assert sorted(deferred.symbol_to_provider.keys()) == ["A.L", "B.L"]
+    assert waitFor(lambda: deferred.getStockData("A.L") is not None)
+    deferred.stop()
+
+if __name__ == "__main__":
+    test_results_delivered_on_qt_thread()
+    test_timings_report()
+    test_deferred_provider_init()
+    print("Startup loader tests passed")
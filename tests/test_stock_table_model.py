@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Test the shared stock table model and the row range views over it.
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PySide6 import QtWidgets, QtCore
+from PySide6.QtCore import Qt
+from StockTableModel import StockTableModel, StockTableRowRange
+from StockTable import StockTable
+from LocalConfig import LocalConfig
+
+app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+COL_DEFS = [
+    { 'colLbl':"Sym", 'colValName':"sym", 'dataType':'str', 'fmtStr':'', 'prfxStr':'', 'pstfxStr':'', 'align':'left', 'fontSize':'large', 'colourCode':'PosNeg', 'colourByCol':'change' },
+    { 'colLbl':"Last", 'colValName':"price", 'dataType':'decimal', 'fmtStr':'{:0.2f}', 'prfxStr':'', 'pstfxStr':'', 'align':'right', 'colourCode':'FlashPosNeg', 'colourBy':'change' },
+    { 'colLbl':"Change", 'colValName':"change", 'dataType':'decimal', 'fmtStr':'{:0.2f}', 'prfxStr':'', 'pstfxStr':'', 'align':'right' },
+    { 'colLbl':"Value", 'colValName':"totalvalue", 'dataType':'decimal', 'fmtStr':'{:0,.2f}', 'prfxStr':'£', 'pstfxStr':'', 'align':'right' },
+    { 'colLbl':"Profit", 'colValName':"profit", 'dataType':'decimal', 'fmtStr':'{:0,.2f}', 'prfxStr':'£', 'pstfxStr':'', 'align':'right', 'colourCode':'PosNeg' },
+    { 'colLbl':"Volume", 'colValName':"volume", 'dataType':'decimal', 'fmtStr':'{:0,.0f}', 'prfxStr':'', 'pstfxStr':'', 'align':'right' },
+    ]
+
+class FakeStockValues:
+    def __init__(self):
+        self.quotes = {}
+        self.versions = {}
+        self.numReads = 0
+
+    def setQuote(self, symbol, quote):
+        self.quotes[symbol] = quote
+        self.versions[symbol] = self.versions.get(symbol, 0) + 1
+
+    def getStockData(self, symbol):
+        self.numReads += 1
+        quote = self.quotes.get(symbol)
+        return None if quote is None else dict(quote)
+
+    def getQuoteVersion(self, symbol):
+        return self.versions.get(symbol, 0)
+
+class FakeExDivDates:
+    def addToStockInfo(self, symbol, stkValues):
+        pass
+
+def makeModel(bTotalsRow=True):
+    model = StockTableModel(COL_DEFS, "£", bTotalsRow)
+    model.setStocks([{'symbol': "A.L", 'holding': 100, 'cost': 200},
+                     {'symbol': "B.L", 'holding': 10, 'cost': 1000},
+                     {'symbol': "C.L", 'holding': 50, 'cost': 100}])
+    return model
+
+def recordChanges(model):
+    changes = []
+    model.dataChanged.connect(lambda topLeft, bottomRight, roles=[]:
+                              changes.append((topLeft.row(), topLeft.column(), bottomRight.row(), bottomRight.column())))
+    return changes
+
+def test_format_and_totals():
+    model = makeModel()
+    stockValues = FakeStockValues()
+    stockValues.setQuote("A.L", {'sym': "A.L", 'price': 250.0, 'change': 1.5, 'volume': 12345})
+    stockValues.setQuote("B.L", {'sym': "B.L", 'price': 900.0, 'change': -2.0, 'volume': 100})
+    totals = model.updateFromQuotes(stockValues, FakeExDivDates(), None)
+    assert model.rowCount() == 4 and model.columnCount() == len(COL_DEFS)
+    assert model.data(model.index(0, 1)) == "250.00"
+    assert model.data(model.index(0, 3)) == "£250.00"
+    assert model.data(model.index(1, 4)) == "£-10.00"
+    assert model.data(model.index(0, 5)) == "12,345"
+    assert model.data(model.index(0, 1), Qt.TextAlignmentRole) == Qt.AlignRight
+    # C.L has no quote so the totals are flagged as missing values
+    assert totals[2] == 2 and totals[3] == 3
+    assert model.data(model.index(3, 2)) == "Totals"
+    assert model.data(model.index(3, 3)) == "£340.00"
+    assert model.data(model.index(3, 4)) == "£40.00"
+    assert model.data(model.index(3, 5)) == "Missing Values"
+    assert model.data(model.index(3, 5), Qt.BackgroundRole) is model.brushRed
+    assert model.getNumMissingValues() == 1
+    stockValues.setQuote("C.L", {'sym': "C.L", 'price': 100.0, 'change': 0})
+    # Only the changed symbol's row is read and the totals move by its value
+    stockValues.numReads = 0
+    model.updateFromQuotes(stockValues, FakeExDivDates(), {"C.L": True})
+    assert stockValues.numReads == 1
+    assert model.data(model.index(3, 5)) == "" and model.getNumMissingValues() == 0
+    assert model.data(model.index(3, 3)) == "£390.00"
+    assert [float(total) for total in model.getTotals()] == [390.0, 40.0, 3, 3]
+
+def test_only_changed_cells_emitted():
+    model = makeModel(False)
+    stockValues = FakeStockValues()
+    for sym in ("A.L", "B.L", "C.L"):
+        stockValues.setQuote(sym, {'sym': sym, 'price': 100.0, 'change': 1.0, 'volume': 10})
+    model.updateFromQuotes(stockValues, FakeExDivDates(), None)
+    changes = recordChanges(model)
+    # Nothing moved so nothing is repainted
+    model.updateFromQuotes(stockValues, FakeExDivDates(), {})
+    assert changes == []
+    # Only the volume of B.L changed
+    stockValues.setQuote("B.L", {'sym': "B.L", 'price': 100.0, 'change': 1.0, 'volume': 20})
+    model.updateFromQuotes(stockValues, FakeExDivDates(), {"B.L": True})
+    assert changes == [(1, 5, 1, 5)]
+    assert model.data(model.index(1, 5)) == "20"
+
+def test_price_flash():
+    model = makeModel(False)
+    stockValues = FakeStockValues()
+    stockValues.setQuote("A.L", {'sym': "A.L", 'price': 100.0, 'change': 1.0})
+    model.updateFromQuotes(stockValues, FakeExDivDates(), None)
+    stockValues.setQuote("A.L", {'sym': "A.L", 'price': 101.0, 'change': 2.0})
+    model.updateFromQuotes(stockValues, FakeExDivDates(), {"A.L": True})
+    assert model.data(model.index(0, 1), Qt.BackgroundRole) is model.brushGreen
+    stockValues.setQuote("A.L", {'sym': "A.L", 'price': 99.0, 'change': 0.0})
+    model.updateFromQuotes(stockValues, FakeExDivDates(), {"A.L": True})
+    assert model.data(model.index(0, 1), Qt.BackgroundRole) is model.brushRed
+    # Flash clears once its time has elapsed, for the flashed cell only
+    assert model.numFlashingCells() == 1 and model.flashTimer.isActive()
+    changes = recordChanges(model)
+    model.updateFlash(time.monotonic())
+    assert changes == []
+    model.updateFlash(time.monotonic() + 1)
+    assert changes == [(0, 1, 0, 1)]
+    assert model.data(model.index(0, 1), Qt.BackgroundRole) is model.brushNeutral
+    assert model.numFlashingCells() == 0 and not model.flashTimer.isActive()
+
+def test_flash_clears_on_its_own_timer():
+    model = makeModel(False)
+    model.dataFlashTimeMs = 20
+    stockValues = FakeStockValues()
+    stockValues.setQuote("A.L", {'sym': "A.L", 'price': 100.0, 'change': 1.0})
+    stockValues.setQuote("B.L", {'sym': "B.L", 'price': 100.0, 'change': 1.0})
+    model.updateFromQuotes(stockValues, FakeExDivDates(), None)
+    stockValues.setQuote("A.L", {'sym': "A.L", 'price': 101.0, 'change': 2.0})
+    model.updateFromQuotes(stockValues, FakeExDivDates(), {"A.L": True})
+    # A later flash of another cell doesn't delay the first one clearing
+    QtCore.QThread.msleep(10)
+    stockValues.setQuote("B.L", {'sym': "B.L", 'price': 99.0, 'change': 0.0})
+    model.updateFromQuotes(stockValues, FakeExDivDates(), {"B.L": True})
+    deadline = time.monotonic() + 2
+    while model.numFlashingCells() > 0 and time.monotonic() < deadline:
+        app.processEvents()
+        QtCore.QThread.msleep(2)
+    assert model.numFlashingCells() == 0
+    assert model.data(model.index(0, 1), Qt.BackgroundRole) is model.brushNeutral
+    assert model.data(model.index(1, 1), Qt.BackgroundRole) is model.brushNeutral
+
+def test_row_ranges_share_model():
+    model = makeModel()
+    first = StockTableRowRange()
+    first.setSourceModel(model)
+    first.setRowRange(0, 2, False)
+    last = StockTableRowRange()
+    last.setSourceModel(model)
+    last.setRowRange(2, 4, True)
+    assert first.rowCount() == 2 and last.rowCount() == 2
+    assert [first.getSymbol(0), first.getSymbol(1), last.getSymbol(0)] == ["A.L", "B.L", "C.L"]
+    assert last.isTotalsRow(1) and not first.isTotalsRow(1)
+    stockValues = FakeStockValues()
+    stockValues.setQuote("C.L", {'sym': "C.L", 'price': 120.0, 'change': 0.5})
+    model.updateFromQuotes(stockValues, FakeExDivDates(), None)
+    assert last.data(last.index(0, 1)) == "120.00"
+    assert last.data(last.index(1, 2)) == "Totals"
+
+class CountingLocalConfig(LocalConfig):
+    def __init__(self, configFileName):
+        super().__init__(configFileName)
+        self._config = {}
+        self.numGets = 0
+
+    def getItem(self, itemName, defaultVal):
+        self.numGets += 1
+        return super().getItem(itemName, defaultVal)
+
+def test_fonts_cached_by_row_height_bucket():
+    StockTable.clearFontCache()
+    localConfig = CountingLocalConfig(os.path.join(tempfile.mkdtemp(), "config.json"))
+    model = makeModel()
+    table = StockTable()
+    table.initTable(None, model, "folio", localConfig)
+    table.resize(400, 200)
+    table.setRowRange(0, 3, True)
+    assert table.getFontStr("normal") != "" and localConfig.numGets == 3
+    # Resizing within the same bucket only changes the row height
+    fontBucket = table.fontBucketInUse
+    table.resize(400, 204)
+    table.resizeTableCells()
+    assert table.fontBucketInUse == fontBucket and localConfig.numGets == 3
+    # Another view of the same table shares the cached fonts
+    otherTable = StockTable()
+    otherTable.initTable(None, model, "folio", localConfig)
+    otherTable.resize(400, 200)
+    otherTable.setRowRange(0, 3, True)
+    assert localConfig.numGets == 3 and otherTable.getFontStr("large") == table.getFontStr("large")
+    # A chosen font replaces the cached one
+    table.setFontStr("normal", "Arial,20,-1,5,700,0,0,0,0,0")
+    assert table.font().pointSize() == 20
+    assert localConfig.getItem("table_folio_normal", "") == "Arial,20,-1,5,700,0,0,0,0,0"
+    StockTable.clearFontCache()
+
+if __name__ == "__main__":
+    test_format_and_totals()
+    test_only_changed_cells_emitted()
+    test_price_flash()
+    test_flash_clears_on_its_own_timer()
+    test_row_ranges_share_model()
+    test_fonts_cached_by_row_height_bucket()
+    print("Stock table model tests passed")
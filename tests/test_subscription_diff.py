@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Test that editing the stock list only subscribes/unsubscribes the symbols that
+changed, and that providers keep data and scheduling state for the rest.
+"""
+
+import os
+import sys
+import time
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from StockProviderManager import StockProviderManager
+from ConfigIniFile import ConfigIniFile
+from StockValues_YahooAPI import StockValues_YahooAPI
+from StockValues_Google import StockValues_Google
+from StockValues_IB_PriceGetter import StockValues_IB_PriceGetter
+
+class RecordingProvider:
+    """Provider that records the subscription calls made on it"""
+    def __init__(self):
+        self.calls = []
+
+    def subscribe(self, symbols):
+        self.calls.append(("subscribe", list(symbols)))
+
+    def unsubscribe(self, symbols):
+        self.calls.append(("unsubscribe", list(symbols)))
+
+def makeManager():
+    """Manager with two recording providers in its fallback chain"""
+    configFileName = os.path.join(tempfile.mkdtemp(), "config.ini")
+    with open(configFileName, "w") as f:
+        f.write("STOCK_PROVIDER_FALLBACK_CHAIN=first,second\nQUOTE_SNAPSHOT_INTERVAL_SECS=0\n"
+                f"QUOTE_SNAPSHOT_FILE={os.path.join(os.path.dirname(configFileName), 'snapshot.json')}\n")
+    manager = StockProviderManager(lambda symbol: None, config_ini=ConfigIniFile(configFileName), deferProviderInit=True)
+    manager.initializeProviders()
+    manager.providers = {'first': RecordingProvider(), 'second': RecordingProvider()}
+    return manager
+
+def test_edit_one_symbol_costs_one_change():
+    manager = makeManager()
+    symbols = [f"SYM{i}.L" for i in range(400)]
+    manager.setStocks(symbols)
+    first, second = manager.providers['first'], manager.providers['second']
+    assert first.calls == [("subscribe", symbols)] and second.calls == []
+
+    first.calls.clear()
+    edited = [sym if sym != "SYM5.L" else "NEW.L" for sym in symbols]
+    manager.setStocks(edited)
+    assert first.calls == [("unsubscribe", ["SYM5.L"]), ("subscribe", ["NEW.L"])]
+    assert "SYM5.L" not in manager.symbol_to_provider and manager.symbol_to_provider["NEW.L"] == 'first'
+
+    # Same list again - nothing to do
+    first.calls.clear()
+    manager.setStocks(edited)
+    assert first.calls == []
+
+def test_preferred_provider_change_moves_symbol():
+    manager = makeManager()
+    manager.setStocks(["A.L", "B.L"])
+    first, second = manager.providers['first'], manager.providers['second']
+    first.calls.clear()
+    manager.setStocks(["A.L", {'symbol': "B.L", 'stock_provider': "second"}])
+    assert first.calls == [("unsubscribe", ["B.L"])]
+    assert second.calls == [("subscribe", ["B.L"])]
+    assert manager.symbol_to_provider["B.L"] == 'second' and manager.symbol_preferred_provider["B.L"] == 'second'
+
+    # Naming the provider the symbol is already on changes nothing on the providers
+    first.calls.clear()
+    second.calls.clear()
+    manager.setStocks([{'symbol': "A.L", 'stock_provider': "first"}, {'symbol': "B.L", 'stock_provider': "second"}])
+    assert first.calls == [] and second.calls == []
+    assert manager.symbol_preferred_provider["A.L"] == 'first'
+
+def test_unchanged_symbols_keep_fallback_position():
+    manager = makeManager()
+    manager.setStocks(["A.L", "B.L"])
+    # As if B.L had failed over to the second provider
+    manager.symbol_to_provider["B.L"] = 'second'
+    manager.symbol_to_fallback_index["B.L"] = 1
+    manager.setStocks(["A.L", "B.L", "C.L"])
+    assert manager.symbol_to_provider["B.L"] == 'second' and manager.symbol_to_fallback_index["B.L"] == 1
+    assert manager.providers['second'].calls == []
+
+def test_yahoo_keeps_state_for_unchanged_symbols():
+    provider = StockValues_YahooAPI()
+    provider.setStocks(["A.L", "B.L", "C.L"])
+    with provider.lock:
+        for sym in ("A.L", "B.L", "C.L"):
+            provider.stockData[sym] = {'price': 100.0, 'failCount': 0}
+    now = time.monotonic()
+    for sym in ("A.L", "B.L", "C.L"):
+        provider._scheduler.recordQuote(sym, 100.0, now)
+
+    provider.setStocks(["A.L", "C.L", "D.L"])
+    assert provider.tickerlist == ["A.L", "C.L", "D.L"]
+    assert provider.getStockData("A.L")['price'] == 100.0 and provider.getStockData("B.L") is None
+    # Only the new symbol is due - the others keep their last poll time
+    assert provider._scheduler.nextBatch(10, now + 1) == ["D.L"]
+
+    # Quotes for a symbol unsubscribed while its request was in flight are discarded
+    provider._storeQuotes({"B.L": {'price': 101.0}, "C.L": {'price': 102.0}}, None)
+    assert provider.getStockData("B.L") is None and provider.getStockData("C.L")['price'] == 102.0
+    provider.stop()
+
+def test_google_subscribe_and_unsubscribe():
+    provider = StockValues_Google()
+    provider.stop()
+    assert provider.subscribe(["A.L", "B.L"]) == ["A.L", "B.L"]
+    assert provider.subscribe(["B.L", "C.L"]) == ["C.L"]
+    assert provider.highFreqSymList == ["A.L", "B.L", "C.L"]
+    assert provider.unsubscribe(["B.L", "X.L"]) == ["B.L"]
+    assert provider.highFreqSymList == ["A.L", "C.L"]
+    assert sorted(provider._scheduler.getSymbols()) == ["A.L", "C.L"]
+
+class RecordingPriceGetter(StockValues_IB_PriceGetter):
+    """IB price getter without a connection or threads - records market data requests"""
+    def __init__(self):
+        self._REQ_ID_PRICE_BASE = 10000000
+        self._nextReqId = 1
+        self._mapPriceReqIdToStockInfo = {}
+        self._mapSymbolToPriceReqId = {}
+        self._IB_SymbolMappings = {}
+        self.mapsLock = threading.Lock()
+        self._wantedSymbols = set()
+        self.requestAddStocks = {}
+        self.requestRemoveStocks = {}
+        self.requestStockListChanged = False
+        self.requestListLock = threading.Lock()
+        self.onRequest = None
+        self.requested = []
+        self.cancelled = []
+
+    def reqMktData(self, reqId, contract, genericTickList, snapshot, regulatorySnapshot, options):
+        self.requested.append(reqId)
+        # Simulate a subscription change made while the request thread is applying changes
+        if self.onRequest is not None:
+            onRequest, self.onRequest = self.onRequest, None
+            onRequest()
+
+    def cancelMktData(self, reqId):
+        self.cancelled.append(reqId)
+
+def test_ib_changes_while_requests_applied_are_not_lost():
+    getter = RecordingPriceGetter()
+    # Unsubscribed while its market data request is being made - cancelled next time
+    getter.subscribe(["A.L"])
+    getter.onRequest = lambda: getter.unsubscribe(["A.L"])
+    getter.applyRequestChanges()
+    assert getter.requestStockListChanged
+    getter.applyRequestChanges()
+    assert getter.cancelled == getter.requested and getter._mapSymbolToPriceReqId == {}
+
+    # Subscribed again while its cancel is being made - requested again next time
+    getter.subscribe(["B.L"])
+    getter.applyRequestChanges()
+    getter.unsubscribe(["B.L"])
+    getter.cancelMktData = lambda reqId: (getter.cancelled.append(reqId), getter.subscribe(["B.L"]))
+    getter.applyRequestChanges()
+    assert getter.requestStockListChanged
+    getter.applyRequestChanges()
+    assert list(getter._mapSymbolToPriceReqId) == ["B.L"]
+    assert len(getter.requested) == 3 and len(getter.cancelled) == 2
+
+if __name__ == "__main__":
+    test_edit_one_symbol_costs_one_change()
+    test_preferred_provider_change_moves_symbol()
+    test_unchanged_symbols_keep_fallback_position()
+    test_yahoo_keeps_state_for_unchanged_symbols()
+    test_google_subscribe_and_unsubscribe()
+    test_ib_changes_while_requests_applied_are_not_lost()
+    print("Subscription diff tests passed")
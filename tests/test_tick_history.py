@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Test the SQLite tick history store and its OHLCV rollups.
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from TickHistory import TickHistory
+from ConfigIniFile import ConfigIniFile
+from StockProviderManager import StockProviderManager
+
+# 2024-03-01 10:00:00 UTC
+BASE_TIME = 1709287200.0
+
+def makeHistory():
+    history = TickHistory(os.path.join(tempfile.mkdtemp(), "ticks.db"))
+    history.start()
+    return history
+
+def test_ticks_and_bars():
+    history = makeHistory()
+    # Cumulative day volume as reported by the providers
+    ticks = [(0, 100.0, 1000), (10, 102.0, 1500), (50, 99.0, 1600), (70, 101.0, 2000), (400, 103.0, 2600)]
+    for offset, price, volume in ticks:
+        history.recordTick("BP.L", price, volume, BASE_TIME + offset)
+    history.recordTick("VOD.L", 70.0, None, BASE_TIME + 5)
+    history.flush()
+
+    assert [t[1] for t in history.getTicks("BP.L")] == [100.0, 102.0, 99.0, 101.0, 103.0]
+    assert len(history.getTicks("BP.L", BASE_TIME + 10, BASE_TIME + 70)) == 2
+
+    minuteBars = history.getBars("BP.L", 60)
+    assert len(minuteBars) == 3
+    assert minuteBars[0] == {'start': BASE_TIME, 'open': 100.0, 'high': 102.0, 'low': 99.0, 'close': 99.0, 'volume': 600.0}
+    assert minuteBars[1]['close'] == 101.0 and minuteBars[1]['volume'] == 400.0
+    fiveMinBars = history.getBars("BP.L", 300)
+    assert [b['close'] for b in fiveMinBars] == [101.0, 103.0]
+    dayBars = history.getBars("BP.L", 86400)
+    assert len(dayBars) == 1
+    assert (dayBars[0]['open'], dayBars[0]['high'], dayBars[0]['low'], dayBars[0]['close']) == (100.0, 103.0, 99.0, 103.0)
+    assert dayBars[0]['volume'] == 1600.0
+    assert history.getSymbols() == ["BP.L", "VOD.L"]
+    history.stop()
+
+def test_bars_merge_across_batches_and_restart():
+    history = makeHistory()
+    history.recordTick("BP.L", 100.0, None, BASE_TIME)
+    history.flush()
+    history.recordTick("BP.L", 105.0, None, BASE_TIME + 20)
+    history.stop()
+    # Data survives a restart and later ticks extend the same bar
+    reopened = TickHistory(history.getFileName())
+    reopened.start()
+    reopened.recordTick("BP.L", 95.0, None, BASE_TIME + 30)
+    reopened.flush()
+    bar = reopened.getBars("BP.L", 60)[0]
+    assert (bar['open'], bar['high'], bar['low'], bar['close']) == (100.0, 105.0, 95.0, 95.0)
+    assert reopened.getStats()["written"] == 1
+    reopened.stop()
+
+def test_replay():
+    history = makeHistory()
+    history.recordTick("A.L", 1.0, None, BASE_TIME + 2)
+    history.recordTick("B.L", 2.0, 10, BASE_TIME + 1)
+    history.recordTick("A.L", 3.0, None, BASE_TIME + 3)
+    history.flush()
+    replayed = []
+    count = history.replay(lambda sym, tick: replayed.append((sym, tick['price'])))
+    assert count == 3
+    assert replayed == [("B.L", 2.0), ("A.L", 1.0), ("A.L", 3.0)]
+    replayed = []
+    history.replay(lambda sym, tick: replayed.append(sym), symbols=["A.L"], startTime=BASE_TIME + 3)
+    assert replayed == ["A.L"]
+    try:
+        history.getBars("A.L", 120)
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+    history.stop()
+
+def test_manager_records_ticks():
+    tempDir = tempfile.mkdtemp()
+    configFileName = os.path.join(tempDir, "config.ini")
+    with open(configFileName, "w") as f:
+        f.write(f"TEST_MODE=true\nTICK_HISTORY_ENABLED=true\nTICK_HISTORY_FILE={os.path.join(tempDir, 'ticks.db')}\n")
+    manager = StockProviderManager(lambda symbol: None, config_ini=ConfigIniFile(configFileName))
+    manager._providerSymbolChanged("SYM1.L", {'price': "1,234.5", 'volume': 100, 'failCount': 0})
+    manager._providerSymbolChanged("SYM1.L", {'price': "1,234.5", 'volume': 100, 'failCount': 0})
+    manager._providerSymbolChanged("SYM1.L", {'price': 0, 'failCount': 1})
+    history = manager.getTickHistory()
+    history.flush()
+    # Only accepted changes are recorded
+    assert [t[1] for t in history.getTicks("SYM1.L")] == [1234.5]
+    manager.stop()
+
+def test_disabled_by_default():
+    assert TickHistory.fromConfig(ConfigIniFile(os.path.join(tempfile.mkdtemp(), "missing.ini"))) is None
+
+if __name__ == "__main__":
+    test_ticks_and_bars()
+    test_bars_merge_across_batches_and_restart()
+    test_replay()
+    test_manager_records_ticks()
+    test_disabled_by_default()
+    print("Tick history tests passed")
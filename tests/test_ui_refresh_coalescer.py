@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Test coalescing of quote change notifications into rate-limited UI refreshes.
+"""
+
+import os
+import sys
+import time
+import threading
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PySide6 import QtWidgets
+from UIRefreshCoalescer import UIRefreshCoalescer
+from test_changed_symbols import makeTestModeManager
+
+app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+def processEventsFor(secs):
+    endTime = time.monotonic() + secs
+    while time.monotonic() < endTime:
+        app.processEvents()
+        time.sleep(0.002)
+
+def test_burst_from_threads_is_one_refresh():
+    refreshes = []
+    coalescer = UIRefreshCoalescer(lambda: refreshes.append(time.perf_counter()), 50)
+    workers = [threading.Thread(target=lambda: [coalescer.notify("SYM.L") for i in range(200)]) for t in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    processEventsFor(0.1)
+    assert len(refreshes) == 1
+    stats = coalescer.getStats()
+    assert stats["notifications"] == 800 and stats["refreshes"] == 1
+    assert stats["latencyMaxMs"] >= 0
+
+def test_min_frame_interval_and_no_idle_wakeups():
+    refreshes = []
+    coalescer = UIRefreshCoalescer(lambda: refreshes.append(time.perf_counter()), 80)
+    # Nothing notified - nothing runs
+    processEventsFor(0.1)
+    assert refreshes == []
+    coalescer.notify()
+    processEventsFor(0.02)
+    coalescer.notify()
+    processEventsFor(0.2)
+    assert len(refreshes) == 2
+    assert refreshes[1] - refreshes[0] >= 0.075
+    assert not coalescer.isRefreshPending()
+
+def test_notify_during_refresh_schedules_another():
+    calls = []
+    def refresh():
+        calls.append(1)
+        if len(calls) == 1:
+            coalescer.notify()
+    coalescer = UIRefreshCoalescer(refresh, 10)
+    coalescer.notify()
+    processEventsFor(0.1)
+    assert len(calls) == 2
+
+def test_changed_map_max_count():
+    manager = makeTestModeManager()
+    for i in range(5):
+        manager._providerSymbolChanged(f"SYM{i}.L", {'price': 100.0 + i, 'failCount': 0})
+    firstBatch = manager.getMapOfStocksChangedSinceUIUpdated(3)
+    assert len(firstBatch) == 3 and manager.getNumStocksChangedSinceUIUpdated() == 2
+    secondBatch = manager.getMapOfStocksChangedSinceUIUpdated(3)
+    assert set(firstBatch) | set(secondBatch) == {f"SYM{i}.L" for i in range(5)}
+    assert manager.getNumStocksChangedSinceUIUpdated() == 0
+
+if __name__ == "__main__":
+    test_burst_from_threads_is_one_refresh()
+    test_min_frame_interval_and_no_idle_wakeups()
+    test_notify_during_refresh_schedules_another()
+    test_changed_map_max_count()
+    print("UI refresh coalescer tests passed")
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Test the scaled-integer valuation engine used by the stock tables.
+"""
+
+import os
+import sys
+import random
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ValuationEngine import ValuationEngine
+
+def test_scaling():
+    assert ValuationEngine.toScaled(480.5) == 4805000
+    assert ValuationEngine.toScaled(12) == 120000
+    assert ValuationEngine.toScaled("1,234.5") == 12345000
+    assert ValuationEngine.toScaled("1.2M") == 12000000000
+    assert ValuationEngine.toScaled("") is None
+    assert ValuationEngine.toScaled("N/A") is None
+    assert ValuationEngine.toScaled(None) is None
+    assert ValuationEngine.toScaled(float("nan")) is None
+    assert ValuationEngine.toDecimal(4805000) == Decimal("480.5")
+
+def test_formatting_rounds_half_to_even():
+    twoPlaces = ValuationEngine.parseFormat("{:0.2f}")
+    assert ValuationEngine.formatScaled(ValuationEngine.toScaled(2.675), twoPlaces) == "2.68"
+    assert ValuationEngine.formatScaled(ValuationEngine.toScaled(2.665), twoPlaces) == "2.66"
+    assert ValuationEngine.formatScaled(ValuationEngine.toScaled(-1.5), twoPlaces) == "-1.50"
+    assert ValuationEngine.formatScaled(ValuationEngine.toScaled(-0.004), twoPlaces) == "0.00"
+    assert ValuationEngine.formatScaled(ValuationEngine.toScaled(1234567.891), ValuationEngine.parseFormat("{:0,.2f}")) == "1,234,567.89"
+    assert ValuationEngine.formatScaled(ValuationEngine.toScaled(1234567), ValuationEngine.parseFormat("{:0,.0f}")) == "1,234,567"
+    assert ValuationEngine.formatScaled(ValuationEngine.toScaled(0.12345), ValuationEngine.parseFormat("{:0.4f}")) == "0.1234"
+    # No format string shows whole numbers, other formats go through Decimal
+    assert ValuationEngine.formatScaled(ValuationEngine.toScaled(13.5), ValuationEngine.parseFormat("")) == "14"
+    assert ValuationEngine.formatScaled(ValuationEngine.toScaled(1.5), ValuationEngine.parseFormat("{:0.6f}")) == "1.500000"
+
+def test_value_profit_and_totals():
+    engine = ValuationEngine()
+    # Costs and prices are in pence, values in pounds
+    engine.setHoldings([(100, 200), (10, "1,000"), (50, 100)])
+    assert engine.setPrice(0, 250.0)
+    assert engine.setPrice(1, "900")
+    assert not engine.setPrice(2, "")
+    assert ValuationEngine.toDecimal(engine.getValue(0)) == Decimal("250")
+    assert ValuationEngine.toDecimal(engine.getProfit(1)) == Decimal("-10")
+    assert not engine.hasPrice(2)
+    totalVal, totalProfit, rowsWithValue, numRows = engine.getTotals()
+    assert (ValuationEngine.toDecimal(totalVal), ValuationEngine.toDecimal(totalProfit)) == (Decimal("340"), Decimal("40"))
+    assert (rowsWithValue, numRows) == (2, 3)
+    # A full pass gives the same answer as row by row updates
+    engine.revalueAll([250.0, "900", 120.0])
+    assert engine.getTotals() == (totalVal + 600000, totalProfit + 100000, 3, 3)
+    engine.clearPrice(0)
+    assert engine.getTotals()[2] == 2
+
+def test_matches_decimal_arithmetic():
+    engine = ValuationEngine()
+    engine.setHoldings([(1234, 567.89)])
+    engine.setPrice(0, 612.37)
+    expectedValue = Decimal("612.37") * 1234 / 100
+    expectedProfit = expectedValue - Decimal("567.89") * 1234 / 100
+    assert ValuationEngine.toDecimal(engine.getValue(0)) == expectedValue.quantize(Decimal("0.0001"))
+    assert ValuationEngine.toDecimal(engine.getProfit(0)) == expectedProfit.quantize(Decimal("0.0001"))
+
+def test_running_totals_match_full_sum():
+    rand = random.Random(3)
+    engine = ValuationEngine()
+    engine.setHoldings([(rand.randint(1, 5000), rand.uniform(10, 1000)) for i in range(50)])
+    assert engine.getTotals() == (0, 0, 0, 50) and engine.getNumMissing() == 50
+    for i in range(2000):
+        rowIdx = rand.randrange(50)
+        if rand.random() < 0.1:
+            engine.clearPrice(rowIdx)
+        else:
+            engine.setPrice(rowIdx, round(rand.uniform(10, 1000), 2))
+    totalVal, totalProfit, rowsWithValue, numRows = engine.getTotals()
+    assert (totalVal, totalProfit, rowsWithValue) == engine._sumTotals()
+    assert engine.getNumMissing() == numRows - rowsWithValue
+
+if __name__ == "__main__":
+    test_scaling()
+    test_formatting_rounds_half_to_even()
+    test_value_profit_and_totals()
+    test_matches_decimal_arithmetic()
+    test_running_totals_match_full_sum()
+    print("Valuation engine tests passed")
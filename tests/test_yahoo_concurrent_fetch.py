@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Test the pooled, concurrent quote fetch in StockValues_YahooAPI against a local
+stub server (no network access or API key needed).
+"""
+
+import os
+import sys
+import time
+import logging
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from StockValues_YahooAPI import StockValues_YahooAPI
+from RateLimiter import TokenBucketRateLimiter
+from stub_quote_server import StubQuoteServer
+
+logging.getLogger("StockTickerLogger").setLevel(logging.WARNING)
+
+def makeProvider(server, maxConcurrent):
+    provider = StockValues_YahooAPI()
+    provider.setMaxConcurrentRequests(maxConcurrent)
+    provider.base_url = server.baseUrl
+    provider.setRateLimiter(TokenBucketRateLimiter("test", 60000, 100))
+    return provider
+
+def test_full_list_fetched_in_one_pass():
+    symbols = [f"S{i:03d}.L" for i in range(300)]
+    with StubQuoteServer(latencySecs=0.02) as server:
+        provider = makeProvider(server, 6)
+        quotes = provider.get_quotes_concurrent(symbols)
+        provider.stop()
+    assert set(quotes.keys()) == set(symbols)
+    assert all(q.get('failCount', 0) == 0 for q in quotes.values())
+    assert server.requestCount == 30
+    assert 1 < server.maxConcurrentRequests <= 6
+    # Connections are kept alive and reused rather than one per request
+    assert server.connectionCount <= 6
+
+def test_missing_symbols_marked_failed():
+    with StubQuoteServer() as server:
+        server.unknownSymbols = {"NOPE.L"}
+        provider = makeProvider(server, 2)
+        quotes = provider.get_quotes_concurrent(["BP.L", "NOPE.L"])
+        provider.stop()
+    assert quotes["BP.L"]["price"] > 0
+    assert quotes["NOPE.L"]["failCount"] == 1
+
+def test_rate_limited_response_retried():
+    with StubQuoteServer() as server:
+        server.rateLimitResponses = 1
+        server.retryAfterSecs = 0
+        provider = makeProvider(server, 1)
+        quotes = provider.get_quotes(["BP.L"])
+        stats = provider._rateLimiter.getStats()
+        provider.stop()
+    assert quotes["BP.L"].get('failCount', 0) == 0
+    assert server.requestCount == 2
+    assert stats["rateLimited"] == 1
+
+def test_rate_limited_throughout_does_not_mark_failures():
+    with StubQuoteServer() as server:
+        server.rateLimitResponses = 100
+        server.retryAfterSecs = 0
+        provider = makeProvider(server, 1)
+        quotes = provider.get_quotes(["BP.L"])
+        provider.stop()
+    assert quotes == {}
+    assert server.requestCount == provider.MAX_RATE_LIMITED_ATTEMPTS
+
+def test_update_thread_polls_scheduled_symbols():
+    symbols = [f"S{i:03d}.L" for i in range(120)]
+    with StubQuoteServer() as server:
+        provider = makeProvider(server, 4)
+        provider.setOnlyUpdateWhenMarketOpen(False)
+        provider.setStocks(symbols)
+        provider.start()
+        # Passes run back to back until every symbol has a quote, then go idle
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline and len(provider.stockData) < len(symbols):
+            time.sleep(0.1)
+        time.sleep(1.5)
+        requestsWhenIdle = server.requestCount
+        time.sleep(1.5)
+        provider.stop()
+    assert len(provider.stockData) == len(symbols)
+    assert requestsWhenIdle == len(symbols) // provider.SYMBOLS_PER_REQUEST
+    assert server.requestCount == requestsWhenIdle
+
+def test_fetch_after_stop_and_restart():
+    symbols = [f"S{i:03d}.L" for i in range(25)]
+    with StubQuoteServer() as server:
+        provider = makeProvider(server, 4)
+        assert set(provider.get_quotes_concurrent(symbols).keys()) == set(symbols)
+        provider.stop()
+        provider.start()
+        quotes = provider.get_quotes_concurrent(symbols)
+        provider.stop()
+    assert set(quotes.keys()) == set(symbols)
+    assert all(q.get('failCount', 0) == 0 for q in quotes.values())
+
+if __name__ == "__main__":
+    test_full_list_fetched_in_one_pass()
+    test_missing_symbols_marked_failed()
+    test_rate_limited_response_retried()
+    test_rate_limited_throughout_does_not_mark_failures()
+    test_update_thread_polls_scheduled_symbols()
+    test_fetch_after_stop_and_restart()
+    print("Yahoo concurrent fetch tests passed")